@@ -0,0 +1,54 @@
+"""Upload admission for routes - applied before the request body is read"""
+
+from typing import Callable
+
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+
+from app.core.auth import user_from_request
+from app.services.admission import AdmissionRejected, upload_admission
+
+
+def admission_controlled(endpoint: Callable) -> Callable:
+    """Mark an upload endpoint for admission control (see AdmittedRoute)"""
+    endpoint.upload_admission = True
+    return endpoint
+
+
+class AdmittedRoute(APIRoute):
+    """
+    Runs marked endpoints through upload admission. FastAPI reads a form
+    body before resolving dependencies, so this has to wrap the handler
+    rather than be a dependency: the user comes from the bearer token,
+    the size from Content-Length, and a rejected upload is answered
+    (with Retry-After) without reading a byte of it. Content-Length is
+    required (411 otherwise): a chunked body's size isn't known until
+    it's been read, so it couldn't be charged against the limits.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not getattr(self.endpoint, "upload_admission", False):
+            return handler
+
+        async def admitted(request: Request):
+            user = await user_from_request(request)
+            if user is None:
+                # Unauthenticated - the route's own auth dependency answers
+                return await handler(request)
+
+            content_length = request.headers.get("content-length")
+            if not content_length or not content_length.isdigit():
+                raise HTTPException(status_code=411, detail="Uploads need a Content-Length header")
+            size = int(content_length)
+            try:
+                async with upload_admission.admit(user.id, user.subscription_tier, size):
+                    return await handler(request)
+            except AdmissionRejected as e:
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=e.reason,
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+
+        return admitted
@@ -0,0 +1,159 @@
+"""Custom responses"""
+
+import os
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
+
+
+class EvidenceFileResponse(FileResponse):
+    """
+    Serves a stored evidence blob.
+
+    Blobs are content-addressed and never change, so the ETag is the
+    content hash and responses are cacheable forever. Range/206 comes
+    from FileResponse; this adds If-None-Match, makes If-Range match
+    our ETag, and hands the file to the server (ASGI pathsend/zerocopy
+    extensions) instead of copying it through the app when it can.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path: str | os.PathLike[str], content_hash: str, **kwargs) -> None:
+        self.etag = f'"{content_hash}"'
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.setdefault("etag", self.etag)
+        headers.setdefault("cache-control", "private, max-age=31536000, immutable")
+        super().__init__(path, headers=headers, **kwargs)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._extensions = scope.get("extensions") or {}
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and self._etag_matches(if_none_match):
+            not_modified = Response(
+                status_code=304,
+                headers={"etag": self.etag, "cache-control": self.headers["cache-control"]},
+            )
+            return await not_modified(scope, receive, send)
+        await super().__call__(scope, receive, send)
+
+    def _etag_matches(self, header: str) -> bool:
+        tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+        return "*" in tags or self.etag in tags
+
+    def _should_use_range(self, http_if_range: str, stat_result: os.stat_result) -> bool:
+        return http_if_range == self.etag
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if not send_header_only and "http.response.pathsend" in self._extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        if not send_header_only and "http.response.zerocopy" in self._extensions:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopy", "file": file, "more_body": False})
+            return
+        await super()._handle_simple(send, send_header_only)
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if not send_header_only and "http.response.zerocopy" in self._extensions:
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+            self.headers["content-length"] = str(end - start)
+            await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": start,
+                    "count": end - start,
+                    "more_body": False,
+                })
+            return
+        await super()._handle_single_range(send, start, end, file_size, send_header_only)
+
+
+def parse_single_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    [start, end) for a single "bytes=" range, None if unsatisfiable.
+    Raises ValueError for anything we don't serve as a range (multiple
+    ranges, other units, garbage) - those get the full body.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError(header)
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        length = int(last)
+        if length <= 0:
+            return None
+        return max(size - length, 0), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or end <= start:
+        return None
+    return start, end
+
+
+class RangeStreamResponse(Response):
+    """
+    A generated body of known size and stable ETag, produced on demand
+    by range. Supports a single Range (guarded by If-Range), so an
+    interrupted download can resume where it stopped.
+    """
+
+    def __init__(
+        self,
+        iter_range: Callable[[int, int], AsyncIterator[bytes]],
+        size: int,
+        etag: str,
+        media_type: str,
+        headers: Optional[dict] = None,
+    ) -> None:
+        self.iter_range = iter_range
+        self.size = size
+        self.etag = f'"{etag}"'
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({
+            **(headers or {}),
+            "etag": self.etag,
+            "accept-ranges": "bytes",
+            "cache-control": "private, no-cache",
+        })
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        start, end = 0, self.size
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == self.etag):
+            try:
+                byte_range = parse_single_range(range_header, self.size)
+            except ValueError:
+                byte_range = (0, self.size)
+            else:
+                if byte_range is None:
+                    unsatisfiable = Response(
+                        status_code=416, headers={"content-range": f"bytes */{self.size}"}
+                    )
+                    return await unsatisfiable(scope, receive, send)
+                if byte_range != (0, self.size):
+                    self.status_code = 206
+                    self.headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1] - 1}/{self.size}"
+            start, end = byte_range
+
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") != "HEAD":
+            async with aclosing(self.iter_range(start, end)) as chunks:
+                async for chunk in chunks:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,2 +1,2 @@
 # Routes module
-from app.api.routes import evidence
\ No newline at end of file
+from app.api.routes import evidence, uploads, geo, exports, sync, audit, metrics, health, admin
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Admin API Routes"""
+
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.core.auth import current_superuser
+from app.core.config import get_settings
+from app.models.user import User
+from app.services.verification import integrity_verifier
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+settings = get_settings()
+
+
+@router.post("/verification", status_code=202)
+async def start_verification(
+    max_age_days: Optional[int] = Query(None, ge=0),
+    user: User = Depends(current_superuser),
+):
+    """Start a bulk integrity check of items not verified within max_age_days"""
+    
+    days = settings.verification_max_age_days if max_age_days is None else max_age_days
+    already_running = integrity_verifier.running
+    run = integrity_verifier.start(timedelta(days=days))
+    
+    return {
+        "running": True,
+        "already_running": already_running,
+        "run": run.to_dict(),
+    }
+
+
+@router.get("/verification")
+async def verification_status(
+    user: User = Depends(current_superuser),
+):
+    """Progress of the current (or last) bulk integrity check"""
+    
+    run = integrity_verifier.current
+    return {
+        "running": integrity_verifier.running,
+        "run": run.to_dict() if run else None,
+    }
@@ -0,0 +1,103 @@
+"""Audit Log API Routes"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.auth import current_active_user
+from app.models.audit import AuditCheckpoint, AuditEntry
+from app.models.user import User
+from app.services.audit import audit_log, checkpoint_dict, entry_dict
+from app.services.export import manifest_signer
+
+router = APIRouter(prefix="/audit", tags=["Audit"])
+
+
+async def get_checkpoint(db: AsyncSession, tree_size: Optional[int]) -> AuditCheckpoint:
+    if tree_size is None:
+        checkpoint = await audit_log.latest_checkpoint(db)
+    else:
+        checkpoint = await db.get(AuditCheckpoint, tree_size)
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    return checkpoint
+
+
+@router.get("")
+async def list_audit_entries(
+    after: Optional[int] = Query(None, ge=0, description="Continue after this seq"),
+    limit: int = Query(100, ge=1, le=500),
+    tree_size: Optional[int] = Query(None, ge=1, description="Checkpoint to prove against (default: latest)"),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Your audit history, oldest first, each entry with a Merkle inclusion
+    proof against a signed checkpoint. Entries newer than the checkpoint
+    are listed without a proof until the next one.
+    """
+
+    checkpoint = await get_checkpoint(db, tree_size)
+
+    query = (
+        select(AuditEntry)
+        .where(AuditEntry.user_id == user.id, AuditEntry.seq.is_not(None))
+        .order_by(AuditEntry.seq)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(AuditEntry.seq > after)
+    entries = (await db.execute(query)).scalars().all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    provable = [entry for entry in entries if entry.seq < checkpoint.tree_size]
+    proofs = dict(zip(
+        (entry.seq for entry in provable),
+        await audit_log.inclusion_proofs(db, [entry.seq for entry in provable], checkpoint.tree_size),
+    ))
+
+    return {
+        "checkpoint": checkpoint_dict(checkpoint),
+        "entries": [
+            {**entry_dict(entry), "proof": proofs.get(entry.seq)}
+            for entry in entries
+        ],
+        "has_more": has_more,
+        "next_after": entries[-1].seq if has_more else None,
+    }
+
+
+@router.get("/checkpoint")
+async def latest_checkpoint(
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """The latest signed tree head, and the key that signed it"""
+    checkpoint = await get_checkpoint(db, None)
+    return {**checkpoint_dict(checkpoint), "public_key": manifest_signer.public_key_info()}
+
+
+@router.get("/consistency")
+async def consistency_proof(
+    first: int = Query(..., ge=1, description="Older checkpoint size"),
+    second: Optional[int] = Query(None, ge=1, description="Newer checkpoint size (default: latest)"),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Proof that the log at `second` entries is an extension of the log at `first`"""
+
+    old = await get_checkpoint(db, first)
+    new = await get_checkpoint(db, second)
+    if old.tree_size > new.tree_size:
+        raise HTTPException(status_code=400, detail="first must not be after second")
+
+    return {
+        "first": checkpoint_dict(old),
+        "second": checkpoint_dict(new),
+        "proof": await audit_log.consistency_proof(db, old.tree_size, new.tree_size),
+    }
@@ -1,26 +1,242 @@
 """Evidence API Routes"""
 
-import hashlib
+import asyncio
+import base64
 from datetime import datetime, timezone
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 import os
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy import select, desc
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, Query
+from fastapi.responses import RedirectResponse
+from sqlalchemy import select, desc, func, literal_column, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.admission import AdmittedRoute, admission_controlled
+from app.api.responses import EvidenceFileResponse
+from app.core.config import get_settings
 from app.core.database import get_db
-from app.core.auth import current_active_user
+from app.core.auth import current_active_user, get_read_db
 from app.models.user import User
 from app.models.evidence import EvidenceItem
+from app.models.tombstone import EvidenceTombstone
+from app.services.audit import audit_log
+from app.services.cache import evidence_cache
+from app.services.jobs import job_queue
+from app.services.metadata import metadata_extractor
+from app.services.quota import QuotaExceeded, check_quota, charge, release
 from app.services.storage import storage_service
+from app.services.thumbnails import thumbnail_service, THUMBNAIL_MIME_TYPES
+from app.services.timestamping import timestamp_batcher
+from app.services.verification import verify_item
 
-router = APIRouter(prefix="/evidence", tags=["Evidence"])
+router = APIRouter(prefix="/evidence", tags=["Evidence"], route_class=AdmittedRoute)
+
+settings = get_settings()
+
+# Must match the text search config of EvidenceItem.search_vector
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Only what the listing renders - skips tags, location and proof columns
+LISTING_COLUMNS = (
+    EvidenceItem.id,
+    EvidenceItem.title,
+    EvidenceItem.item_type,
+    EvidenceItem.description,
+    EvidenceItem.file_path,
+    EvidenceItem.file_size_bytes,
+    EvidenceItem.content_hash,
+    EvidenceItem.captured_at,
+    EvidenceItem.timestamped_at,
+    EvidenceItem.thumbnail_sizes,
+)
+
+
+def encode_cursor(captured_at: datetime, item_id: UUID) -> str:
+    """Opaque page cursor for the (captured_at, id) sort key"""
+    raw = f"{captured_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def quota_error(e: QuotaExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail={
+            "message": "Storage quota exceeded",
+            "used_bytes": e.used,
+            "limit_bytes": e.limit,
+            "requested_bytes": e.requested,
+        },
+    )
+
+
+async def file_url(item) -> Optional[str]:
+    """Where the client downloads an item's file from"""
+    if not item.file_path:
+        return None
+    return await storage_service.get_download_url(item.file_path) or f"/evidence/{item.id}/file"
+
+
+async def listing_item(item) -> dict:
+    """One row of LISTING_COLUMNS as returned by list/search"""
+    return {
+        "id": str(item.id),
+        "title": item.title,
+        "type": item.item_type,
+        "description": item.description,
+        "file_url": await file_url(item),
+        "thumbnails": await thumbnail_urls(item),
+        "file_size": item.file_size_bytes,
+        "content_hash": item.content_hash,
+        "captured_at": item.captured_at.isoformat() if item.captured_at else None,
+        "timestamped_at": item.timestamped_at.isoformat() if item.timestamped_at else None,
+        "verified": item.timestamped_at is not None,
+    }
+
+
+async def thumbnail_urls(item) -> dict[str, str]:
+    """Preview URLs by size (longest edge, px); empty until generated"""
+    urls = {}
+    for size in item.thumbnail_sizes or []:
+        key = storage_service.thumbnail_key(item.content_hash, size)
+        urls[str(size)] = (
+            await storage_service.get_download_url(key)
+            or f"/evidence/{item.id}/thumbnail/{size}"
+        )
+    return urls
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Inverse of encode_cursor; rejects anything we didn't hand out"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        captured_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(captured_at), UUID(item_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_rank_cursor(rank: float, item_id: UUID) -> str:
+    """Opaque page cursor for the (rank, id) sort key of ranked search"""
+    raw = f"{rank!r}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        rank, item_id = raw.split("|", 1)
+        return float(rank), UUID(item_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def create_evidence(
+    db: AsyncSession,
+    user: User,
+    stored: dict,
+    title: str,
+    item_type: str,
+    description: Optional[str],
+) -> EvidenceItem:
+    """
+    Commit a streamed upload (see StorageService.upload_stream) as a new
+    evidence item and queue it for timestamping
+    """
+    items = await create_evidence_batch(db, user, [{
+        "stored": stored,
+        "title": title,
+        "item_type": item_type,
+        "description": description,
+    }])
+    return items[0]
+
+
+async def create_evidence_batch(db: AsyncSession, user: User, uploads: list[dict]) -> list[EvidenceItem]:
+    """
+    Commit streamed uploads as new evidence items in one transaction -
+    one quota update, one blob upsert, one multi-row insert - and queue
+    them for timestamping and background processing. Each upload is a
+    dict of stored (from upload_stream), title, item_type and description.
+    """
+    stored_files = [upload["stored"] for upload in uploads]
+    
+    try:
+        # Counted against the quota in this transaction; fails if it won't fit
+        await charge(db, user, sum(stored["size"] for stored in stored_files))
+        
+        # Identical content is stored once - duplicates only add a reference
+        await storage_service.commit_blobs(db, stored_files)
+        
+        # Create evidence records; capture time and location are filled
+        # in from the file's metadata by a background job
+        items = [
+            EvidenceItem(
+                id=uuid4(),
+                user_id=user.id,
+                item_type=upload["item_type"],
+                file_path=upload["stored"]["key"],
+                file_size_bytes=upload["stored"]["size"],
+                mime_type=upload["stored"]["content_type"],
+                title=upload["title"],
+                description=upload["description"],
+                captured_at=datetime.now(timezone.utc),
+                content_hash=upload["stored"]["content_hash"],
+            )
+            for upload in uploads
+        ]
+        
+        # Flushed as a single INSERT ... RETURNING, server defaults included
+        db.add_all(items)
+        
+        # Chained into the audit log by the background sequencer
+        for evidence in items:
+            audit_log.record(
+                db, user.id, "evidence.create", evidence.id,
+                content_hash=evidence.content_hash, size=evidence.file_size_bytes,
+            )
+        
+        # Post-processing is queued with the insert, not run by this request
+        await job_queue.enqueue(db, [
+            job
+            for evidence in items
+            for job in (
+                metadata_extractor.job(evidence.id, evidence.file_path, evidence.file_size_bytes, evidence.mime_type),
+                thumbnail_service.job(evidence.id, evidence.content_hash, evidence.file_path, evidence.mime_type),
+            )
+            if job is not None
+        ])
+        await db.commit()
+    except QuotaExceeded as e:
+        await db.rollback()
+        job_queue.discard(db)
+        for stored in stored_files:
+            await storage_service.discard_upload(stored)
+        raise quota_error(e)
+    except BaseException:
+        await db.rollback()
+        job_queue.discard(db)
+        for stored in stored_files:
+            await storage_service.discard_upload(stored)
+        raise
+    
+    await evidence_cache.invalidate(user.id)
+    await job_queue.publish(db)
+    
+    for evidence in items:
+        # Timestamped in the next Merkle batch, a few seconds from now
+        timestamp_batcher.submit(evidence.id, evidence.content_hash)
+    
+    return items
 
 
 @router.post("/upload")
+@admission_controlled
 async def upload_evidence(
+    request: Request,
     file: UploadFile = File(...),
     title: str = Form(...),
     item_type: str = Form("photo"),
@@ -30,90 +246,217 @@ async def upload_evidence(
 ):
     """Upload new evidence with cryptographic timestamp"""
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
-    
-    # Generate SHA-256 hash
-    content_hash = hashlib.sha256(content).hexdigest()
+    # The request size bounds the file size - refuse before storing anything
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        try:
+            await check_quota(db, user, int(content_length))
+        except QuotaExceeded as e:
+            raise quota_error(e)
     
-    # Upload to MinIO/S3
-    file_path = await storage_service.upload_file(
-        user_id=user.id,
-        content=content,
-        filename=file.filename,
-        content_type=file.content_type or "application/octet-stream"
-    )
+    # Stream to storage, hashing (SHA-256) as we go
+    stored = await storage_service.upload_stream(file)
     
-    # Create evidence record
-    evidence = EvidenceItem(
-        user_id=user.id,
-        item_type=item_type,
-        file_path=file_path,
-        file_size_bytes=file_size,
-        mime_type=file.content_type,
+    evidence = await create_evidence(
+        db, user, stored,
         title=title,
+        item_type=item_type,
         description=description,
-        captured_at=datetime.now(timezone.utc),
-        content_hash=content_hash,
-        timestamp_authority="local",
-        timestamped_at=datetime.now(timezone.utc),
     )
     
-    db.add(evidence)
-    await db.commit()
-    await db.refresh(evidence)
-    
     return {
         "id": str(evidence.id),
         "title": evidence.title,
         "content_hash": evidence.content_hash,
-        "timestamped_at": evidence.timestamped_at.isoformat(),
-        "message": "Evidence captured and timestamped successfully"
+        "timestamped_at": None,
+        "message": "Evidence captured - timestamp pending"
+    }
+
+
+@router.post("/upload/batch")
+@admission_controlled
+async def upload_evidence_batch(
+    request: Request,
+    files: list[UploadFile] = File(...),
+    titles: Optional[list[str]] = Form(None, description="One per file, in order (default: file name)"),
+    item_type: str = Form("photo"),
+    description: Optional[str] = Form(None),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Upload many files in one request, committed as a single transaction"""
+    
+    if len(files) > settings.batch_upload_max_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.batch_upload_max_files} files per batch",
+        )
+    if titles and len(titles) != len(files):
+        raise HTTPException(status_code=400, detail="titles must match files one to one")
+    
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        try:
+            await check_quota(db, user, int(content_length))
+        except QuotaExceeded as e:
+            raise quota_error(e)
+    
+    # Spool and hash the files concurrently, a few at a time
+    limit = asyncio.Semaphore(settings.batch_upload_concurrency)
+    
+    async def spool(file: UploadFile) -> dict:
+        async with limit:
+            return await storage_service.upload_stream(file)
+    
+    spooled = await asyncio.gather(*(spool(file) for file in files), return_exceptions=True)
+    
+    results: list[dict] = []
+    uploads = []
+    for index, (file, stored) in enumerate(zip(files, spooled)):
+        if isinstance(stored, Exception):
+            results.append({"index": index, "filename": file.filename, "error": str(stored)})
+            continue
+        uploads.append({
+            "stored": stored,
+            "title": titles[index] if titles else (file.filename or "Untitled"),
+            "item_type": item_type,
+            "description": description,
+        })
+        results.append({"index": index, "filename": file.filename})
+    
+    items = await create_evidence_batch(db, user, uploads) if uploads else []
+    
+    created = iter(items)
+    for result in results:
+        if "error" not in result:
+            evidence = next(created)
+            result.update({
+                "id": str(evidence.id),
+                "title": evidence.title,
+                "content_hash": evidence.content_hash,
+                "timestamped_at": None,
+            })
+    
+    return {
+        "items": results,
+        "created": len(items),
+        "failed": len(results) - len(items),
+        "message": "Evidence captured - timestamps pending",
     }
 
 
 @router.get("")
 async def list_evidence(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     user: User = Depends(current_active_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List all evidence for the current user"""
+    """List evidence for the current user, newest first, one page at a time"""
     
-    result = await db.execute(
-        select(EvidenceItem)
+    cache_name = f"list:{limit}:{cursor or ''}"
+    version, cached = await evidence_cache.get(user.id, cache_name)
+    if cached is not None:
+        return cached
+    
+    query = (
+        select(*LISTING_COLUMNS)
         .where(EvidenceItem.user_id == user.id)
-        .order_by(desc(EvidenceItem.captured_at))
+        .order_by(desc(EvidenceItem.captured_at), desc(EvidenceItem.id))
+        .limit(limit + 1)
     )
     
-    items = result.scalars().all()
-    
-    evidence_list = []
-    for item in items:
-        # Generate download URL
-        download_url = None
-        if item.file_path:
-            try:
-                download_url = await storage_service.get_download_url(item.file_path)
-            except Exception:
-                pass
-        
-        evidence_list.append({
-            "id": str(item.id),
-            "title": item.title,
-            "type": item.item_type,
-            "description": item.description,
-            "file_url": download_url,
-            "file_size": item.file_size_bytes,
-            "content_hash": item.content_hash,
-            "captured_at": item.captured_at.isoformat() if item.captured_at else None,
-            "timestamped_at": item.timestamped_at.isoformat() if item.timestamped_at else None,
-            "verified": item.timestamped_at is not None,
-        })
+    # Keyset pagination - seek past the last row of the previous page
+    if cursor:
+        captured_at, last_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(EvidenceItem.captured_at, EvidenceItem.id) < tuple_(captured_at, last_id)
+        )
     
-    return {
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    evidence_list = [await listing_item(item) for item in rows]
+    
+    page = {
         "items": evidence_list,
-        "total": len(evidence_list)
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1].captured_at, rows[-1].id) if has_more else None,
+    }
+    await evidence_cache.set(user.id, version, cache_name, page)
+    return page
+
+
+@router.get("/search")
+async def search_evidence(
+    q: Optional[str] = Query(None, max_length=500, description="Search text (web search syntax)"),
+    tags: Optional[list[str]] = Query(None, description="Only items carrying all of these tags"),
+    item_type: Optional[str] = Query(None),
+    captured_from: Optional[datetime] = Query(None),
+    captured_to: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search evidence - best matches first, or newest first without q"""
+    
+    query = select(*LISTING_COLUMNS).where(EvidenceItem.user_id == user.id)
+    
+    # Filters - tags use the GIN index via @>
+    if tags:
+        query = query.where(EvidenceItem.tags.contains(tags))
+    if item_type:
+        query = query.where(EvidenceItem.item_type == item_type)
+    if captured_from:
+        query = query.where(EvidenceItem.captured_at >= captured_from)
+    if captured_to:
+        query = query.where(EvidenceItem.captured_at < captured_to)
+    
+    if q and q.strip():
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank = func.ts_rank(EvidenceItem.search_vector, ts_query)
+        query = (
+            query.add_columns(rank.label("rank"))
+            .where(EvidenceItem.search_vector.op("@@")(ts_query))
+            .order_by(desc(rank), desc(EvidenceItem.id))
+        )
+        if cursor:
+            last_rank, last_id = decode_rank_cursor(cursor)
+            query = query.where(tuple_(rank, EvidenceItem.id) < tuple_(last_rank, last_id))
+    else:
+        rank = None
+        query = query.order_by(desc(EvidenceItem.captured_at), desc(EvidenceItem.id))
+        if cursor:
+            captured_at, last_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(EvidenceItem.captured_at, EvidenceItem.id) < tuple_(captured_at, last_id)
+            )
+    
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    results = []
+    for row in rows:
+        item = await listing_item(row)
+        if rank is not None:
+            item["rank"] = row.rank
+        results.append(item)
+    
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = (
+            encode_rank_cursor(last.rank, last.id) if rank is not None
+            else encode_cursor(last.captured_at, last.id)
+        )
+    
+    return {
+        "items": results,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
     }
 
 
@@ -121,10 +464,15 @@ async def list_evidence(
 async def get_evidence(
     evidence_id: UUID,
     user: User = Depends(current_active_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get a single evidence item"""
     
+    cache_name = f"item:{evidence_id}"
+    version, cached = await evidence_cache.get(user.id, cache_name)
+    if cached is not None:
+        return cached
+    
     result = await db.execute(
         select(EvidenceItem).where(
             EvidenceItem.id == evidence_id,
@@ -137,24 +485,126 @@ async def get_evidence(
     if not item:
         raise HTTPException(status_code=404, detail="Evidence not found")
     
-    download_url = None
-    if item.file_path:
-        try:
-            download_url = await storage_service.get_download_url(item.file_path)
-        except Exception:
-            pass
-    
-    return {
+    detail = {
         "id": str(item.id),
         "title": item.title,
         "type": item.item_type,
         "description": item.description,
-        "file_url": download_url,
+        "file_url": await file_url(item),
+        "thumbnails": await thumbnail_urls(item),
         "content_hash": item.content_hash,
         "captured_at": item.captured_at.isoformat() if item.captured_at else None,
+        "latitude": float(item.latitude) if item.latitude is not None else None,
+        "longitude": float(item.longitude) if item.longitude is not None else None,
+        "location_name": item.location_name,
         "timestamped_at": item.timestamped_at.isoformat() if item.timestamped_at else None,
         "verified": item.timestamped_at is not None,
     }
+    await evidence_cache.set(user.id, version, cache_name, detail)
+    return detail
+
+
+@router.get("/{evidence_id}/file")
+async def download_evidence_file(
+    evidence_id: UUID,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Download the evidence file - supports Range, ETag and If-None-Match"""
+    
+    result = await db.execute(
+        select(
+            EvidenceItem.file_path,
+            EvidenceItem.mime_type,
+            EvidenceItem.content_hash,
+        ).where(
+            EvidenceItem.id == evidence_id,
+            EvidenceItem.user_id == user.id
+        )
+    )
+    
+    item = result.one_or_none()
+    
+    if not item or not item.file_path:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    # Object storage serves (and ranges) the bytes itself
+    direct_url = await storage_service.get_download_url(item.file_path)
+    if direct_url:
+        return RedirectResponse(direct_url, status_code=307)
+    
+    path = storage_service.backend.local_path(item.file_path)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    return EvidenceFileResponse(
+        path,
+        content_hash=item.content_hash,
+        media_type=item.mime_type or "application/octet-stream",
+    )
+
+
+@router.get("/{evidence_id}/thumbnail/{size}")
+async def download_evidence_thumbnail(
+    evidence_id: UUID,
+    size: int,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Download a generated preview of the evidence file"""
+    
+    result = await db.execute(
+        select(
+            EvidenceItem.content_hash,
+            EvidenceItem.thumbnail_sizes,
+        ).where(
+            EvidenceItem.id == evidence_id,
+            EvidenceItem.user_id == user.id
+        )
+    )
+    
+    item = result.one_or_none()
+    
+    if not item or size not in (item.thumbnail_sizes or []):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    
+    key = storage_service.thumbnail_key(item.content_hash, size)
+    direct_url = await storage_service.get_download_url(key)
+    if direct_url:
+        return RedirectResponse(direct_url, status_code=307)
+    
+    path = storage_service.backend.local_path(key)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    
+    return EvidenceFileResponse(
+        path,
+        content_hash=f"{item.content_hash}-{size}",
+        media_type=THUMBNAIL_MIME_TYPES[storage_service.settings.thumbnail_format],
+    )
+
+
+@router.post("/{evidence_id}/verify")
+async def verify_evidence(
+    evidence_id: UUID,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Re-hash the stored file and check its timestamp proof"""
+    
+    result = await db.execute(
+        select(EvidenceItem).where(
+            EvidenceItem.id == evidence_id,
+            EvidenceItem.user_id == user.id
+        )
+    )
+    
+    item = result.scalar_one_or_none()
+    
+    if not item:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    return await verify_item(db, item)
 
 
 @router.delete("/{evidence_id}")
@@ -177,14 +627,20 @@ async def delete_evidence(
     if not item:
         raise HTTPException(status_code=404, detail="Evidence not found")
     
-    # Delete from storage
+    # Quota first - takes the user row lock before the item goes
+    await release(db, user.id, item.file_size_bytes or 0)
+    await db.delete(item)
+    
+    # Syncing clients learn about the delete from the tombstone
+    db.add(EvidenceTombstone(id=item.id, user_id=user.id))
+    audit_log.record(db, user.id, "evidence.delete", item.id, content_hash=item.content_hash)
+    
+    # Release our reference; the blob is collected once nothing uses it
     if item.file_path:
-        try:
-            await storage_service.delete_file(item.file_path)
-        except Exception:
-            pass
+        await storage_service.release_blob(db, item.content_hash, item.file_path)
     
-    await db.delete(item)
     await db.commit()
+    await storage_service.delete_released(db)
+    await evidence_cache.invalidate(user.id)
     
     return {"message": "Evidence deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""Evidence Export API Routes"""
+
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.responses import RangeStreamResponse
+from app.core.config import get_settings
+from app.core.database import get_db
+from app.core.auth import current_active_user
+from app.models.user import User
+from app.models.evidence import EvidenceItem
+from app.services.audit import audit_log
+from app.services.export import build_bundle, ensure_crcs, manifest_signer
+
+router = APIRouter(prefix="/evidence/export", tags=["Evidence"])
+
+settings = get_settings()
+
+
+@router.get("")
+async def export_evidence(
+    request: Request,
+    ids: Optional[list[UUID]] = Query(None, description="Items to include (default: all)"),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Download a ZIP bundle of evidence files with a signed manifest.
+    Supports Range / If-Range, so an interrupted download can resume.
+    """
+
+    query = (
+        select(EvidenceItem)
+        .where(EvidenceItem.user_id == user.id)
+        .order_by(EvidenceItem.captured_at, EvidenceItem.id)
+        .limit(settings.export_max_items + 1)
+    )
+    if ids:
+        query = query.where(EvidenceItem.id.in_(ids))
+
+    items = (await db.execute(query)).scalars().all()
+
+    if not items:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    if len(items) > settings.export_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.export_max_items} items per export - select them with ids",
+        )
+
+    files = await ensure_crcs(db, items)
+    layout, etag = build_bundle(user.id, items, files)
+
+    # Resumed downloads of the same bundle are one export
+    if not request.headers.get("range"):
+        audit_log.record(db, user.id, "evidence.export", etag=etag, items=len(items))
+    await db.commit()
+
+    return RangeStreamResponse(
+        layout.iter_range,
+        size=layout.size,
+        etag=etag,
+        media_type="application/zip",
+        headers={"content-disposition": f'attachment; filename="alibi-evidence-{etag[:12]}.zip"'},
+    )
+
+
+@router.get("/public-key")
+async def export_public_key():
+    """Key that verifies manifest.json.sig in exported bundles"""
+    return manifest_signer.public_key_info()
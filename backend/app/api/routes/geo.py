@@ -0,0 +1,186 @@
+"""Evidence Location API Routes"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func, Float, String, cast
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.auth import current_active_user, get_read_db
+from app.models.user import User
+from app.models.evidence import EvidenceItem
+from app.api.routes.evidence import LISTING_COLUMNS, MAX_PAGE_SIZE, listing_item
+from app.services import geo
+
+router = APIRouter(prefix="/evidence/geo", tags=["Evidence"])
+
+settings = get_settings()
+
+GEO_COLUMNS = LISTING_COLUMNS + (EvidenceItem.latitude, EvidenceItem.longitude)
+MAX_RADIUS_KM = 20_000
+MAX_CLUSTERS = 500
+
+
+def check_bbox(south: float, west: float, north: float, east: float) -> None:
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be greater than north")
+
+
+async def geo_item(row, distance: Optional[float] = None) -> dict:
+    item = await listing_item(row)
+    item["latitude"] = float(row.latitude)
+    item["longitude"] = float(row.longitude)
+    if distance is not None:
+        item["distance_km"] = round(distance, 4)
+    return item
+
+
+@router.get("/bbox")
+async def evidence_in_bbox(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Evidence captured inside a bounding box (west > east crosses the antimeridian)"""
+
+    check_bbox(south, west, north, east)
+
+    result = await db.execute(
+        select(*GEO_COLUMNS)
+        .where(
+            EvidenceItem.user_id == user.id,
+            geo.in_cells(geo.cover_cells(south, west, north, east)),
+            geo.in_bbox(south, west, north, east),
+        )
+        .order_by(EvidenceItem.captured_at.desc())
+        .limit(limit)
+    )
+
+    return {"items": [await geo_item(row) for row in result.all()]}
+
+
+async def query_radius(
+    db: AsyncSession,
+    user: User,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    limit: int,
+) -> list:
+    """Items within radius_km, nearest first, as (row, distance_km)"""
+    if settings.geo_postgis:
+        point = geo.point_geography(latitude, longitude)
+        distance = func.ST_Distance(geo.geography(), point) / 1000.0
+        query = select(*GEO_COLUMNS, distance.label("distance")).where(
+            EvidenceItem.user_id == user.id,
+            EvidenceItem.latitude.is_not(None),
+            EvidenceItem.longitude.is_not(None),
+            func.ST_DWithin(geo.geography(), point, radius_km * 1000.0),
+        ).order_by(geo.geography().op("<->")(point))
+    else:
+        distance = geo.distance_km(latitude, longitude)
+        south, west, north, east = geo.radius_bbox(latitude, longitude, radius_km)
+        query = select(*GEO_COLUMNS, distance.label("distance")).where(
+            EvidenceItem.user_id == user.id,
+            geo.in_cells(geo.cover_cells(south, west, north, east)),
+            geo.in_bbox(south, west, north, east),
+            distance <= radius_km,
+        ).order_by(distance)
+
+    result = await db.execute(query.limit(limit))
+    return [(row, row.distance) for row in result.all()]
+
+
+@router.get("/radius")
+async def evidence_in_radius(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Evidence captured within radius_km of a point, nearest first"""
+
+    rows = await query_radius(db, user, latitude, longitude, radius_km, limit)
+    return {"items": [await geo_item(row, distance) for row, distance in rows]}
+
+
+@router.get("/nearest")
+async def nearest_evidence(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    n: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """The n items captured nearest to a point"""
+
+    if settings.geo_postgis:
+        # KNN ordering on the GiST index - no radius needed
+        rows = await query_radius(db, user, latitude, longitude, MAX_RADIUS_KM, n)
+    else:
+        # Widen the search until it holds n items (or covers the globe)
+        radius_km = 1.0
+        while True:
+            rows = await query_radius(db, user, latitude, longitude, radius_km, n)
+            if len(rows) >= n or radius_km >= MAX_RADIUS_KM:
+                break
+            radius_km = min(radius_km * 4, MAX_RADIUS_KM)
+
+    return {"items": [await geo_item(row, distance) for row, distance in rows]}
+
+
+@router.get("/clusters")
+async def evidence_clusters(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    zoom: Optional[int] = Query(None, ge=0, le=22),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Evidence in a box grouped into geohash cells - one marker per cell for map views"""
+
+    check_bbox(south, west, north, east)
+    precision = geo.cluster_precision(south, west, north, east, zoom)
+    cell = func.substr(EvidenceItem.geohash, 1, precision)
+
+    result = await db.execute(
+        select(
+            cell.label("cell"),
+            func.count().label("count"),
+            func.avg(cast(EvidenceItem.latitude, Float)).label("latitude"),
+            func.avg(cast(EvidenceItem.longitude, Float)).label("longitude"),
+            func.min(cast(EvidenceItem.id, String)).label("sample_id"),
+        )
+        .where(
+            EvidenceItem.user_id == user.id,
+            geo.in_cells(geo.cover_cells(south, west, north, east)),
+            geo.in_bbox(south, west, north, east),
+        )
+        .group_by(cell)
+        .order_by(func.count().desc())
+        .limit(MAX_CLUSTERS)
+    )
+
+    return {
+        "precision": precision,
+        "clusters": [
+            {
+                "cell": row.cell,
+                "count": row.count,
+                "latitude": row.latitude,
+                "longitude": row.longitude,
+                # A single item can be shown as itself rather than a cluster
+                "id": row.sample_id if row.count == 1 else None,
+            }
+            for row in result.all()
+        ],
+    }
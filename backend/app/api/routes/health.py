@@ -0,0 +1,21 @@
+"""Health API Routes - for load balancers and orchestrators"""
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.readiness import readiness
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def live():
+    """The process is up and serving"""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready():
+    """200 once the warm-up has passed, 503 until then (no I/O per probe)"""
+    body = {"status": "ready" if readiness.ready else "starting", "checks": readiness.checks}
+    return JSONResponse(body, status_code=200 if readiness.ready else 503)
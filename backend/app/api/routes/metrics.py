@@ -0,0 +1,51 @@
+"""Prometheus Metrics Endpoint"""
+
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import func, select
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.core.metrics import QUEUE_DEPTH
+from app.models.audit import AuditEntry
+from app.services.jobs import job_queue
+from app.services.timestamping import timestamp_batcher
+
+router = APIRouter(tags=["Metrics"])
+
+settings = get_settings()
+
+
+async def sample_queue_depths() -> None:
+    """Queue gauges are sampled at scrape time"""
+    QUEUE_DEPTH.labels("timestamping", "queued").set(timestamp_batcher.pending)
+
+    try:
+        depths = await job_queue.backend.depths(list(settings.job_concurrency))
+        for (job_type, state), count in depths.items():
+            QUEUE_DEPTH.labels(f"jobs:{job_type}", state).set(count)
+    except Exception as e:
+        print(f"⚠️ Couldn't sample job queue depths: {e}")
+
+    try:
+        async with async_session_maker() as session:
+            pending = (await session.execute(
+                select(func.count()).select_from(AuditEntry).where(AuditEntry.seq.is_(None))
+            )).scalar_one()
+        QUEUE_DEPTH.labels("audit", "unsequenced").set(pending)
+    except Exception as e:
+        print(f"⚠️ Couldn't sample the audit backlog: {e}")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text exposition"""
+    if settings.metrics_token:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied, f"Bearer {settings.metrics_token}"):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+    await sample_queue_depths()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
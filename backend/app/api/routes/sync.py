@@ -0,0 +1,86 @@
+"""Evidence Sync API Routes"""
+
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.auth import current_active_user
+from app.models.user import User
+from app.models.evidence import EvidenceItem
+from app.api.routes.evidence import LISTING_COLUMNS, listing_item
+from app.services.sync import SyncToken, SyncTokenExpired, changes_page, current_watermark
+
+router = APIRouter(prefix="/evidence/sync", tags=["Evidence"])
+
+DEFAULT_SYNC_PAGE_SIZE = 200
+MAX_SYNC_PAGE_SIZE = 1000
+
+
+@router.get("")
+async def sync_evidence(
+    token: Optional[str] = Query(None, description="next_token from the last sync; omit for a full sync"),
+    limit: int = Query(DEFAULT_SYNC_PAGE_SIZE, ge=1, le=MAX_SYNC_PAGE_SIZE),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Evidence created, updated or deleted since the token. Keep calling
+    with next_token while has_more; store the final next_token for the
+    next sync.
+    """
+
+    if token:
+        try:
+            position = SyncToken.decode(token)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+        except SyncTokenExpired:
+            raise HTTPException(status_code=410, detail="Sync token expired - start a full sync")
+    else:
+        position = SyncToken(since=0, issued_at=time.time())
+
+    # Fixed when a sync starts, before its first page is read
+    if position.horizon is None:
+        position.horizon = await current_watermark(db)
+
+    changes = await changes_page(db, user.id, position, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed_ids = [change.id for change in changes if not change.deleted]
+    rows = {}
+    if changed_ids:
+        result = await db.execute(
+            select(*LISTING_COLUMNS, EvidenceItem.updated_at).where(EvidenceItem.id.in_(changed_ids))
+        )
+        rows = {row.id: row for row in result.all()}
+
+    items = []
+    for item_id in changed_ids:
+        # Deleted since the feed was read - its tombstone comes next sync
+        if item_id in rows:
+            item = await listing_item(rows[item_id])
+            item["updated_at"] = rows[item_id].updated_at.isoformat()
+            items.append(item)
+
+    if has_more:
+        last = changes[-1]
+        next_token = SyncToken(
+            since=position.since,
+            issued_at=position.issued_at,
+            horizon=position.horizon,
+            after=(last.change_xid, last.id),
+        )
+    else:
+        next_token = SyncToken(since=position.horizon, issued_at=time.time())
+
+    return {
+        "items": items,
+        "deleted": [str(change.id) for change in changes if change.deleted],
+        "has_more": has_more,
+        "next_token": next_token.encode(),
+    }
@@ -0,0 +1,257 @@
+"""Resumable Upload API Routes"""
+
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.requests import ClientDisconnect
+
+from app.api.admission import AdmittedRoute, admission_controlled
+from app.core.database import get_db
+from app.core.auth import current_active_user
+from app.models.user import User
+from app.models.upload_session import UploadSession
+from app.schemas.evidence import UploadSessionCreate
+from app.services.quota import QuotaExceeded, check_quota
+from app.services.storage import storage_service
+from app.services.uploads import (
+    resumable_uploads,
+    ChunkOutOfBounds,
+    LeaseLost,
+    PartialFileElsewhere,
+    PartialFileMissing,
+)
+from app.api.routes.evidence import create_evidence, quota_error
+
+router = APIRouter(prefix="/evidence/uploads", tags=["Evidence"], route_class=AdmittedRoute)
+
+
+def session_status(session: UploadSession) -> dict:
+    return {
+        "id": str(session.id),
+        "offset": session.offset,
+        "total_size": session.total_size,
+        "complete": session.offset == session.total_size,
+        "upload_url": f"/evidence/uploads/{session.id}",
+    }
+
+
+async def get_session(
+    db: AsyncSession,
+    upload_id: UUID,
+    user: User,
+    lock: bool = False,
+) -> UploadSession:
+    """Load the user's upload session, optionally locking it for writing"""
+    query = select(UploadSession).where(
+        UploadSession.id == upload_id,
+        UploadSession.user_id == user.id
+    )
+    if lock:
+        query = query.with_for_update(nowait=True)
+    
+    try:
+        session = (await db.execute(query)).scalar_one_or_none()
+    except DBAPIError as e:
+        # lock_not_available - another request is writing this session
+        if getattr(e.orig, "pgcode", None) == "55P03":
+            raise HTTPException(status_code=409, detail="Upload session is busy")
+        raise
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+async def require_partial(db: AsyncSession, session: UploadSession) -> None:
+    """421 if another node holds the partial file; 410 (and the session goes) if it's lost"""
+    try:
+        resumable_uploads.check_partial(session)
+    except PartialFileElsewhere as e:
+        raise HTTPException(
+            status_code=421,
+            detail="Upload session is held by another node",
+            headers={"Upload-Node": e.node},
+        )
+    except PartialFileMissing:
+        await db.delete(session)
+        await db.commit()
+        resumable_uploads.discard(session.id)
+        raise HTTPException(status_code=410, detail="Upload data was lost, start a new upload")
+
+
+@router.post("", status_code=201)
+async def create_upload(
+    data: UploadSessionCreate,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Start a resumable upload"""
+    
+    # total_size is declared up front, so over-quota uploads never start
+    try:
+        await check_quota(db, user, data.total_size)
+    except QuotaExceeded as e:
+        raise quota_error(e)
+    
+    session = UploadSession(
+        user_id=user.id,
+        filename=data.filename,
+        content_type=data.content_type,
+        item_type=data.item_type,
+        title=data.title,
+        description=data.description,
+        total_size=data.total_size,
+        expected_hash=data.content_hash,
+        offset=0,
+        node=resumable_uploads.node,
+    )
+    db.add(session)
+    await db.flush()
+    
+    await resumable_uploads.create(session.id)
+    await db.commit()
+    
+    return session_status(session)
+
+
+@router.get("/{upload_id}")
+async def get_upload(
+    upload_id: UUID,
+    response: Response,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Where to resume an upload from"""
+    
+    session = await get_session(db, upload_id, user)
+    response.headers["Upload-Offset"] = str(session.offset)
+    return session_status(session)
+
+
+@router.patch("/{upload_id}")
+@admission_controlled
+async def append_upload(
+    upload_id: UUID,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Append the request body to the upload at Upload-Offset"""
+    
+    session = await get_session(db, upload_id, user)
+    await require_partial(db, session)
+    
+    if upload_offset != session.offset:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload-Offset must be {session.offset}",
+            headers={"Upload-Offset": str(session.offset)},
+        )
+    
+    # Leased and committed up front: no row lock or connection is held
+    # while the body streams in
+    lease = await resumable_uploads.acquire_lease(db, session.id, upload_offset)
+    if lease is None:
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+    
+    try:
+        offset = await resumable_uploads.append(
+            session.id, upload_offset, session.total_size,
+            resumable_uploads.leased_chunks(session.id, lease, request.stream()),
+        )
+    except ChunkOutOfBounds:
+        await resumable_uploads.end_lease(db, session.id, lease, upload_offset, upload_offset)
+        raise HTTPException(status_code=413, detail="Chunk runs past the declared total_size")
+    except LeaseLost:
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+    except ClientDisconnect as e:
+        # Keep what arrived so the client can resume from there
+        await resumable_uploads.end_lease(db, session.id, lease, upload_offset, e.offset)
+        return Response(status_code=400)
+    except Exception:
+        await resumable_uploads.end_lease(db, session.id, lease, upload_offset, upload_offset)
+        raise
+    
+    if not await resumable_uploads.end_lease(db, session.id, lease, upload_offset, offset):
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+    
+    set_committed_value(session, "offset", offset)
+    response.headers["Upload-Offset"] = str(offset)
+    return session_status(session)
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload(
+    upload_id: UUID,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Verify the assembled file and turn it into an evidence item"""
+    
+    session = await get_session(db, upload_id, user, lock=True)
+    
+    if session.offset != session.total_size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {session.offset} of {session.total_size} bytes",
+            headers={"Upload-Offset": str(session.offset)},
+        )
+    if resumable_uploads.leased(session):
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+    
+    await require_partial(db, session)
+    stored = await resumable_uploads.finish(session)
+    
+    if session.expected_hash and stored["content_hash"] != session.expected_hash:
+        # The bytes are wrong somewhere - the client has to start over
+        await db.delete(session)
+        await db.commit()
+        await storage_service.discard_upload(stored)
+        resumable_uploads.discard(session.id)
+        raise HTTPException(
+            status_code=422,
+            detail=f"Content hash mismatch: got {stored['content_hash']}",
+        )
+    
+    # The session goes in the evidence transaction. If that fails it's
+    # rolled back with the partial file intact, so complete can be retried
+    await db.delete(session)
+    evidence = await create_evidence(
+        db, user, stored,
+        title=session.title,
+        item_type=session.item_type,
+        description=session.description,
+    )
+    resumable_uploads.discard(session.id)
+    
+    return {
+        "id": str(evidence.id),
+        "title": evidence.title,
+        "content_hash": evidence.content_hash,
+        "timestamped_at": None,
+        "message": "Evidence captured - timestamp pending"
+    }
+
+
+@router.delete("/{upload_id}")
+async def abort_upload(
+    upload_id: UUID,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Abandon an upload and free its space"""
+    
+    session = await get_session(db, upload_id, user, lock=True)
+    if resumable_uploads.leased(session):
+        raise HTTPException(status_code=409, detail="Upload session is busy")
+    await db.delete(session)
+    await db.commit()
+    resumable_uploads.discard(session.id)
+    
+    return {"message": "Upload aborted"}
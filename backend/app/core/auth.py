@@ -1,29 +1,82 @@
 """Authentication - FastAPI-Users Setup"""
 
 import uuid
-from typing import Optional
+from typing import Any, Optional
 
 from fastapi import Depends, Request
-from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin
+from fastapi.security.utils import get_authorization_scheme_param
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     BearerTransport,
     JWTStrategy,
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
+from fastapi_users.jwt import decode_jwt, generate_jwt
+import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.core.config import get_settings
-from app.core.database import async_session_maker
+from app.core.database import async_session_maker, get_db, replica_router
 from app.models.user import User
+from app.services.cache import evidence_cache
 
 settings = get_settings()
 
-
-# Database adapter
-async def get_user_db():
-    async with async_session_maker() as session:
-        yield SQLAlchemyUserDatabase(session, User)
+# Changing any of these bumps User.token_version, revoking issued tokens
+REVOKING_FIELDS = ("email", "is_active", "is_superuser")
+
+# Never leaves the database
+UNCACHED_FIELDS = {"hashed_password"}
+
+
+# Database adapter - shares the request's get_db session, so a route
+# and its auth dependency use one connection
+async def get_user_db(session: AsyncSession = Depends(get_db)):
+    yield SQLAlchemyUserDatabase(session, User)
+
+
+async def load_user(user_id: uuid.UUID, version: int, user_manager: BaseUserManager) -> Optional[User]:
+    """
+    The user behind a token, from a read replica when one is usable. A
+    replica that hasn't caught up with the token (a new account, or a
+    version bumped since) defers to the primary.
+    """
+    replica = replica_router.pick()
+    if replica is not None:
+        try:
+            async with replica() as session:
+                user = await session.get(User, user_id)
+            if user is not None and user.token_version >= version:
+                return user
+        except Exception as e:
+            print(f"⚠️ Replica user lookup failed, using the primary: {e}")
+
+    try:
+        return await user_manager.get(user_id)
+    except exceptions.UserNotExists:
+        return None
+
+
+def user_snapshot(user: User) -> dict:
+    """Cacheable copy of a user row"""
+    snapshot = {}
+    for column in User.__table__.columns:
+        if column.key not in UNCACHED_FIELDS:
+            value = getattr(user, column.key)
+            snapshot[column.key] = str(value) if isinstance(value, uuid.UUID) else value
+    return snapshot
+
+
+def user_from_snapshot(snapshot: dict) -> User:
+    """
+    Rebuild a user from user_snapshot as a detached persistent instance,
+    so that updating it (e.g. PATCH /users/me) issues an UPDATE
+    """
+    user = User(**{**snapshot, "id": uuid.UUID(snapshot["id"])})
+    make_transient_to_detached(user)
+    return user
 
 
 # User manager
@@ -39,6 +92,21 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     ):
         print(f"Password reset token: {token}")
 
+    async def _update(self, user: User, update_dict: dict[str, Any]) -> User:
+        # Every update path (profile, admin, password reset) ends up here
+        revoke = update_dict.get("password") is not None or any(
+            field in update_dict and update_dict[field] != getattr(user, field)
+            for field in REVOKING_FIELDS
+        )
+        if revoke:
+            update_dict = {**update_dict, "token_version": user.token_version + 1}
+        user = await super()._update(user, update_dict)
+        await evidence_cache.invalidate(user.id)
+        return user
+
+    async def on_after_delete(self, user: User, request: Optional[Request] = None):
+        await evidence_cache.invalidate(user.id)
+
 
 async def get_user_manager(user_db=Depends(get_user_db)):
     yield UserManager(user_db)
@@ -48,8 +116,46 @@ async def get_user_manager(user_db=Depends(get_user_db)):
 bearer_transport = BearerTransport(tokenUrl="auth/jwt/login")
 
 
+class CachedJWTStrategy(JWTStrategy):
+    """
+    JWTs carrying the user's token_version ("ver"). The user behind a
+    token is served from the cache for a few seconds rather than loaded
+    on every request; a token whose version is stale is rejected.
+    """
+
+    async def read_token(self, token: Optional[str], user_manager: UserManager) -> Optional[User]:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(token, self.decode_key, self.token_audience, algorithms=[self.algorithm])
+            user_id = user_manager.parse_id(data["sub"])
+            version = int(data.get("ver", 0))
+        except (jwt.PyJWTError, KeyError, ValueError, exceptions.InvalidID):
+            return None
+
+        cache_name = f"user:{version}"
+        cache_version, snapshot = await evidence_cache.get(user_id, cache_name)
+        if snapshot is not None:
+            return user_from_snapshot(snapshot)
+
+        user = await load_user(user_id, version, user_manager)
+        if user is None or user.token_version != version:
+            return None
+
+        await evidence_cache.set(
+            user_id, cache_version, cache_name, user_snapshot(user),
+            ttl=settings.user_cache_ttl_seconds,
+        )
+        return user
+
+    async def write_token(self, user: User) -> str:
+        data = {"sub": str(user.id), "aud": self.token_audience, "ver": user.token_version}
+        return generate_jwt(data, self.encode_key, self.lifetime_seconds, algorithm=self.algorithm)
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(
+    return CachedJWTStrategy(
         secret=settings.secret_key,
         lifetime_seconds=settings.access_token_expire_minutes * 60,
     )
@@ -66,4 +172,36 @@ fastapi_users = FastAPIUsers[User, uuid.UUID](get_user_manager, [auth_backend])
 
 # Dependencies for routes
 current_active_user = fastapi_users.current_user(active=True)
-current_superuser = fastapi_users.current_user(active=True, superuser=True)
\ No newline at end of file
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
+
+
+async def user_from_request(request: Request) -> Optional[User]:
+    """
+    The active user behind a request's bearer token, resolved outside
+    the dependency system - for code that runs before the body is read
+    (usually a cache hit; the DB is only touched on a miss)
+    """
+    scheme, token = get_authorization_scheme_param(request.headers.get("authorization"))
+    if scheme.lower() != "bearer" or not token:
+        return None
+    async with async_session_maker() as session:
+        user_manager = UserManager(SQLAlchemyUserDatabase(session, User))
+        user = await get_jwt_strategy().read_token(token, user_manager)
+    return user if user is not None and user.is_active else None
+
+
+async def get_read_db(
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Session for read-only routes: a read replica, unless none is within
+    the lag limit or the user wrote in the last few seconds (then the
+    request's own primary session, so they see their own changes)
+    """
+    replica = replica_router.pick()
+    if replica is None or await evidence_cache.wrote_recently(user.id):
+        yield db
+        return
+    async with replica() as session:
+        yield session
\ No newline at end of file
@@ -1,6 +1,7 @@
 """App Configuration - Loads from .env file"""
 
 from functools import lru_cache
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,14 +21,157 @@ class Settings(BaseSettings):
     # Database
     database_url: str
     
+    # Connection pool, per process and per database. Pre-ping costs a
+    # round trip on every checkout; recycling bounds connection age
+    # instead (a dead connection fails one query and resets the pool)
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout_seconds: float = 30.0
+    database_pool_recycle_seconds: int = 1800
+    database_pool_pre_ping: bool = False
+    
+    # Read replicas - read-only routes use one while its replay lag is
+    # within the limit, and the primary otherwise (also for a user who
+    # wrote in the last few seconds, so they read their own writes)
+    database_replica_urls: list[str] = []
+    database_replica_max_lag_seconds: float = 5.0
+    database_replica_check_interval_seconds: float = 2.0
+    
     # Redis
     redis_url: str = "redis://localhost:6379/0"
     
+    # Storage - "local" (disk / Railway Volume) or "s3" (S3/MinIO)
+    storage_backend: str = "local"
+    upload_dir: str = "/app/uploads"
+    # Blobs no evidence references any more are deleted by a sweep
+    blob_gc_interval_seconds: int = 300
+    
     # MinIO/S3
     aws_access_key_id: str = "minioadmin"
     aws_secret_access_key: str = "minioadmin"
     s3_endpoint_url: str = "http://localhost:9000"
     s3_bucket_name: str = "alibi-evidence"
+    s3_region: str = "us-east-1"
+    s3_max_pool_connections: int = 32
+    s3_multipart_threshold_mb: int = 16
+    s3_multipart_chunksize_mb: int = 16
+    s3_multipart_concurrency: int = 8
+    s3_presign_expiry_seconds: int = 3600
+    
+    # Timestamping - RFC 3161 TSA URL; empty uses the local stand-in signer
+    timestamp_tsa_url: str = ""
+    timestamp_batch_max_items: int = 1000
+    timestamp_batch_window_seconds: float = 5.0
+    
+    # Integrity verification - 0 workers means one per CPU
+    verification_workers: int = 0
+    verification_max_age_days: int = 30
+    
+    # Resumable uploads - abandoned sessions are removed after the TTL
+    upload_session_ttl_hours: int = 24
+    upload_session_gc_interval_seconds: int = 900
+    # Where partial files are spooled (default: the storage scratch dir).
+    # Under S3 that's node-local, so sessions stick to the node holding
+    # them (upload_node_id, default the hostname) unless this is shared
+    upload_partial_dir: str = ""
+    upload_node_id: str = ""
+    # An append leases its session for this long, renewed as chunks arrive
+    upload_append_lease_seconds: int = 60
+    
+    # Thumbnails - longest edge in pixels, one derivative per size
+    thumbnail_sizes: list[int] = [256, 1024]
+    thumbnail_format: str = "webp"
+    thumbnail_workers: int = 2
+    
+    # Capture metadata (EXIF/XMP/PDF) - only this much of each file is read
+    metadata_header_bytes: int = 256 * 1024
+    metadata_workers: int = 1
+    
+    # Geo - use PostGIS (if installed) for radius / nearest queries
+    geo_postgis: bool = False
+    
+    # Response cache - "redis" (shared) or "memory" (in-process only);
+    # the TTL must stay well under s3_presign_expiry_seconds
+    cache_backend: str = "redis"
+    cache_ttl_seconds: int = 60
+    cache_local_max_entries: int = 2048
+    user_cache_ttl_seconds: int = 30
+    
+    # Storage quotas by subscription tier (bytes; null = unlimited) and
+    # the background job that corrects drift in storage_used_bytes
+    storage_quota_bytes: dict[str, Optional[int]] = {
+        "free": 1024 ** 3,
+        "pro": 100 * 1024 ** 3,
+        "business": None,
+    }
+    quota_reconcile_interval_seconds: int = 3600
+    quota_reconcile_batch_size: int = 500
+    
+    # Evidence bundle export - base64 Ed25519 seed for manifest signatures
+    # (derived from secret_key when empty - development only)
+    export_signing_key: str = ""
+    export_max_items: int = 10000
+    
+    # Upload admission - bytes/second each user may upload, by tier, and
+    # what all users of a tier may upload together (null = unlimited);
+    # buckets hold burst_seconds worth. Each process also caps upload
+    # bytes in flight; past that, requests queue fairly across users for
+    # up to the timeout, at most queue_per_user each
+    upload_rate_bytes_per_second: dict[str, Optional[int]] = {
+        "free": 2 * 1024 ** 2,
+        "pro": 16 * 1024 ** 2,
+        "business": None,
+    }
+    upload_tier_rate_bytes_per_second: dict[str, Optional[int]] = {
+        "free": 64 * 1024 ** 2,
+        "pro": None,
+        "business": None,
+    }
+    upload_burst_seconds: float = 30.0
+    upload_inflight_bytes: int = 256 * 1024 ** 2
+    upload_queue_timeout_seconds: float = 10.0
+    upload_queue_per_user: int = 4
+    
+    # Batch uploads - files per request, and how many spool at once
+    batch_upload_max_files: int = 500
+    batch_upload_concurrency: int = 8
+    
+    # Delta sync - how long deletes stay visible to syncing clients
+    sync_tombstone_ttl_days: int = 90
+    sync_tombstone_purge_interval_seconds: int = 3600
+    
+    # Background jobs - queued in Redis, or in a Postgres table with
+    # JOB_BACKEND=postgres. Turn JOB_WORKERS_IN_APP off when running
+    # separate workers (python -m app.worker)
+    job_backend: str = "redis"
+    job_workers_in_app: bool = True
+    job_concurrency: dict[str, int] = {"metadata": 4, "thumbnails": 2}
+    job_max_attempts: int = 5
+    job_lease_seconds: int = 300
+    job_poll_interval_seconds: float = 1.0
+    job_failed_retention_days: int = 7
+    # How often workers relay stranded Redis outbox rows / purge old
+    # failed jobs; outbox rows younger than this are left to publish()
+    job_maintenance_interval_seconds: int = 60
+    
+    # Audit log - how often new entries are chained, and how often a
+    # signed checkpoint (tree head) is published
+    audit_sequence_interval_seconds: float = 1.0
+    audit_batch_size: int = 5000
+    audit_checkpoint_interval_seconds: int = 300
+    
+    # Readiness - /health/ready reports ready once this many pooled DB
+    # connections are open, storage answers and the schema is migrated
+    readiness_warm_connections: int = 2
+    readiness_retry_seconds: float = 2.0
+    
+    # Observability - per-statement SQL logging, optional OpenTelemetry
+    # tracing (exported via OTEL_EXPORTER_OTLP_*), and a bearer token
+    # /metrics requires when set
+    database_echo: bool = False
+    tracing_enabled: bool = False
+    tracing_service_name: str = "alibi-api"
+    metrics_token: str = ""
     
     # JWT
     access_token_expire_minutes: int = 30
@@ -1,23 +1,77 @@
-"""Database Connection - Async PostgreSQL"""
+"""Database Connection - Async PostgreSQL, with optional read replicas"""
 
+import time
+import asyncio
+import itertools
+from typing import Optional
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import get_settings
+from app.core.metrics import DB_POOL_WAIT_SECONDS, DB_REPLICA_LAG_SECONDS, instrument_engine
 
 settings = get_settings()
 
-# Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
+# Where the primary's WAL ends; a standby that has replayed up to it is current
+PRIMARY_LSN = text("SELECT pg_current_wal_lsn()::text")
+
+# Seconds a standby is behind, or NULL if it isn't streaming from the
+# primary (its last replay could be arbitrarily old). 0 once it has
+# replayed up to the primary's LSN - or, if that couldn't be read, all
+# it has received - since an idle primary would otherwise look like
+# growing lag. Without pg_read_all_stats the receiver's status reads as
+# NULL, so only a running receiver process is required then.
+REPLICA_LAG = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE COALESCE(status, 'streaming') = 'streaming') "
+    "THEN NULL "
+    "WHEN pg_last_wal_replay_lsn() >= COALESCE(CAST(CAST(:primary_lsn AS text) AS pg_lsn), pg_last_wal_receive_lsn()) THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END"
 )
 
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each connection checkout waits"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """An instrumented engine with the configured pool"""
+    engine = create_async_engine(
+        url,
+        # SQL logging is opt-in (DATABASE_ECHO), not tied to DEBUG: it
+        # logs every statement
+        echo=settings.database_echo,
+        poolclass=TimedQueuePool,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout_seconds,
+        pool_recycle=settings.database_pool_recycle_seconds,
+        pool_pre_ping=settings.database_pool_pre_ping,
+    )
+    instrument_engine(engine, name)
+    return engine
+
+
+# Primary - all writes, and reads that must be current
+engine = create_engine(settings.database_url, "primary")
+
 # Session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -44,7 +98,110 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
-async def init_db():
-    """Create all tables"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+class ReplicaRouter:
+    """
+    Picks a read replica for read-only work. A background check measures
+    each replica's replay lag; only those within max_lag are handed out
+    (round robin), so with none configured, none healthy or none checked
+    yet everything stays on the primary.
+    """
+
+    def __init__(self, urls: list[str], max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.engines = [create_engine(url, f"replica{index}") for index, url in enumerate(urls)]
+        self.replicas = [
+            (f"replica{index}", async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False))
+            for index, replica in enumerate(self.engines)
+        ]
+        self._healthy: list[async_sessionmaker] = []
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return bool(self._healthy)
+
+    @property
+    def window_seconds(self) -> float:
+        """How long after a write a user's reads stay on the primary: the
+        most a replica in use can lag, plus the time until it's rechecked"""
+        return self.max_lag + self.check_interval
+
+    def pick(self) -> Optional[async_sessionmaker]:
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    async def primary_lsn(self) -> Optional[str]:
+        async with engine.connect() as conn:
+            return (await conn.execute(PRIMARY_LSN)).scalar_one()
+
+    async def lag(self, maker: async_sessionmaker, primary_lsn: Optional[str] = None) -> Optional[float]:
+        """Seconds behind, None if the replica isn't streaming"""
+        async with maker() as session:
+            lag = (await session.execute(REPLICA_LAG, {"primary_lsn": primary_lsn})).scalar_one()
+        return None if lag is None else float(lag)
+
+    async def check(self) -> None:
+        try:
+            primary_lsn = await asyncio.wait_for(self.primary_lsn(), timeout=self.check_interval)
+        except Exception:
+            primary_lsn = None
+
+        async def measure(name, maker):
+            try:
+                lag = await asyncio.wait_for(self.lag(maker, primary_lsn), timeout=self.check_interval)
+            except Exception as e:
+                DB_REPLICA_LAG_SECONDS.labels(name).set(-1)
+                if maker in self._healthy:
+                    print(f"⚠️ Replica {name} unreachable ({e}), reading from the primary")
+                return None
+            if lag is None:
+                DB_REPLICA_LAG_SECONDS.labels(name).set(-1)
+                if maker in self._healthy:
+                    print(f"⚠️ Replica {name} isn't streaming WAL, reading from the primary")
+                return None
+            DB_REPLICA_LAG_SECONDS.labels(name).set(lag)
+            if lag > self.max_lag and maker in self._healthy:
+                print(f"⚠️ Replica {name} is {lag:.1f}s behind, reading from the primary")
+            return lag
+
+        lags = await asyncio.gather(*(measure(name, maker) for name, maker in self.replicas))
+        self._healthy = [
+            maker for (name, maker), lag in zip(self.replicas, lags)
+            if lag is not None and lag <= self.max_lag
+        ]
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"⚠️ Replica check failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self.replicas:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._healthy = []
+        for replica in self.engines:
+            await replica.dispose()
+
+
+# Global instance
+replica_router = ReplicaRouter(
+    settings.database_replica_urls,
+    max_lag=settings.database_replica_max_lag_seconds,
+    check_interval=settings.database_replica_check_interval_seconds,
+)
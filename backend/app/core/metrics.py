@@ -0,0 +1,205 @@
+"""
+Prometheus metrics for the hot paths
+
+Request latency per route, SQL statements per request and their
+timings, connection pool checkout waits, upload and hashing throughput,
+storage I/O timings, background job timings and queue depths. Served
+on /metrics (see app.api.routes.metrics).
+"""
+
+import time
+import inspect
+import functools
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.tracing import end_span, span, start_span
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUEST_SECONDS = Histogram(
+    "alibi_http_request_duration_seconds",
+    "Time to the end of the response body",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge("alibi_http_requests_in_progress", "Requests being handled")
+REQUEST_QUERIES = Histogram(
+    "alibi_http_request_db_queries",
+    "SQL statements executed per request",
+    ["method", "route"],
+    buckets=QUERY_BUCKETS,
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "alibi_db_query_duration_seconds",
+    "SQL statement execution time",
+    ["database"],
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "alibi_db_pool_checkout_wait_seconds",
+    "Time waiting for a pooled connection (including connecting)",
+)
+DB_POOL_CHECKED_OUT = Gauge("alibi_db_pool_checked_out", "Connections currently checked out", ["database"])
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "alibi_db_replica_lag_seconds",
+    "Replay lag per read replica (-1 = unreachable or not streaming)",
+    ["database"],
+)
+
+UPLOAD_BYTES = Counter("alibi_upload_bytes_total", "Bytes received in uploads")
+UPLOAD_ADMISSION = Counter(
+    "alibi_upload_admission_total",
+    "Upload admission decisions",
+    ["outcome"],
+)
+UPLOAD_QUEUE_SECONDS = Histogram(
+    "alibi_upload_queue_wait_seconds",
+    "Time admitted uploads waited for the in-flight byte budget",
+    buckets=LATENCY_BUCKETS,
+)
+UPLOAD_IN_FLIGHT_BYTES = Gauge("alibi_upload_in_flight_bytes", "Upload bytes admitted and not yet finished")
+HASHED_BYTES = Counter("alibi_hashed_bytes_total", "Bytes run through the content hasher")
+HASH_SECONDS = Counter("alibi_hash_seconds_total", "Time spent hashing (bytes / seconds = throughput)")
+
+STORAGE_SECONDS = Histogram(
+    "alibi_storage_operation_duration_seconds",
+    "Storage call time (streams: until fully read)",
+    ["backend", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+JOB_SECONDS = Histogram(
+    "alibi_job_duration_seconds",
+    "Background job run time",
+    ["type", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+QUEUE_DEPTH = Gauge("alibi_queue_depth", "Items waiting in background queues", ["queue", "state"])
+
+# Per-request SQL statement counter, shared with tasks the request spawns
+_request_queries: ContextVar[Optional[list[int]]] = ContextVar("alibi_request_queries", default=None)
+
+
+class MetricsMiddleware:
+    """
+    Times each request until its body is fully sent and counts its SQL
+    statements. Plain ASGI, so streamed responses aren't buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        queries = [0]
+        token = _request_queries.set(queries)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        with span(f"HTTP {method}") as current:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                REQUESTS_IN_PROGRESS.dec()
+                _request_queries.reset(token)
+
+                # The route template, never the raw path (unbounded labels)
+                route = scope.get("route")
+                path = getattr(route, "path", None) or "unmatched"
+                REQUEST_SECONDS.labels(method, path, str(status)).observe(time.perf_counter() - started)
+                REQUEST_QUERIES.labels(method, path).observe(queries[0])
+                if current is not None:
+                    current.update_name(f"{method} {path}")
+                    current.set_attribute("http.status_code", status)
+                    current.set_attribute("db.statements", queries[0])
+
+
+def instrument_engine(engine, name: str = "primary") -> None:
+    """Count, time and trace every SQL statement an engine executes"""
+    from sqlalchemy import event
+
+    sync_engine = engine.sync_engine
+    query_seconds = DB_QUERY_SECONDS.labels(name)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+        current = start_span("db.query", **{"db.statement": statement[:1000], "db.name": name})
+        conn.info.setdefault("alibi_queries", []).append((time.perf_counter(), current))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started, current = conn.info["alibi_queries"].pop()
+        query_seconds.observe(time.perf_counter() - started)
+        end_span(current)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context):
+        stack = context.connection.info.get("alibi_queries") if context.connection else None
+        if stack:
+            started, current = stack.pop()
+            query_seconds.observe(time.perf_counter() - started)
+            end_span(current, context.original_exception)
+
+    # Only queue pools track checkouts
+    if hasattr(sync_engine.pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.labels(name).set_function(sync_engine.pool.checkedout)
+
+
+def observe_hashing(size: int, seconds: float) -> None:
+    HASHED_BYTES.inc(size)
+    HASH_SECONDS.inc(seconds)
+
+
+def instrument_storage(func):
+    """
+    Time and trace a storage method (coroutine or async generator),
+    labelled with the owner's `name`
+    """
+    operation = func.__name__
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def stream(self, *args, **kwargs):
+            # Not made current: the consumer runs between our yields
+            current = start_span(f"storage.{operation}", backend=self.name)
+            started = time.perf_counter()
+            error = None
+            try:
+                async for chunk in func(self, *args, **kwargs):
+                    yield chunk
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                STORAGE_SECONDS.labels(self.name, operation).observe(time.perf_counter() - started)
+                end_span(current, error)
+        return stream
+
+    @functools.wraps(func)
+    async def call(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with span(f"storage.{operation}", backend=self.name):
+                return await func(self, *args, **kwargs)
+        finally:
+            STORAGE_SECONDS.labels(self.name, operation).observe(time.perf_counter() - started)
+
+    return call
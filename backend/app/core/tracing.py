@@ -0,0 +1,60 @@
+"""
+Optional span-based tracing (OpenTelemetry)
+
+Off unless TRACING_ENABLED is set and opentelemetry-sdk plus the OTLP
+exporter are installed; spans are then exported via the standard
+OTEL_EXPORTER_OTLP_* environment variables. When off, span() costs
+next to nothing.
+"""
+
+from contextlib import contextmanager
+from typing import Optional
+
+from app.core.config import Settings
+
+_tracer = None
+
+
+def setup_tracing(settings: Settings) -> None:
+    global _tracer
+    if not settings.tracing_enabled or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        print("⚠️ TRACING_ENABLED is set but opentelemetry-sdk / the OTLP exporter aren't installed")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.tracing_service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("alibi")
+
+
+def start_span(name: str, **attributes):
+    """A span that is NOT made current - end() it yourself. None when tracing is off."""
+    if _tracer is None:
+        return None
+    return _tracer.start_span(name, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Span around a block, current for anything started inside it"""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def end_span(current: Optional[object], error: Optional[BaseException] = None) -> None:
+    if current is None:
+        return
+    if error is not None:
+        current.record_exception(error)
+    current.end()
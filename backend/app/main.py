@@ -6,30 +6,71 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
-from app.core.database import engine, Base
+from app.core.database import engine, replica_router
 from app.core.auth import fastapi_users, auth_backend
+from app.core.metrics import MetricsMiddleware
+from app.core.tracing import setup_tracing
 from app.schemas.user import UserRead, UserCreate, UserUpdate
+from app.services.admission import upload_admission
+from app.services.audit import audit_log
+from app.services.cache import evidence_cache
+from app.services.jobs import job_queue, job_worker
+from app.services.metadata import metadata_extractor
+from app.services.quota import quota_reconciler
+from app.services.readiness import readiness
 from app.services.storage import storage_service
-from app.api.routes import evidence
+from app.services.sync import tombstone_purger
+from app.services.thumbnails import thumbnail_service
+from app.services.timestamping import timestamp_batcher
+from app.services.uploads import resumable_uploads
+from app.api.routes import evidence, uploads, geo, exports, sync, audit, metrics, health, admin
 
 settings = get_settings()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup and shutdown"""
+    """
+    Startup and shutdown. No I/O on the way up - the schema comes from
+    migrations (alembic upgrade head), and connections, the bucket and
+    Redis are warmed in the background (see /health/ready)
+    """
     print("🚀 Starting Alibi...")
+    setup_tracing(settings)
     
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    print("✅ Database tables created")
+    readiness.start()
+    replica_router.start()
     
-    await storage_service.ensure_bucket_exists()
-    print("✅ Storage bucket ready")
+    await timestamp_batcher.start()
+    print("✅ Timestamp batcher running")
+    
+    resumable_uploads.start_gc()
+    storage_service.start_gc()
+    quota_reconciler.start()
+    tombstone_purger.start()
+    audit_log.start()
+    
+    if settings.job_workers_in_app:
+        job_worker.start()
+        print("✅ Job workers running")
     
     yield
     
     print("👋 Shutting down Alibi...")
+    await readiness.stop()
+    await replica_router.stop()
+    await resumable_uploads.stop_gc()
+    await storage_service.stop_gc()
+    await quota_reconciler.stop()
+    await tombstone_purger.stop()
+    await audit_log.stop()
+    await job_worker.stop()
+    await thumbnail_service.shutdown()
+    metadata_extractor.shutdown()
+    await timestamp_batcher.stop()
+    await evidence_cache.close()
+    await upload_admission.close()
+    await job_queue.backend.close()
     await engine.dispose()
 
 
@@ -55,6 +96,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics - added last so it wraps everything, CORS included
+app.add_middleware(MetricsMiddleware)
+
 # Auth routes
 app.include_router(
     fastapi_users.get_auth_router(auth_backend),
@@ -72,9 +116,23 @@ app.include_router(
     tags=["Users"],
 )
 
-# Evidence routes
+# Evidence routes (sub-paths first - /evidence/uploads/..., /evidence/geo/...)
+app.include_router(uploads.router)
+app.include_router(geo.router)
+app.include_router(exports.router)
+app.include_router(sync.router)
+app.include_router(audit.router)
 app.include_router(evidence.router)
 
+# Admin routes
+app.include_router(admin.router)
+
+# Prometheus scrape endpoint
+app.include_router(metrics.router)
+
+# Liveness / readiness probes
+app.include_router(health.router)
+
 
 @app.get("/")
 async def root():
@@ -0,0 +1,141 @@
+"""Audit Models - Append-only, hash-chained record of evidence history"""
+
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from sqlalchemy import BigInteger, SmallInteger, String, Text, DateTime, Identity, Index, LargeBinary, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class AuditEntry(Base):
+    """
+    One event (evidence created, deleted, exported). Inserted in the
+    same transaction as the event itself; the sequencer later gives it
+    its place in the log (seq) and chains it to the entry before it.
+    Never updated after that, never deleted.
+    """
+
+    __tablename__ = "audit_log"
+    __table_args__ = (
+        Index("ix_audit_log_user_seq", "user_id", "seq"),
+        # Entries waiting for the sequencer
+        Index("ix_audit_log_pending", "id", postgresql_where="seq IS NULL"),
+    )
+
+    # Insertion order only - the log order is seq
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        Identity(),
+        primary_key=True
+    )
+
+    seq: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        unique=True,
+        nullable=True
+    )
+
+    # No foreign keys: the history outlives the user and the items
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False
+    )
+
+    # evidence.create, evidence.delete, evidence.export
+    action: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False
+    )
+
+    evidence_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True
+    )
+
+    details: Mapped[dict] = mapped_column(
+        JSONB,
+        nullable=False,
+        default=dict
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    # Hex SHA-256; entry_hash = H(prev_hash || canonical entry)
+    prev_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+    entry_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+
+class AuditNode(Base):
+    """
+    Hash of a complete subtree of the Merkle tree over entry hashes:
+    leaves [index * 2^level, (index + 1) * 2^level). Any root or proof
+    is assembled from O(log n) of these.
+    """
+
+    __tablename__ = "audit_nodes"
+
+    level: Mapped[int] = mapped_column(
+        SmallInteger,
+        primary_key=True
+    )
+
+    index: Mapped[int] = mapped_column(
+        BigInteger,
+        primary_key=True
+    )
+
+    hash: Mapped[bytes] = mapped_column(
+        LargeBinary(32),
+        nullable=False
+    )
+
+
+class AuditCheckpoint(Base):
+    """Signed tree head: the Merkle root and chain head at a log size"""
+
+    __tablename__ = "audit_checkpoints"
+
+    tree_size: Mapped[int] = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False
+    )
+
+    root_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False
+    )
+
+    head_hash: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False
+    )
+
+    key_id: Mapped[str] = mapped_column(
+        String(32),
+        nullable=False
+    )
+
+    signature: Mapped[str] = mapped_column(
+        Text,
+        nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
@@ -0,0 +1,51 @@
+"""Blob Model - Content-addressed file storage"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, BigInteger, Integer, DateTime, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class Blob(Base):
+    """
+    One stored file, keyed by its SHA-256 content hash.
+    Evidence items with the same content share a blob; ref_count
+    tracks how many of them point at it.
+    """
+
+    __tablename__ = "blobs"
+    __table_args__ = (
+        # Blobs waiting for the garbage collector
+        Index("ix_blobs_unreferenced", "content_hash", postgresql_where="ref_count <= 0"),
+    )
+
+    content_hash: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True
+    )
+
+    size_bytes: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False
+    )
+
+    # CRC-32 of the content, as ZIP needs it; filled in lazily for
+    # blobs stored before it was recorded
+    crc32: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
+        nullable=True
+    )
+
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=1
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
@@ -4,12 +4,17 @@ from datetime import datetime
 from typing import Optional
 import uuid
 
-from sqlalchemy import String, Text, DateTime, Numeric, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import (
+    DDL, BigInteger, String, Text, DateTime, Integer, Numeric, ForeignKey, Index, Computed, event, func, text
+)
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
 
+# Id of the writing transaction (xid8 as bigint) - see app.services.sync
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
 
 class EvidenceItem(Base):
     """
@@ -18,6 +23,17 @@ class EvidenceItem(Base):
     """
     
     __tablename__ = "evidence_items"
+    __table_args__ = (
+        # Serves the keyset-paginated listing: newest first per user
+        Index("ix_evidence_items_user_captured", "user_id", "captured_at", "id"),
+        # Full-text search and tag filters
+        Index("ix_evidence_items_search", "search_vector", postgresql_using="gin"),
+        Index("ix_evidence_items_tags", "tags", postgresql_using="gin"),
+        # Spatial queries - geohash cells are contiguous key ranges
+        Index("ix_evidence_items_user_geohash", "user_id", "geohash"),
+        # Delta sync - changes per user in transaction order
+        Index("ix_evidence_items_user_change", "user_id", "change_xid", "id"),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -45,6 +61,7 @@ class EvidenceItem(Base):
     )
     
     file_size_bytes: Mapped[Optional[int]] = mapped_column(
+        BigInteger,
         nullable=True
     )
     
@@ -69,6 +86,25 @@ class EvidenceItem(Base):
         nullable=True
     )
     
+    # Generated preview sizes (longest edge, px) - see services/thumbnails.py
+    thumbnail_sizes: Mapped[Optional[list[int]]] = mapped_column(
+        ARRAY(Integer),
+        nullable=True
+    )
+    
+    # Search document: title (A) > description (B) > tags (C), kept in
+    # sync by Postgres itself
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('english', alibi_tags_text(tags)), 'C')",
+            persisted=True,
+        ),
+        deferred=True
+    )
+    
     # Location
     latitude: Mapped[Optional[float]] = mapped_column(
         Numeric(10, 8),
@@ -85,6 +121,12 @@ class EvidenceItem(Base):
         nullable=True
     )
     
+    # Geohash of (latitude, longitude) - C collation so prefixes are ranges
+    geohash: Mapped[Optional[str]] = mapped_column(
+        String(12, collation="C"),
+        nullable=True
+    )
+    
     # Timestamps
     captured_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -116,4 +158,62 @@ class EvidenceItem(Base):
     timestamped_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True),
         nullable=True
-    )
\ No newline at end of file
+    )
+    
+    # INTEGRITY - last time the stored blob was re-hashed and proof checked
+    last_verified_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        index=True
+    )
+    
+    # ok, mismatch, missing, bad_proof
+    integrity_status: Mapped[Optional[str]] = mapped_column(
+        String(20),
+        nullable=True
+    )
+    
+    # CHANGE TRACKING - set on insert and every update, except integrity
+    # checks (app.services.verification pins both columns explicitly)
+    change_xid: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=text(CURRENT_XID),
+        onupdate=text(CURRENT_XID),
+        nullable=False
+    )
+    
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+
+# array_to_string() isn't IMMUTABLE, so generated columns can't call it
+# directly - this wrapper is (tags are plain text, so it's safe). Both
+# DDL hooks here only serve create_all(); the migrations do the same.
+event.listen(
+    EvidenceItem.__table__,
+    "before_create",
+    DDL(
+        "CREATE OR REPLACE FUNCTION alibi_tags_text(text[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE "
+        "AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+# With PostGIS installed, also index the point geography (GiST) for
+# radius / nearest queries. A no-op on stock Postgres.
+event.listen(
+    EvidenceItem.__table__,
+    "after_create",
+    DDL(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis') THEN "
+        "CREATE INDEX IF NOT EXISTS ix_evidence_items_geography ON evidence_items USING gist "
+        "(geography(ST_SetSRID(ST_MakePoint(CAST(longitude AS FLOAT), CAST(latitude AS FLOAT)), 4326))) "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL; "
+        "END IF; END $$"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,104 @@
+"""Job Models - Durable background work (Postgres job backend, Redis outbox)"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Text, Integer, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class JobRow(Base):
+    """
+    One queued job. The id is its idempotency key, so enqueueing the
+    same work twice is a no-op while the first is pending. Workers claim
+    rows with FOR UPDATE SKIP LOCKED; finished jobs are deleted, failed
+    ones after job_failed_retention_days.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_claim", "type", "status", "run_at"),
+    )
+
+    id: Mapped[str] = mapped_column(
+        String(200),
+        primary_key=True
+    )
+
+    type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False
+    )
+
+    payload: Mapped[dict] = mapped_column(
+        JSONB,
+        nullable=False
+    )
+
+    # queued, running, failed
+    status: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        default="queued"
+    )
+
+    attempts: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0
+    )
+
+    run_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    # A running job whose lease has passed is up for grabs again
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    last_error: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+
+class JobOutboxRow(Base):
+    """
+    A job for the Redis backend, written in the transaction that creates
+    the work and deleted once the job is in Redis. Rows left behind (a
+    crash or Redis outage after commit) are relayed by the workers.
+    """
+
+    __tablename__ = "job_outbox"
+
+    id: Mapped[str] = mapped_column(
+        String(200),
+        primary_key=True
+    )
+
+    type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False
+    )
+
+    payload: Mapped[dict] = mapped_column(
+        JSONB,
+        nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True
+    )
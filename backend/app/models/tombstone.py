@@ -0,0 +1,47 @@
+"""Tombstone Model - Deleted evidence, kept for delta sync"""
+
+from datetime import datetime
+import uuid
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+from app.models.evidence import CURRENT_XID
+
+
+class EvidenceTombstone(Base):
+    """
+    Marks an evidence item as deleted so syncing clients can drop it.
+    Purged after sync_tombstone_ttl_days; older sync tokens must resync.
+    """
+
+    __tablename__ = "evidence_tombstones"
+    __table_args__ = (
+        Index("ix_evidence_tombstones_user_change", "user_id", "change_xid", "id"),
+    )
+
+    # The deleted EvidenceItem's id
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    change_xid: Mapped[int] = mapped_column(
+        BigInteger,
+        server_default=text(CURRENT_XID),
+        nullable=False
+    )
+
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True
+    )
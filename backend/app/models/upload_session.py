@@ -0,0 +1,107 @@
+"""Upload Session Model - Resumable uploads in progress"""
+
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from sqlalchemy import String, Text, BigInteger, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class UploadSession(Base):
+    """
+    A resumable upload: the client declares the file up front, appends
+    it in chunks at `offset`, and completes it into an EvidenceItem
+    """
+
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+
+    # What the evidence item will look like once complete
+    filename: Mapped[Optional[str]] = mapped_column(
+        String(255),
+        nullable=True
+    )
+
+    content_type: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False
+    )
+
+    item_type: Mapped[str] = mapped_column(
+        String(50),
+        nullable=False
+    )
+
+    title: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False
+    )
+
+    description: Mapped[Optional[str]] = mapped_column(
+        Text,
+        nullable=True
+    )
+
+    # Progress
+    total_size: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False
+    )
+
+    offset: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0
+    )
+
+    # Node holding the partial file, when partial files are node-local
+    node: Mapped[Optional[str]] = mapped_column(
+        String(255),
+        nullable=True
+    )
+
+    # Held by the append streaming into the partial file, instead of a
+    # row lock; renewed as chunks arrive, free once lease_until passes
+    lease_token: Mapped[Optional[str]] = mapped_column(
+        String(32),
+        nullable=True
+    )
+
+    lease_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True
+    )
+
+    # SHA-256 the client says the finished file has, checked on complete
+    expected_hash: Mapped[Optional[str]] = mapped_column(
+        String(64),
+        nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True
+    )
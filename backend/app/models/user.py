@@ -1,7 +1,7 @@
 """User Model - Using FastAPI-Users"""
 
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID
-from sqlalchemy import String, Boolean
+from sqlalchemy import BigInteger, String, Boolean, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
@@ -23,11 +23,22 @@ class User(SQLAlchemyBaseUserTableUUID, Base):
         default="free"
     )
     
+    # Running total kept by app.services.quota
     storage_used_bytes: Mapped[int] = mapped_column(
-        default=0
+        BigInteger,
+        default=0,
+        server_default="0"
     )
     
     is_verified: Mapped[bool] = mapped_column(
         Boolean,
         default=False
-    )
\ No newline at end of file
+    )
+    
+    # Bumped on password/email/activation changes; tokens carry the
+    # version they were issued at and stop working once it moves on
+    token_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0"
+    )
@@ -41,8 +41,18 @@ class EvidenceResponse(BaseModel):
 
 
 class EvidenceList(BaseModel):
-    """List of evidence items"""
+    """One page of evidence items"""
     items: list[EvidenceResponse]
-    total: int
-    page: int
-    has_more: bool
\ No newline at end of file
+    has_more: bool
+    next_cursor: Optional[str] = None
+
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable upload"""
+    filename: Optional[str] = Field(None, max_length=255)
+    content_type: str = Field("application/octet-stream", max_length=100)
+    item_type: str = Field("photo", pattern="^(photo|document|note|receipt|location)$")
+    title: str = Field(..., max_length=255)
+    description: Optional[str] = Field(None, max_length=10000)
+    total_size: int = Field(..., gt=0)
+    content_hash: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")
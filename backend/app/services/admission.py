@@ -0,0 +1,320 @@
+"""
+Upload admission control
+
+Uploads are admitted before their body is read, in two steps:
+
+1. Rate: token buckets refilled in bytes per second - one per user and
+   one shared by everyone on the same subscription tier - are charged
+   the request's Content-Length (which admitted routes require, so
+   every upload is charged what it actually sends). Buckets live in Redis (one atomic
+   script for both), so limits hold across processes; if Redis is
+   unreachable each process falls back to local buckets. A bucket may
+   go into debt for a file bigger than itself, which later uploads pay
+   off, so large files are slowed rather than refused outright.
+   Requests turned away by the next step get their tokens back.
+2. Budget: each process lets at most upload_inflight_bytes of uploads
+   run at once. Past that, requests wait in per-user queues served
+   round robin, so one client pushing many large files can't starve
+   everyone else's uploads (or the disk every other request needs).
+
+Either step turns a request away with a Retry-After instead of letting
+work pile up: 429 when the user is over their rate or already has
+queue_per_user requests waiting, 503 when the process is too busy to
+start the upload within upload_queue_timeout_seconds.
+"""
+
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from uuid import UUID
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import UPLOAD_ADMISSION, UPLOAD_IN_FLIGHT_BYTES, UPLOAD_QUEUE_SECONDS
+
+PREFIX = "alibi:rate:upload"
+
+# KEYS: buckets; ARGV: cost, then rate (bytes/s) and capacity per bucket.
+# Returns 0 and charges every bucket, or the milliseconds until all of
+# them could cover the cost (capped at their capacity) and charges none.
+TAKE = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local capacity = tonumber(ARGV[i * 2 + 1])
+  local bucket = redis.call('HMGET', key, 'tokens', 'at')
+  local tokens = tonumber(bucket[1]) or capacity
+  local at = tonumber(bucket[2]) or now
+  tokens = math.min(capacity, tokens + math.max(0, now - at) * rate / 1000)
+  levels[i] = tokens
+  local needed = math.min(cost, capacity)
+  if tokens < needed then
+    wait = math.max(wait, (needed - tokens) * 1000 / rate)
+  end
+end
+if wait > 0 then
+  return math.ceil(wait)
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local capacity = tonumber(ARGV[i * 2 + 1])
+  redis.call('HSET', key, 'tokens', levels[i] - cost, 'at', now)
+  redis.call('PEXPIRE', key, math.ceil((capacity + cost) * 1000 / rate))
+end
+return 0
+"""
+
+# KEYS: buckets; ARGV: cost, then rate (bytes/s) and capacity per bucket.
+# Gives back what TAKE charged, refilling first so nothing is counted twice.
+REFUND = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local cost = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local capacity = tonumber(ARGV[i * 2 + 1])
+  local bucket = redis.call('HMGET', key, 'tokens', 'at')
+  if bucket[1] then
+    local at = tonumber(bucket[2]) or now
+    local tokens = math.min(capacity, tonumber(bucket[1]) + math.max(0, now - at) * rate / 1000)
+    redis.call('HSET', key, 'tokens', math.min(capacity, tokens + cost), 'at', now)
+  end
+end
+return 0
+"""
+
+
+class AdmissionRejected(Exception):
+    """The upload can't be admitted now; try again after retry_after seconds"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Upload not admitted: {reason}")
+
+
+class LocalBuckets:
+    """In-process stand-in for the Redis buckets, same arithmetic"""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, buckets: list[tuple[str, float, float]], cost: int) -> float:
+        now = time.monotonic()
+        levels = []
+        wait = 0.0
+        for key, rate, capacity in buckets:
+            tokens, at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - at) * rate)
+            levels.append(tokens)
+            needed = min(cost, capacity)
+            if tokens < needed:
+                wait = max(wait, (needed - tokens) / rate)
+        if wait > 0:
+            return wait
+        for (key, rate, capacity), tokens in zip(buckets, levels):
+            self._buckets[key] = (tokens - cost, now)
+        return 0.0
+
+    def refund(self, buckets: list[tuple[str, float, float]], cost: int) -> None:
+        now = time.monotonic()
+        for key, rate, capacity in buckets:
+            if key in self._buckets:
+                tokens, at = self._buckets[key]
+                tokens = min(capacity, tokens + (now - at) * rate)
+                self._buckets[key] = (min(capacity, tokens + cost), now)
+
+
+class FairByteBudget:
+    """
+    Bytes of uploads in flight, capped. Waiters queue per user and users
+    are served round robin; a request bigger than the whole budget is
+    let through alone.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self._queues: "OrderedDict[str, deque[tuple[int, asyncio.Future]]]" = OrderedDict()
+
+    def waiting(self, user_key: str) -> int:
+        return len(self._queues.get(user_key, ()))
+
+    async def acquire(self, user_key: str, size: int, timeout: float) -> int:
+        """Reserve size bytes (returned, to pass to release); TimeoutError if it takes too long"""
+        size = min(size, self.capacity)
+        if not self._queues and self.in_flight + size <= self.capacity:
+            self._grant(size)
+            return size
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (size, future)
+        self._queues.setdefault(user_key, deque()).append(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up
+                self.release(size)
+            else:
+                queue = self._queues.get(user_key)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[user_key]
+                # It may have been holding up the line
+                self._dispatch()
+            raise
+        return size
+
+    def release(self, size: int) -> None:
+        self.in_flight -= size
+        UPLOAD_IN_FLIGHT_BYTES.set(self.in_flight)
+        self._dispatch()
+
+    def _grant(self, size: int) -> None:
+        self.in_flight += size
+        UPLOAD_IN_FLIGHT_BYTES.set(self.in_flight)
+
+    def _dispatch(self) -> None:
+        while self._queues:
+            user_key, queue = next(iter(self._queues.items()))
+            size, future = queue[0]
+            if self.in_flight + size > self.capacity:
+                return
+            queue.popleft()
+            # This user goes to the back of the line
+            del self._queues[user_key]
+            if queue:
+                self._queues[user_key] = queue
+            self._grant(size)
+            future.set_result(None)
+
+
+class UploadAdmission:
+    """Rate limits and the in-flight budget, applied per upload request"""
+
+    def __init__(self, settings: Settings, redis_url: Optional[str]):
+        self.settings = settings
+        self.redis_url = redis_url
+        self.budget = FairByteBudget(settings.upload_inflight_bytes)
+        self.local = LocalBuckets()
+        self._redis = None
+        self._take = None
+        self._refund = None
+        self._down_until = 0.0
+
+    @property
+    def redis(self):
+        if not self.redis_url or time.monotonic() < self._down_until:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(
+                self.redis_url,
+                socket_connect_timeout=0.25,
+                socket_timeout=0.25,
+                health_check_interval=30,
+            )
+            self._take = self._redis.register_script(TAKE)
+            self._refund = self._redis.register_script(REFUND)
+        return self._redis
+
+    def buckets(self, user_id: UUID, tier: Optional[str]) -> list[tuple[str, float, float]]:
+        """(key, rate, capacity) of each limit that applies; unknown tiers get free's"""
+        tier = tier or "free"
+        buckets = []
+        for scope, rates in (
+            (f"user:{user_id}", self.settings.upload_rate_bytes_per_second),
+            (f"tier:{tier}", self.settings.upload_tier_rate_bytes_per_second),
+        ):
+            rate = rates.get(tier, rates.get("free"))
+            if rate:
+                buckets.append((f"{PREFIX}:{scope}", rate, rate * self.settings.upload_burst_seconds))
+        return buckets
+
+    async def take(self, buckets: list[tuple[str, float, float]], cost: int) -> float:
+        """Charge the buckets; seconds to wait first if they can't cover it yet"""
+        if not buckets:
+            return 0.0
+        client = self.redis
+        if client is not None:
+            try:
+                args = [cost]
+                for key, rate, capacity in buckets:
+                    args += [rate, capacity]
+                wait_ms = await self._take(keys=[key for key, _, _ in buckets], args=args)
+                return int(wait_ms) / 1000
+            except Exception as e:
+                print(f"⚠️ Upload rate limits: Redis unavailable ({e}), using local buckets for 30s")
+                self._down_until = time.monotonic() + 30.0
+        return self.local.take(buckets, cost)
+
+    async def refund(self, buckets: list[tuple[str, float, float]], cost: int) -> None:
+        """Give back a charge for an upload that was turned away after all"""
+        if not buckets:
+            return
+        client = self.redis
+        if client is not None:
+            try:
+                args = [cost]
+                for key, rate, capacity in buckets:
+                    args += [rate, capacity]
+                await self._refund(keys=[key for key, _, _ in buckets], args=args)
+                return
+            except Exception as e:
+                print(f"⚠️ Upload rate limits: Redis unavailable ({e}), using local buckets for 30s")
+                self._down_until = time.monotonic() + 30.0
+        self.local.refund(buckets, cost)
+
+    @asynccontextmanager
+    async def admit(self, user_id: UUID, tier: Optional[str], size: int):
+        """Hold an admission slot for the duration of an upload, or raise AdmissionRejected"""
+        user_key = str(user_id)
+        # Checked before charging - a request that can't queue costs nothing
+        if self.budget.waiting(user_key) >= self.settings.upload_queue_per_user:
+            UPLOAD_ADMISSION.labels("queue_full").inc()
+            raise AdmissionRejected(429, "Too many uploads waiting", self.settings.upload_queue_timeout_seconds)
+
+        buckets = self.buckets(user_id, tier)
+        wait = await self.take(buckets, size)
+        if wait > 0:
+            UPLOAD_ADMISSION.labels("rate_limited").inc()
+            raise AdmissionRejected(429, "Upload rate limit exceeded", wait)
+
+        started = time.perf_counter()
+        try:
+            reserved = await self.budget.acquire(user_key, size, self.settings.upload_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            await self.refund(buckets, size)
+            UPLOAD_ADMISSION.labels("overloaded").inc()
+            raise AdmissionRejected(503, "Server busy, try again shortly", self.settings.upload_queue_timeout_seconds)
+        UPLOAD_QUEUE_SECONDS.observe(time.perf_counter() - started)
+        UPLOAD_ADMISSION.labels("admitted").inc()
+
+        try:
+            yield
+        finally:
+            self.budget.release(reserved)
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+settings = get_settings()
+
+# Global instance - buckets are shared through Redis whenever the cache is
+upload_admission = UploadAdmission(
+    settings,
+    redis_url=settings.redis_url if settings.cache_backend == "redis" else None,
+)
@@ -0,0 +1,290 @@
+"""
+Tamper-evident audit log
+
+Every evidence create, delete and export appends an AuditEntry. The
+entry is inserted in the same transaction as the event - one more row
+in a flush that is happening anyway - and left unsequenced. A single
+sequencer (serialized across processes by an advisory lock) picks up
+pending entries in batches, gives each its position (seq), and chains
+it: entry_hash = SHA-256(prev_hash || canonical entry). Hashing never
+happens on the request path.
+
+Entry hashes are also the leaves of an RFC 6962 Merkle tree, stored as
+complete subtree hashes (AuditNode) as they fill up. Periodically a
+checkpoint signs the tree root and chain head at the current size.
+Against a checkpoint, any entry has an O(log n) inclusion proof, and
+any two checkpoints an O(log n) consistency proof that the later log
+extends the earlier one - so checking a user's history never means
+replaying the whole log.
+"""
+
+import json
+import asyncio
+import hashlib
+from datetime import timezone
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.models.audit import AuditCheckpoint, AuditEntry, AuditNode
+from app.services.export import manifest_signer
+from app.services.merkle import consistency_ranges, inclusion_ranges, leaf_hash, node_hash, split_point
+
+GENESIS_HASH = "0" * 64
+
+# pg_advisory_xact_lock key held while sequencing
+SEQUENCER_LOCK = 0x616C6962
+
+
+def canonical_entry(entry: AuditEntry) -> bytes:
+    """The bytes an entry's hash covers (after its prev_hash)"""
+    return json.dumps({
+        "seq": entry.seq,
+        "user_id": str(entry.user_id),
+        "action": entry.action,
+        "evidence_id": str(entry.evidence_id) if entry.evidence_id else None,
+        "details": entry.details,
+        "created_at": entry.created_at.astimezone(timezone.utc).isoformat(),
+    }, sort_keys=True, separators=(",", ":")).encode()
+
+
+def chain_hash(prev_hash: str, entry: AuditEntry) -> str:
+    return hashlib.sha256(bytes.fromhex(prev_hash) + canonical_entry(entry)).hexdigest()
+
+
+def checkpoint_statement(tree_size: int, root_hash: str, head_hash: str) -> bytes:
+    """What a checkpoint signature covers"""
+    return f"alibi-audit-checkpoint\n{tree_size}\n{root_hash}\n{head_hash}\n".encode()
+
+
+def entry_dict(entry: AuditEntry) -> dict:
+    return {
+        "seq": entry.seq,
+        "action": entry.action,
+        "evidence_id": str(entry.evidence_id) if entry.evidence_id else None,
+        "details": entry.details,
+        "created_at": entry.created_at.astimezone(timezone.utc).isoformat(),
+        "prev_hash": entry.prev_hash,
+        "entry_hash": entry.entry_hash,
+    }
+
+
+def checkpoint_dict(checkpoint: AuditCheckpoint) -> dict:
+    return {
+        "tree_size": checkpoint.tree_size,
+        "root_hash": checkpoint.root_hash,
+        "head_hash": checkpoint.head_hash,
+        "created_at": checkpoint.created_at,
+        "statement": checkpoint_statement(
+            checkpoint.tree_size, checkpoint.root_hash, checkpoint.head_hash
+        ).decode(),
+        "key_id": checkpoint.key_id,
+        "signature": checkpoint.signature,
+    }
+
+
+def _cover(start: int, end: int) -> list[tuple[int, int]]:
+    """Complete subtrees (level, index) whose hashes make up MTH(start, end)"""
+    nodes = []
+    while True:
+        size = end - start
+        if size & (size - 1) == 0:
+            level = size.bit_length() - 1
+            nodes.append((level, start >> level))
+            return nodes
+        k = split_point(size)
+        level = k.bit_length() - 1
+        nodes.append((level, start >> level))
+        start += k
+
+
+def _frontier(size: int) -> list[tuple[int, int]]:
+    """Complete subtrees not yet merged into a bigger one, at a log size"""
+    nodes, start = [], 0
+    for level in range(size.bit_length() - 1, -1, -1):
+        if size & (1 << level):
+            nodes.append((level, start >> level))
+            start += 1 << level
+    return nodes
+
+
+class AuditLog:
+    """Records entries and sequences them into the chain and tree"""
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        action: str,
+        evidence_id: Optional[UUID] = None,
+        **details,
+    ) -> None:
+        """Append an entry as part of the caller's transaction"""
+        db.add(AuditEntry(user_id=user_id, action=action, evidence_id=evidence_id, details=details))
+
+    async def _nodes(self, db: AsyncSession, coords: set[tuple[int, int]]) -> dict[tuple[int, int], bytes]:
+        if not coords:
+            return {}
+        result = await db.execute(
+            select(AuditNode.level, AuditNode.index, AuditNode.hash)
+            .where(tuple_(AuditNode.level, AuditNode.index).in_(list(coords)))
+        )
+        return {(level, index): node for level, index, node in result}
+
+    async def _range_hashes(self, db: AsyncSession, ranges: list[tuple[int, int]]) -> list[bytes]:
+        """MTH of each leaf range, with one query for all the nodes involved"""
+        covers = [_cover(start, end) for start, end in ranges]
+        nodes = await self._nodes(db, {coord for cover in covers for coord in cover})
+
+        hashes = []
+        for cover in covers:
+            node = nodes[cover[-1]]
+            for coord in reversed(cover[:-1]):
+                node = node_hash(nodes[coord], node)
+            hashes.append(node)
+        return hashes
+
+    async def _head(self, db: AsyncSession) -> tuple[int, str]:
+        """(log size, hash of the last entry)"""
+        head = (await db.execute(
+            select(AuditEntry.seq, AuditEntry.entry_hash)
+            .where(AuditEntry.seq.is_not(None))
+            .order_by(AuditEntry.seq.desc())
+            .limit(1)
+        )).first()
+        return (head.seq + 1, head.entry_hash) if head else (0, GENESIS_HASH)
+
+    async def sequence(self) -> int:
+        """Chain one batch of pending entries; returns how many"""
+        async with async_session_maker() as session:
+            await session.execute(select(func.pg_advisory_xact_lock(SEQUENCER_LOCK)))
+
+            pending = (await session.execute(
+                select(AuditEntry)
+                .where(AuditEntry.seq.is_(None))
+                .order_by(AuditEntry.id)
+                .limit(self.batch_size)
+            )).scalars().all()
+            if not pending:
+                await session.commit()
+                return 0
+
+            size, prev_hash = await self._head(session)
+            nodes = await self._nodes(session, set(_frontier(size)))
+            new_nodes = []
+
+            for entry in pending:
+                entry.seq = size
+                entry.prev_hash = prev_hash
+                entry.entry_hash = prev_hash = chain_hash(prev_hash, entry)
+
+                # Add the leaf, then every subtree it completes
+                level, index, node = 0, size, leaf_hash(entry.entry_hash)
+                while True:
+                    nodes[(level, index)] = node
+                    new_nodes.append({"level": level, "index": index, "hash": node})
+                    if not index & 1:
+                        break
+                    node = node_hash(nodes[(level, index - 1)], node)
+                    level, index = level + 1, index >> 1
+                size += 1
+
+            await session.execute(pg_insert(AuditNode), new_nodes)
+            await session.commit()
+        return len(pending)
+
+    async def checkpoint(self) -> Optional[AuditCheckpoint]:
+        """Sign the current tree head, if the log grew since the last one"""
+        async with async_session_maker() as session:
+            size, head_hash = await self._head(session)
+            latest = await self.latest_checkpoint(session)
+            if size == 0 or (latest and latest.tree_size >= size):
+                return None
+
+            root_hash = (await self._range_hashes(session, [(0, size)]))[0].hex()
+            statement = checkpoint_statement(size, root_hash, head_hash)
+            values = {
+                "tree_size": size,
+                "root_hash": root_hash,
+                "head_hash": head_hash,
+                "key_id": manifest_signer.key_id,
+                "signature": manifest_signer.signature(statement),
+            }
+            await session.execute(pg_insert(AuditCheckpoint).values(**values).on_conflict_do_nothing())
+            await session.commit()
+        return AuditCheckpoint(**values)
+
+    async def latest_checkpoint(self, db: AsyncSession) -> Optional[AuditCheckpoint]:
+        return (await db.execute(
+            select(AuditCheckpoint).order_by(AuditCheckpoint.tree_size.desc()).limit(1)
+        )).scalar_one_or_none()
+
+    async def inclusion_proofs(self, db: AsyncSession, seqs: list[int], tree_size: int) -> list[list[list[str]]]:
+        """
+        Inclusion proof for each entry in a tree of tree_size leaves, as
+        [side, sibling_hex] pairs from the leaf up (see merkle.root_from_proof,
+        with the entry hash as the leaf)
+        """
+        paths = [inclusion_ranges(seq, tree_size) for seq in seqs]
+        hashes = iter(await self._range_hashes(
+            db, [(start, end) for path in paths for _, start, end in path]
+        ))
+        return [[[side, next(hashes).hex()] for side, _, _ in path] for path in paths]
+
+    async def consistency_proof(self, db: AsyncSession, old_size: int, new_size: int) -> list[str]:
+        """Hex subtree hashes proving the new_size log extends the old_size one"""
+        if old_size == new_size:
+            return []
+        hashes = await self._range_hashes(db, consistency_ranges(old_size, new_size))
+        return [node.hex() for node in hashes]
+
+    async def _loop(self, interval: float, checkpoint_interval: float) -> None:
+        loop = asyncio.get_running_loop()
+        next_checkpoint = loop.time() + checkpoint_interval
+        while True:
+            try:
+                # Keep going while batches come back full
+                while await self.sequence() == self.batch_size:
+                    pass
+                if loop.time() >= next_checkpoint:
+                    next_checkpoint = loop.time() + checkpoint_interval
+                    checkpoint = await self.checkpoint()
+                    if checkpoint:
+                        print(f"🔏 Audit checkpoint at {checkpoint.tree_size} entries")
+            except Exception as e:
+                print(f"⚠️ Audit sequencing failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(
+            settings.audit_sequence_interval_seconds,
+            settings.audit_checkpoint_interval_seconds,
+        ))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.sequence()
+        except Exception as e:
+            print(f"⚠️ Audit sequencing failed: {e}")
+
+
+settings = get_settings()
+
+# Global instance
+audit_log = AuditLog(batch_size=settings.audit_batch_size)
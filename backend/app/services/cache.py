@@ -0,0 +1,226 @@
+"""
+Read-through cache for evidence responses
+
+Entries are namespaced by a per-user version; invalidating a user sets
+a new random one, so every listing/detail page cached for them is
+orphaned at once and ages out via its TTL. Versions are never reused,
+so an expired version key can't bring old entries back. Values are compact JSON,
+zlib-compressed when large.
+
+Redis is the shared store. If it is unreachable the cache trips a short
+circuit breaker and serves from an in-process LRU instead (which is also
+what single-node deployments can run on with CACHE_BACKEND=memory).
+
+With read replicas, invalidating also marks the user as a recent writer
+for a few seconds, which keeps their reads on the primary (see
+app.core.database.ReplicaRouter).
+"""
+
+import os
+import json
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+from uuid import UUID
+
+from app.core.config import get_settings
+from app.core.database import replica_router
+
+PREFIX = "alibi"
+COMPRESS_THRESHOLD = 1024
+RAW, COMPRESSED = b"j", b"z"
+
+# One round trip: read the user's version and the entry under it
+GET_VERSIONED = """
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ARGV[2])}
+"""
+
+
+def encode(value: Any) -> bytes:
+    data = json.dumps(value, separators=(",", ":"), default=str).encode()
+    if len(data) > COMPRESS_THRESHOLD:
+        return COMPRESSED + zlib.compress(data, 1)
+    return RAW + data
+
+
+def decode(payload: bytes) -> Any:
+    if payload[:1] == COMPRESSED:
+        return json.loads(zlib.decompress(payload[1:]))
+    return json.loads(payload[1:])
+
+
+class LocalLRU:
+    """Bounded in-process cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class EvidenceCache:
+    """Per-user versioned cache: Redis first, local LRU as fallback"""
+
+    def __init__(
+        self,
+        redis_url: Optional[str],
+        ttl_seconds: int,
+        local_max_entries: int,
+        breaker_seconds: float = 30.0,
+        write_window_seconds: float = 0.0,
+    ):
+        self.redis_url = redis_url
+        self.ttl = ttl_seconds
+        self.breaker_seconds = breaker_seconds
+        self.local = LocalLRU(local_max_entries)
+        self._local_versions: dict[str, int] = {}
+        self.write_window = write_window_seconds
+        self._local_writes: dict[str, float] = {}
+        self._redis = None
+        self._script = None
+        self._down_until = 0.0
+
+    @property
+    def redis(self):
+        """Redis client, or None while the breaker is open / not configured"""
+        if not self.redis_url or time.monotonic() < self._down_until:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(
+                self.redis_url,
+                socket_connect_timeout=0.25,
+                socket_timeout=0.25,
+                health_check_interval=30,
+            )
+            self._script = self._redis.register_script(GET_VERSIONED)
+        return self._redis
+
+    def _trip(self, error: Exception) -> None:
+        print(f"⚠️ Cache: Redis unavailable ({error}), using local cache for {self.breaker_seconds:.0f}s")
+        self._down_until = time.monotonic() + self.breaker_seconds
+        # Local entries may predate invalidations that only reached Redis
+        self.local.clear()
+
+    @staticmethod
+    def _version_key(user_id: UUID) -> str:
+        return f"{PREFIX}:ver:{user_id}"
+
+    @staticmethod
+    def _entry_key(user_id: UUID, version: str, name: str) -> str:
+        return f"{PREFIX}:{user_id}:{version}:{name}"
+
+    @staticmethod
+    def _write_key(user_id: UUID) -> str:
+        return f"{PREFIX}:wrote:{user_id}"
+
+    async def get(self, user_id: UUID, name: str) -> tuple[str, Optional[Any]]:
+        """(version, value) - pass the version back to set() on a miss"""
+        client = self.redis
+        if client is not None:
+            try:
+                version, payload = await self._script(
+                    keys=[self._version_key(user_id)],
+                    args=[f"{PREFIX}:{user_id}:", f":{name}"],
+                )
+                version = version.decode() if isinstance(version, bytes) else str(version)
+                return version, decode(payload) if payload else None
+            except Exception as e:
+                self._trip(e)
+
+        version = str(self._local_versions.get(str(user_id), 0))
+        payload = self.local.get(self._entry_key(user_id, version, name))
+        return version, decode(payload) if payload else None
+
+    async def set(
+        self, user_id: UUID, version: str, name: str, value: Any, ttl: Optional[int] = None
+    ) -> None:
+        payload = encode(value)
+        key = self._entry_key(user_id, version, name)
+        ttl = min(ttl or self.ttl, self.ttl)
+        client = self.redis
+        if client is not None:
+            try:
+                await client.set(key, payload, ex=ttl)
+                return
+            except Exception as e:
+                self._trip(e)
+        self.local.set(key, payload, ttl)
+
+    async def invalidate(self, *user_ids: UUID) -> None:
+        """Orphan everything cached for these users"""
+        written_until = time.monotonic() + self.write_window
+        for user_id in set(user_ids):
+            self._local_versions[str(user_id)] = self._local_versions.get(str(user_id), 0) + 1
+            if self.write_window:
+                self._local_writes[str(user_id)] = written_until
+
+        client = self.redis
+        if client is not None and user_ids:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for user_id in set(user_ids):
+                        # Random, so a version can't come round again once
+                        # this key expires; it outlives any entry under it
+                        pipe.set(self._version_key(user_id), os.urandom(8).hex(), ex=self.ttl * 10)
+                        if self.write_window:
+                            pipe.set(self._write_key(user_id), 1, px=int(self.write_window * 1000))
+                    await pipe.execute()
+            except Exception as e:
+                self._trip(e)
+
+    async def wrote_recently(self, user_id: UUID) -> bool:
+        """Whether the user's data changed within the write window"""
+        if self._local_writes.get(str(user_id), 0.0) > time.monotonic():
+            return True
+        self._local_writes.pop(str(user_id), None)
+        if not self.redis_url:
+            return False
+
+        client = self.redis
+        if client is None:
+            # Other processes' writes are unknown while Redis is down
+            return True
+        try:
+            return bool(await client.exists(self._write_key(user_id)))
+        except Exception as e:
+            self._trip(e)
+            return True
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+settings = get_settings()
+
+# Global instance
+evidence_cache = EvidenceCache(
+    redis_url=settings.redis_url if settings.cache_backend == "redis" else None,
+    ttl_seconds=settings.cache_ttl_seconds,
+    local_max_entries=settings.cache_local_max_entries,
+    write_window_seconds=replica_router.window_seconds if replica_router.replicas else 0.0,
+)
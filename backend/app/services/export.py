@@ -0,0 +1,346 @@
+"""
+Evidence bundle export
+
+A bundle is a ZIP of the selected evidence files plus manifest.json /
+manifest.csv (content hashes, capture times, timestamp proofs) and
+manifest.json.sig, a detached Ed25519 signature over manifest.json.
+
+Files are STORED, not deflated, and every CRC-32 is known up front (it
+is recorded on the blob at upload time), so the byte layout of the whole
+archive is computed from metadata alone. That gives an exact
+Content-Length, lets any byte range be produced on demand - resuming a
+broken download is just a Range request - and means file data is only
+ever streamed through in fixed-size chunks, whatever the export's size.
+"""
+
+import io
+import csv
+import json
+import zlib
+import base64
+import bisect
+import hashlib
+import mimetypes
+import struct
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Union
+from uuid import UUID
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.blob import Blob
+from app.models.evidence import EvidenceItem
+from app.services.storage import storage_service, CHUNK_SIZE
+
+ZIP64_LIMIT = 0xFFFFFFFF
+FLAG_UTF8 = 0x0800
+VERSION_DEFAULT = 20
+VERSION_ZIP64 = 45
+# Unix host, regular file rw-r--r--
+VERSION_MADE_BY = (3 << 8) | VERSION_ZIP64
+EXTERNAL_ATTR = 0o100644 << 16
+
+MANIFEST_VERSION = 1
+CSV_COLUMNS = (
+    "id", "file", "title", "type", "size", "content_hash", "captured_at",
+    "timestamped_at", "timestamp_authority", "merkle_root",
+)
+
+# Built-in table only, so file names don't depend on the host's mime.types
+_mime_types = mimetypes.MimeTypes()
+
+
+@dataclass
+class ZipMember:
+    """One archive entry: stored file (key) or in-memory bytes (data)"""
+
+    name: str
+    size: int
+    crc32: int
+    modified: datetime
+    key: Optional[str] = None
+    data: Optional[bytes] = None
+
+    @classmethod
+    def from_bytes(cls, name: str, data: bytes, modified: datetime) -> "ZipMember":
+        return cls(name=name, size=len(data), crc32=zlib.crc32(data), modified=modified, data=data)
+
+
+def dos_datetime(dt: datetime) -> tuple[int, int]:
+    """(time, date) in MS-DOS format; ZIP can't go earlier than 1980"""
+    dt = dt.astimezone(timezone.utc) if dt.tzinfo else dt
+    if dt.year < 1980:
+        return 0, (1 << 5) | 1
+    return (
+        (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2),
+        ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day,
+    )
+
+
+class ZipLayout:
+    """
+    Byte-exact layout of a STORED ZIP archive (ZIP64 where sizes or
+    offsets need it), built from member metadata without touching data
+    """
+
+    def __init__(self, members: list[ZipMember], zip64_limit: int = ZIP64_LIMIT):
+        self.zip64_limit = zip64_limit
+        # (offset, length, payload) - payload is bytes or a ZipMember to stream
+        self.segments: list[tuple[int, int, Union[bytes, ZipMember]]] = []
+        self._offsets: list[int] = []
+
+        central = io.BytesIO()
+        offset = 0
+        for member in members:
+            header = self._local_header(member)
+            self._add(offset, header)
+            offset += len(header)
+            self._add(offset, member.data if member.data is not None else member)
+            central.write(self._central_header(member, offset - len(header)))
+            offset += member.size
+
+        directory = central.getvalue()
+        self._add(offset, directory + self._end_records(len(members), offset, len(directory)))
+        self.size = self.segments[-1][0] + self.segments[-1][1]
+
+    def _add(self, offset: int, payload: Union[bytes, ZipMember]) -> None:
+        length = len(payload) if isinstance(payload, bytes) else payload.size
+        if length:
+            self.segments.append((offset, length, payload))
+            self._offsets.append(offset)
+
+    def _local_header(self, member: ZipMember) -> bytes:
+        name = member.name.encode()
+        zip64 = member.size >= self.zip64_limit
+        extra = struct.pack("<HHQQ", 0x0001, 16, member.size, member.size) if zip64 else b""
+        size = ZIP64_LIMIT if zip64 else member.size
+        time, date = dos_datetime(member.modified)
+        return struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50, VERSION_ZIP64 if zip64 else VERSION_DEFAULT, FLAG_UTF8, 0,
+            time, date, member.crc32, size, size, len(name), len(extra),
+        ) + name + extra
+
+    def _central_header(self, member: ZipMember, header_offset: int) -> bytes:
+        name = member.name.encode()
+        fields = []
+        size = member.size
+        if member.size >= self.zip64_limit:
+            fields += [member.size, member.size]
+            size = ZIP64_LIMIT
+        if header_offset >= self.zip64_limit:
+            fields.append(header_offset)
+            header_offset = ZIP64_LIMIT
+        extra = struct.pack(f"<HH{len(fields)}Q", 0x0001, 8 * len(fields), *fields) if fields else b""
+        time, date = dos_datetime(member.modified)
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII",
+            0x02014B50, VERSION_MADE_BY, VERSION_ZIP64 if fields else VERSION_DEFAULT,
+            FLAG_UTF8, 0, time, date, member.crc32, size, size,
+            len(name), len(extra), 0, 0, 0, EXTERNAL_ATTR, header_offset,
+        ) + name + extra
+
+    def _end_records(self, count: int, cd_offset: int, cd_size: int) -> bytes:
+        records = b""
+        if count >= 0xFFFF or cd_offset >= self.zip64_limit or cd_size >= self.zip64_limit:
+            eocd64_offset = cd_offset + cd_size
+            records += struct.pack(
+                "<IQHHIIQQQQ",
+                0x06064B50, 44, VERSION_MADE_BY, VERSION_ZIP64, 0, 0,
+                count, count, cd_size, cd_offset,
+            )
+            records += struct.pack("<IIQI", 0x07064B50, 0, eocd64_offset, 1)
+            count = min(count, 0xFFFF)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+            cd_size = min(cd_size, ZIP64_LIMIT)
+        return records + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
+
+    async def iter_range(self, start: int, end: int) -> AsyncIterator[bytes]:
+        """Bytes [start, end) of the archive, file data streamed from storage"""
+        index = max(bisect.bisect_right(self._offsets, start) - 1, 0)
+        for offset, length, payload in self.segments[index:]:
+            if offset >= end:
+                break
+            lo = max(start, offset) - offset
+            hi = min(end, offset + length) - offset
+            if lo >= hi:
+                continue
+            if isinstance(payload, bytes):
+                yield payload[lo:hi]
+            else:
+                async with aclosing(storage_service.backend.iter_range(payload.key, lo, hi, CHUNK_SIZE)) as chunks:
+                    async for chunk in chunks:
+                        yield chunk
+
+
+class ManifestSigner:
+    """
+    Ed25519 signatures over bundle manifests. The key is a base64 32-byte
+    seed (EXPORT_SIGNING_KEY); without one it is derived from the app
+    secret, which is only good enough for development.
+    """
+
+    algorithm = "Ed25519"
+
+    def __init__(self, seed_b64: str, secret_key: str):
+        seed = (
+            base64.b64decode(seed_b64) if seed_b64
+            else hashlib.sha256(b"alibi-export-signing:" + secret_key.encode()).digest()
+        )
+        self._key = Ed25519PrivateKey.from_private_bytes(seed)
+        raw = self._key.public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        self.public_key = base64.b64encode(raw).decode()
+        self.key_id = hashlib.sha256(raw).hexdigest()[:16]
+
+    def public_key_info(self) -> dict:
+        return {"algorithm": self.algorithm, "key_id": self.key_id, "public_key": self.public_key}
+
+    def signature(self, data: bytes) -> str:
+        """Base64 Ed25519 signature over data"""
+        return base64.b64encode(self._key.sign(data)).decode()
+
+    def sign(self, data: bytes, signed_file: str) -> bytes:
+        """Detached signature document for data"""
+        return json.dumps({
+            **self.public_key_info(),
+            "signed_file": signed_file,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "signature": self.signature(data),
+        }, indent=2).encode()
+
+
+def member_name(item: EvidenceItem) -> str:
+    extension = _mime_types.guess_extension(item.mime_type or "") or ""
+    return f"files/{item.captured_at:%Y-%m-%d_%H%M%S}_{item.id}{extension}"
+
+
+def timestamp_proof(token: Optional[str]):
+    """Merkle inclusion proof + authority token, as issued"""
+    if not token:
+        return None
+    try:
+        return json.loads(token)
+    except ValueError:
+        # Pre-batching tokens are opaque strings
+        return token
+
+
+def manifest_entry(item: EvidenceItem, name: Optional[str]) -> dict:
+    return {
+        "id": str(item.id),
+        "file": name,
+        "title": item.title,
+        "type": item.item_type,
+        "description": item.description,
+        "mime_type": item.mime_type,
+        "size": item.file_size_bytes,
+        "content_hash": item.content_hash,
+        "captured_at": item.captured_at.isoformat() if item.captured_at else None,
+        "latitude": float(item.latitude) if item.latitude is not None else None,
+        "longitude": float(item.longitude) if item.longitude is not None else None,
+        "location_name": item.location_name,
+        "tags": item.tags or [],
+        "timestamped_at": item.timestamped_at.isoformat() if item.timestamped_at else None,
+        "timestamp_authority": item.timestamp_authority,
+        "timestamp_proof": timestamp_proof(item.timestamp_token),
+    }
+
+
+def manifest_csv(entries: list[dict]) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for entry in entries:
+        proof = entry["timestamp_proof"] if isinstance(entry["timestamp_proof"], dict) else {}
+        writer.writerow([
+            entry["id"], entry["file"] or "", entry["title"] or "", entry["type"],
+            entry["size"] if entry["size"] is not None else "", entry["content_hash"],
+            entry["captured_at"] or "", entry["timestamped_at"] or "",
+            entry["timestamp_authority"] or "", proof.get("root", ""),
+        ])
+    return out.getvalue().encode()
+
+
+async def ensure_crcs(db: AsyncSession, items: list[EvidenceItem]) -> dict[str, tuple[int, int]]:
+    """
+    (size, crc32) of each item's stored file, by key. Blobs stored before
+    CRCs were recorded are read once and backfilled (caller commits).
+    """
+    hashes = {item.content_hash for item in items if item.file_path}
+    blobs = {
+        row.content_hash: row
+        for row in (await db.execute(
+            select(Blob.content_hash, Blob.size_bytes, Blob.crc32).where(Blob.content_hash.in_(hashes))
+        )).all()
+    }
+
+    result = {}
+    for item in items:
+        if not item.file_path or item.file_path in result:
+            continue
+        blob = blobs.get(item.content_hash)
+        is_blob = blob is not None and item.file_path == storage_service.blob_key(item.content_hash)
+        size = blob.size_bytes if is_blob else item.file_size_bytes
+        if is_blob and blob.crc32 is not None:
+            result[item.file_path] = (size, blob.crc32)
+            continue
+
+        crc = 0
+        async with aclosing(storage_service.backend.iter_range(item.file_path, 0, size, CHUNK_SIZE)) as chunks:
+            async for chunk in chunks:
+                crc = zlib.crc32(chunk, crc)
+        result[item.file_path] = (size, crc)
+        if is_blob:
+            await db.execute(update(Blob).where(Blob.content_hash == item.content_hash).values(crc32=crc))
+    return result
+
+
+def build_bundle(
+    user_id: UUID,
+    items: list[EvidenceItem],
+    files: dict[str, tuple[int, int]],
+) -> tuple[ZipLayout, str]:
+    """
+    Archive layout and ETag for a bundle of items (in order). Nothing
+    here reads the clock, so the same items always give the same bytes.
+    """
+    as_of = max(max(item.uploaded_at, item.timestamped_at or item.uploaded_at) for item in items)
+    members, entries = [], []
+    for item in items:
+        name = member_name(item) if item.file_path else None
+        if name:
+            size, crc = files[item.file_path]
+            members.append(ZipMember(name=name, size=size, crc32=crc, modified=item.captured_at, key=item.file_path))
+        entries.append(manifest_entry(item, name))
+
+    manifest = json.dumps({
+        "format": "alibi-evidence-bundle",
+        "version": MANIFEST_VERSION,
+        "user_id": str(user_id),
+        "as_of": as_of.isoformat(),
+        "item_count": len(entries),
+        "items": entries,
+    }, indent=2).encode()
+
+    members += [
+        ZipMember.from_bytes("manifest.json", manifest, as_of),
+        ZipMember.from_bytes("manifest.csv", manifest_csv(entries), as_of),
+        ZipMember.from_bytes("manifest.json.sig", manifest_signer.sign(manifest, "manifest.json"), as_of),
+    ]
+    # The manifest (and signing key) pin every byte of the archive
+    etag = hashlib.sha256(manifest + manifest_signer.key_id.encode()).hexdigest()
+    return ZipLayout(members), etag
+
+
+settings = get_settings()
+
+# Global instance
+manifest_signer = ManifestSigner(settings.export_signing_key, settings.secret_key)
@@ -0,0 +1,166 @@
+"""
+Geospatial helpers for evidence locations
+
+Locations are indexed by geohash (stock Postgres, B-tree on
+(user_id, geohash)). A bounding box is covered by a handful of geohash
+cells, each of which is a contiguous key range in the index, and exact
+filtering / distance ordering happens on the candidates. When PostGIS is
+installed and enabled, radius and nearest queries use a GiST index on
+the point geography instead.
+"""
+
+import math
+from typing import Optional
+
+from sqlalchemy import Float, and_, cast, func, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.evidence import EvidenceItem
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Sorts after every geohash character under the column's C collation
+RANGE_END = "~"
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """(height, width) in degrees of a geohash cell"""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def _split_antimeridian(south, west, north, east) -> list[tuple[float, float, float, float]]:
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def cover_precision(south: float, west: float, north: float, east: float, max_cells: int = 32) -> int:
+    """Finest geohash precision whose cells cover the box in <= max_cells"""
+    boxes = _split_antimeridian(south, west, north, east)
+    best = 1
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size(precision)
+        cells = sum(
+            (math.floor((n - s) / height) + 2) * (math.floor((e - w) / width) + 2)
+            for s, w, n, e in boxes
+        )
+        if cells > max_cells:
+            break
+        best = precision
+    return best
+
+
+def cover_cells(south: float, west: float, north: float, east: float, max_cells: int = 32) -> set[str]:
+    """Geohash prefixes whose union covers the bounding box"""
+    precision = cover_precision(south, west, north, east, max_cells)
+    height, width = cell_size(precision)
+    cells = set()
+    for s, w, n, e in _split_antimeridian(south, west, north, east):
+        lat = s
+        while True:
+            lon = w
+            while True:
+                cells.add(encode_geohash(min(lat, 90.0), min(lon, 180.0), precision))
+                if lon >= e:
+                    break
+                lon = min(lon + width, e)
+            if lat >= n:
+                break
+            lat = min(lat + height, n)
+    return cells
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> tuple[float, float, float, float]:
+    """(south, west, north, east) box containing a circle"""
+    dlat = radius_km / KM_PER_DEGREE
+    south, north = max(latitude - dlat, -90.0), min(latitude + dlat, 90.0)
+    cos_lat = math.cos(math.radians(latitude))
+    if north >= 90.0 or south <= -90.0 or cos_lat < 1e-6:
+        return south, -180.0, north, 180.0
+    dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+    if dlon >= 180.0:
+        return south, -180.0, north, 180.0
+    west = (longitude - dlon + 540.0) % 360.0 - 180.0
+    east = (longitude + dlon + 540.0) % 360.0 - 180.0
+    return south, west, north, east
+
+
+def in_cells(cells: set[str]) -> ColumnElement[bool]:
+    """Index range scans over each covering cell"""
+    return or_(*(
+        and_(EvidenceItem.geohash >= cell, EvidenceItem.geohash < cell + RANGE_END)
+        for cell in sorted(cells)
+    ))
+
+
+def in_bbox(south: float, west: float, north: float, east: float) -> ColumnElement[bool]:
+    """Exact bounding-box test on the coordinates"""
+    lat_ok = EvidenceItem.latitude.between(south, north)
+    if west <= east:
+        return and_(lat_ok, EvidenceItem.longitude.between(west, east))
+    return and_(lat_ok, or_(EvidenceItem.longitude >= west, EvidenceItem.longitude <= east))
+
+
+def distance_km(latitude: float, longitude: float) -> ColumnElement[float]:
+    """Haversine distance from a point to each item, in km"""
+    lat1 = func.radians(latitude)
+    lat2 = func.radians(cast(EvidenceItem.latitude, Float))
+    dlat = lat2 - lat1
+    dlon = func.radians(cast(EvidenceItem.longitude, Float) - longitude)
+    a = func.power(func.sin(dlat * 0.5), 2) + func.cos(lat1) * func.cos(lat2) * func.power(func.sin(dlon * 0.5), 2)
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def geography() -> ColumnElement:
+    """PostGIS point for each item; matches the GiST expression index"""
+    return func.geography(func.ST_SetSRID(
+        func.ST_MakePoint(cast(EvidenceItem.longitude, Float), cast(EvidenceItem.latitude, Float)),
+        4326,
+    ))
+
+
+def point_geography(latitude: float, longitude: float) -> ColumnElement:
+    return func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
+
+
+def cluster_precision(south: float, west: float, north: float, east: float, zoom: Optional[int]) -> int:
+    """
+    Geohash prefix length to cluster on: from the map zoom when given
+    (about 8 cells across a 256px tile), else a couple of levels finer
+    than the cover of the box
+    """
+    if zoom is not None:
+        tile_width = 360.0 / (1 << max(0, min(zoom, 22)))
+        for precision in range(1, GEOHASH_PRECISION + 1):
+            if cell_size(precision)[1] <= tile_width / 8:
+                return precision
+        return GEOHASH_PRECISION
+    return min(cover_precision(south, west, north, east) + 2, GEOHASH_PRECISION)
@@ -0,0 +1,569 @@
+"""
+Background jobs
+
+Post-upload work (metadata extraction, thumbnails) runs as durable jobs
+instead of in-process tasks, so an upload returns as soon as its blob
+and row are committed, and a crash or deploy doesn't lose the work.
+
+Jobs live in Redis by default, or in a Postgres table (JOB_BACKEND=
+postgres) claimed with FOR UPDATE SKIP LOCKED. Either way:
+
+- a job's id is its idempotency key (e.g. "metadata:<evidence id>"), so
+  enqueueing it again while it's pending does nothing
+- a claimed job is leased; if its worker dies the lease expires and
+  another worker picks it up
+- failures are retried with exponential backoff, up to job_max_attempts;
+  a failed job is kept job_failed_retention_days, and enqueueing it
+  again starts it afresh
+- each job type has its own concurrency limit
+
+Under Redis, jobs are also written to an outbox table in the enqueueing
+transaction, so a job exists iff its upload committed there too: they
+are pushed to Redis after commit, and any a crash or outage strands are
+relayed by the workers' maintenance sweep.
+
+Workers run in the API process, or separately via `python -m app.worker`.
+Handlers must be idempotent - a job can run more than once.
+"""
+
+import json
+import time
+import random
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.core.metrics import JOB_SECONDS
+from app.core.tracing import span
+from app.models.job import JobOutboxRow, JobRow
+
+PREFIX = "alibi"
+PENDING_KEY = "alibi_pending_jobs"
+
+# Publishing runs on the upload request path; past this the outbox
+# relay is left to push the jobs instead of the request waiting on Redis
+PUBLISH_TIMEOUT_SECONDS = 2.0
+
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 3600.0
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+# Job type -> handler, filled in by @job_handler
+HANDLERS: dict[str, JobHandler] = {}
+
+
+def job_handler(job_type: str):
+    """Register the coroutine that runs jobs of this type"""
+
+    def register(func: JobHandler) -> JobHandler:
+        HANDLERS[job_type] = func
+        return func
+
+    return register
+
+
+@dataclass
+class Job:
+    id: str
+    type: str
+    payload: dict
+    attempts: int = 0
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobBackend(ABC):
+    """Where jobs are stored and how workers claim them"""
+
+    @abstractmethod
+    async def enqueue(self, db: AsyncSession, jobs: list[Job]) -> None:
+        """Add jobs as part of the caller's transaction (before commit)"""
+
+    async def publish(self, db: AsyncSession) -> None:
+        """Make jobs enqueued on db visible to workers (after commit)"""
+
+    @abstractmethod
+    async def claim(self, job_type: str, limit: int, lease_seconds: int) -> list[Job]:
+        """Lease up to `limit` due jobs of a type"""
+
+    @abstractmethod
+    async def complete(self, job: Job) -> None:
+        pass
+
+    @abstractmethod
+    async def retry(self, job: Job, error: str, delay: float) -> None:
+        pass
+
+    @abstractmethod
+    async def fail(self, job: Job, error: str) -> None:
+        """Give up on a job; it's kept for inspection"""
+
+    @abstractmethod
+    async def depths(self, job_types: list[str]) -> dict[tuple[str, str], int]:
+        """Jobs per (type, state) - for metrics"""
+
+    async def maintain(self, interval: float) -> None:
+        """Periodic housekeeping, run by the workers every interval seconds"""
+
+    async def close(self) -> None:
+        pass
+
+
+class PostgresJobBackend(JobBackend):
+    """
+    Jobs as rows in the jobs table. Enqueueing is an insert in the same
+    transaction as the evidence row, so a job exists iff its upload
+    committed.
+    """
+
+    def __init__(self, failed_retention_days: int):
+        self.failed_retention = timedelta(days=failed_retention_days)
+
+    async def enqueue(self, db: AsyncSession, jobs: list[Job]) -> None:
+        if not jobs:
+            return
+        insert = pg_insert(JobRow).values(
+            [{"id": job.id, "type": job.type, "payload": job.payload} for job in jobs]
+        )
+        # A pending job absorbs the duplicate; a failed one starts over
+        await db.execute(insert.on_conflict_do_update(
+            index_elements=[JobRow.id],
+            set_={
+                "payload": insert.excluded.payload,
+                "status": "queued",
+                "attempts": 0,
+                "run_at": func.now(),
+                "locked_until": None,
+                "last_error": None,
+            },
+            where=JobRow.status == "failed",
+        ))
+
+    async def claim(self, job_type: str, limit: int, lease_seconds: int) -> list[Job]:
+        due = (
+            select(JobRow.id)
+            .where(
+                JobRow.type == job_type,
+                or_(
+                    and_(JobRow.status == "queued", JobRow.run_at <= func.now()),
+                    # Leased by a worker that never came back
+                    and_(JobRow.status == "running", JobRow.locked_until < func.now()),
+                ),
+            )
+            .order_by(JobRow.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(JobRow)
+                .where(JobRow.id.in_(due.scalar_subquery()))
+                .values(
+                    status="running",
+                    attempts=JobRow.attempts + 1,
+                    locked_until=func.now() + timedelta(seconds=lease_seconds),
+                )
+                .returning(JobRow.id, JobRow.payload, JobRow.attempts)
+                .execution_options(synchronize_session=False)
+            )
+            rows = result.all()
+            await session.commit()
+        return [Job(id=row.id, type=job_type, payload=row.payload, attempts=row.attempts) for row in rows]
+
+    async def complete(self, job: Job) -> None:
+        async with async_session_maker() as session:
+            await session.execute(delete(JobRow).where(JobRow.id == job.id))
+            await session.commit()
+
+    async def retry(self, job: Job, error: str, delay: float) -> None:
+        async with async_session_maker() as session:
+            await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job.id)
+                .values(
+                    status="queued",
+                    run_at=func.now() + timedelta(seconds=delay),
+                    locked_until=None,
+                    last_error=error,
+                )
+            )
+            await session.commit()
+
+    async def fail(self, job: Job, error: str) -> None:
+        async with async_session_maker() as session:
+            await session.execute(
+                update(JobRow)
+                .where(JobRow.id == job.id)
+                .values(status="failed", locked_until=None, last_error=error)
+            )
+            await session.commit()
+
+    async def depths(self, job_types: list[str]) -> dict[tuple[str, str], int]:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(JobRow.type, JobRow.status, func.count())
+                .group_by(JobRow.type, JobRow.status)
+            )
+            return {(job_type, status): count for job_type, status, count in result}
+
+    async def maintain(self, interval: float) -> None:
+        """Purge failed jobs past their retention"""
+        async with async_session_maker() as session:
+            result = await session.execute(
+                delete(JobRow).where(
+                    JobRow.status == "failed",
+                    JobRow.run_at < func.now() - self.failed_retention,
+                )
+            )
+            await session.commit()
+        if result.rowcount:
+            print(f"🧹 Purged {result.rowcount} failed jobs")
+
+
+# KEYS: job hash, ready list. ARGV: id, type, payload
+# A pending job absorbs the duplicate; a failed one starts over
+ENQUEUE = """
+if redis.call('EXISTS', KEYS[1]) == 1 and redis.call('HGET', KEYS[1], 'status') ~= 'failed' then
+  return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'type', ARGV[2], 'payload', ARGV[3], 'attempts', 0)
+redis.call('LPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+# KEYS: ready list, delayed zset, leases zset.
+# ARGV: now, limit, lease deadline, job hash key prefix
+CLAIM = """
+local moved = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 1000)
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1], 'LIMIT', 0, 1000)) do
+  table.insert(moved, id)
+end
+for _, id in ipairs(moved) do
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('ZREM', KEYS[3], id)
+  redis.call('RPUSH', KEYS[1], id)
+end
+local claimed = {}
+for _ = 1, tonumber(ARGV[2]) do
+  local id = redis.call('RPOP', KEYS[1])
+  if not id then break end
+  local key = ARGV[4] .. id
+  if redis.call('EXISTS', key) == 1 then
+    local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+    redis.call('ZADD', KEYS[3], ARGV[3], id)
+    table.insert(claimed, {id, redis.call('HGET', key, 'payload'), attempts})
+  end
+end
+return claimed
+"""
+
+
+class RedisJobBackend(JobBackend):
+    """
+    A hash per job plus, per type, a ready list, a delayed zset (retry
+    time) and a leases zset (lease deadline). Claiming is one Lua call:
+    promote due retries and expired leases, then pop and lease.
+    Jobs are pushed after the upload commits, so a rolled-back upload
+    never leaves a job behind; until then (and should the push fail)
+    they wait in the job_outbox table, written in the same transaction.
+    """
+
+    # Outbox rows relayed per maintenance pass
+    RELAY_BATCH = 500
+
+    def __init__(self, redis_url: str, failed_retention_days: int):
+        self.redis_url = redis_url
+        self.failed_ttl = failed_retention_days * 86400
+        self._redis = None
+        self._enqueue = None
+        self._claim = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(
+                self.redis_url,
+                socket_connect_timeout=1.0,
+                socket_timeout=5.0,
+                health_check_interval=30,
+            )
+            self._enqueue = self._redis.register_script(ENQUEUE)
+            self._claim = self._redis.register_script(CLAIM)
+        return self._redis
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"{PREFIX}:job:{job_id}"
+
+    @staticmethod
+    def _queue_key(job_type: str, name: str) -> str:
+        return f"{PREFIX}:jobs:{job_type}:{name}"
+
+    async def enqueue(self, db: AsyncSession, jobs: list[Job]) -> None:
+        if not jobs:
+            return
+        await db.execute(
+            pg_insert(JobOutboxRow)
+            .values([{"id": job.id, "type": job.type, "payload": job.payload} for job in jobs])
+            .on_conflict_do_nothing(index_elements=[JobOutboxRow.id])
+        )
+        db.info.setdefault(PENDING_KEY, []).extend(jobs)
+
+    async def publish(self, db: AsyncSession) -> None:
+        jobs = db.info.pop(PENDING_KEY, [])
+        if not jobs:
+            return
+        await asyncio.wait_for(self._push(jobs), PUBLISH_TIMEOUT_SECONDS)
+        # On the caller's session (its transaction is done), so publishing
+        # doesn't hold a second pooled connection
+        await db.execute(delete(JobOutboxRow).where(JobOutboxRow.id.in_([job.id for job in jobs])))
+        await db.commit()
+
+    async def maintain(self, interval: float) -> None:
+        """Relay outbox rows older than interval - publish() didn't get to them"""
+        async with async_session_maker() as session:
+            rows = (await session.execute(
+                select(JobOutboxRow)
+                .where(JobOutboxRow.created_at < func.now() - timedelta(seconds=interval))
+                .order_by(JobOutboxRow.created_at)
+                .limit(self.RELAY_BATCH)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+            if not rows:
+                return
+            await self._push([Job(id=row.id, type=row.type, payload=row.payload) for row in rows])
+            await session.execute(delete(JobOutboxRow).where(JobOutboxRow.id.in_([row.id for row in rows])))
+            await session.commit()
+        print(f"📮 Relayed {len(rows)} jobs from the outbox")
+
+    async def _push(self, jobs: list[Job]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job in jobs:
+                await self._enqueue(
+                    keys=[self._job_key(job.id), self._queue_key(job.type, "ready")],
+                    args=[job.id, job.type, json.dumps(job.payload, default=str)],
+                    client=pipe,
+                )
+            await pipe.execute()
+
+    async def claim(self, job_type: str, limit: int, lease_seconds: int) -> list[Job]:
+        client = self.redis
+        now = time.time()
+        rows = await self._claim(
+            keys=[
+                self._queue_key(job_type, "ready"),
+                self._queue_key(job_type, "delayed"),
+                self._queue_key(job_type, "leases"),
+            ],
+            args=[now, limit, now + lease_seconds, f"{PREFIX}:job:"],
+            client=client,
+        )
+        return [
+            Job(id=job_id.decode(), type=job_type, payload=json.loads(payload), attempts=int(attempts))
+            for job_id, payload, attempts in rows
+        ]
+
+    async def complete(self, job: Job) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._queue_key(job.type, "leases"), job.id)
+            pipe.delete(self._job_key(job.id))
+            await pipe.execute()
+
+    async def retry(self, job: Job, error: str, delay: float) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._queue_key(job.type, "leases"), job.id)
+            pipe.hset(self._job_key(job.id), "last_error", error)
+            pipe.zadd(self._queue_key(job.type, "delayed"), {job.id: time.time() + delay})
+            await pipe.execute()
+
+    async def fail(self, job: Job, error: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._queue_key(job.type, "leases"), job.id)
+            pipe.hset(self._job_key(job.id), mapping={"status": "failed", "last_error": error})
+            # Blocks re-enqueueing until it expires
+            pipe.expire(self._job_key(job.id), self.failed_ttl)
+            pipe.lpush(self._queue_key(job.type, "failed"), job.id)
+            pipe.ltrim(self._queue_key(job.type, "failed"), 0, 9999)
+            await pipe.execute()
+
+    async def depths(self, job_types: list[str]) -> dict[tuple[str, str], int]:
+        states = (("queued", "ready", "llen"), ("delayed", "delayed", "zcard"), ("running", "leases", "zcard"))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job_type in job_types:
+                for _, name, command in states:
+                    getattr(pipe, command)(self._queue_key(job_type, name))
+            counts = iter(await pipe.execute())
+        return {
+            (job_type, state): next(counts)
+            for job_type in job_types
+            for state, _, _ in states
+        }
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+class JobQueue:
+    """
+    Enqueue side. Call enqueue() before committing the transaction that
+    creates the work, publish() after it commits.
+    """
+
+    def __init__(self, backend: JobBackend):
+        self.backend = backend
+
+    async def enqueue(self, db: AsyncSession, jobs: list[Job]) -> None:
+        await self.backend.enqueue(db, jobs)
+
+    async def publish(self, db: AsyncSession) -> None:
+        try:
+            await self.backend.publish(db)
+        except Exception as e:
+            # The upload itself has committed and its jobs are in the
+            # outbox; the workers relay them. Don't fail the request
+            print(f"⚠️ Failed to publish jobs, leaving them to the outbox relay: {e!r}")
+            await db.rollback()
+
+    def discard(self, db: AsyncSession) -> None:
+        """Drop unpublished jobs after a rollback"""
+        db.info.pop(PENDING_KEY, None)
+
+
+class JobWorker:
+    """Claims and runs jobs, one loop per job type"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: dict[str, int],
+        max_attempts: int,
+        lease_seconds: int,
+        poll_interval: float,
+        maintenance_interval: float,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.maintenance_interval = maintenance_interval
+        self._loops: list[asyncio.Task] = []
+        self._running: set[asyncio.Task] = set()
+
+    async def _execute(self, job: Job) -> None:
+        handler = HANDLERS.get(job.type)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for job type {job.type}")
+            # Finish (or give up) before the lease lets someone else start it
+            with span(f"job.{job.type}", job_id=job.id, attempt=job.attempts):
+                await asyncio.wait_for(handler(job.payload), self.lease_seconds * 0.9)
+        except asyncio.CancelledError:
+            # Shutting down - the lease expires and the job runs again
+            raise
+        except Exception as e:
+            JOB_SECONDS.labels(job.type, "error").observe(time.perf_counter() - started)
+            error = f"{type(e).__name__}: {e}"[:1000]
+            if job.attempts >= self.max_attempts or handler is None:
+                print(f"❌ Job {job.id} failed after {job.attempts} attempts: {error}")
+                await self.queue.backend.fail(job, error)
+            else:
+                await self.queue.backend.retry(job, error, retry_delay(job.attempts))
+            return
+        JOB_SECONDS.labels(job.type, "ok").observe(time.perf_counter() - started)
+        await self.queue.backend.complete(job)
+
+    async def _run(self, job: Job) -> None:
+        try:
+            await self._execute(job)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Job {job.id} bookkeeping failed: {e}")
+
+    async def _loop(self, job_type: str, limit: int) -> None:
+        running: set[asyncio.Task] = set()
+        while True:
+            jobs = []
+            free = limit - len(running)
+            if free > 0:
+                try:
+                    jobs = await self.queue.backend.claim(job_type, free, self.lease_seconds)
+                except Exception as e:
+                    print(f"⚠️ Claiming {job_type} jobs failed: {e}")
+
+            for job in jobs:
+                task = asyncio.create_task(self._run(job))
+                for tasks in (running, self._running):
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            if len(running) >= limit:
+                await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            elif not jobs:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                await self.queue.backend.maintain(self.maintenance_interval)
+            except Exception as e:
+                print(f"⚠️ Job queue maintenance failed: {e}")
+            await asyncio.sleep(self.maintenance_interval)
+
+    def start(self) -> None:
+        for job_type, limit in self.concurrency.items():
+            self._loops.append(asyncio.create_task(self._loop(job_type, limit)))
+        self._loops.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self, grace_seconds: float = 10.0) -> None:
+        """Stop claiming, give running jobs a moment to finish"""
+        for task in self._loops:
+            task.cancel()
+        await asyncio.gather(*self._loops, return_exceptions=True)
+        self._loops = []
+
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=grace_seconds)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def create_job_backend(settings) -> JobBackend:
+    if settings.job_backend == "postgres":
+        return PostgresJobBackend(settings.job_failed_retention_days)
+    return RedisJobBackend(settings.redis_url, settings.job_failed_retention_days)
+
+
+settings = get_settings()
+
+# Global instances
+job_queue = JobQueue(create_job_backend(settings))
+job_worker = JobWorker(
+    job_queue,
+    concurrency=settings.job_concurrency,
+    max_attempts=settings.job_max_attempts,
+    lease_seconds=settings.job_lease_seconds,
+    poll_interval=settings.job_poll_interval_seconds,
+    maintenance_interval=settings.job_maintenance_interval_seconds,
+)
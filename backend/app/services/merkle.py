@@ -0,0 +1,157 @@
+"""
+Merkle trees over evidence content hashes
+
+Leaves and inner nodes are hashed with different prefixes (RFC 6962
+style) so a leaf can never be passed off as a node. An odd node at the
+end of a level is carried up unchanged rather than duplicated.
+"""
+
+import hashlib
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(content_hash: str) -> bytes:
+    """Leaf for a hex SHA-256 content hash"""
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(content_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_tree(content_hashes: list[str]) -> tuple[bytes, list[list[list[str]]]]:
+    """
+    Build a tree over content_hashes.
+    Returns (root, proofs) where proofs[i] is the inclusion proof for
+    content_hashes[i]: a list of [side, sibling_hex] pairs from the leaf
+    up, side being "L" when the sibling sits on the left.
+    """
+    if not content_hashes:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+
+    level = [leaf_hash(h) for h in content_hashes]
+    # positions[i] = index of leaf i's ancestor in the current level
+    positions = list(range(len(level)))
+    proofs: list[list[list[str]]] = [[] for _ in content_hashes]
+
+    while len(level) > 1:
+        for leaf, pos in enumerate(positions):
+            sibling = pos ^ 1
+            if sibling < len(level):
+                side = "L" if sibling < pos else "R"
+                proofs[leaf].append([side, level[sibling].hex()])
+
+        next_level = [
+            node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        positions = [pos // 2 for pos in positions]
+        level = next_level
+
+    return level[0], proofs
+
+
+def root_from_proof(content_hash: str, proof: list[list[str]]) -> bytes:
+    """Recompute the root implied by a content hash and its proof"""
+    node = leaf_hash(content_hash)
+    for side, sibling_hex in proof:
+        sibling = bytes.fromhex(sibling_hex)
+        node = node_hash(sibling, node) if side == "L" else node_hash(node, sibling)
+    return node
+
+
+def verify_proof(content_hash: str, proof: list[list[str]], root_hex: str) -> bool:
+    """Whether proof links content_hash to the given root"""
+    try:
+        return root_from_proof(content_hash, proof).hex() == root_hex
+    except (ValueError, TypeError):
+        return False
+
+
+# Append-only logs (app.services.audit) grow one leaf at a time, so their
+# proofs follow RFC 6962: inclusion and consistency proofs are lists of
+# subtree hashes, given here as leaf ranges [start, end). Building trees
+# bottom-up as above yields exactly the RFC 6962 tree shape.
+
+
+def split_point(n: int) -> int:
+    """Largest power of two smaller than n (n > 1)"""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def inclusion_ranges(index: int, size: int) -> list[tuple[str, int, int]]:
+    """
+    Subtrees forming the inclusion proof of leaf `index` in a tree of
+    `size` leaves, as (side, start, end) from the leaf up - the same
+    order and sides as build_tree's proofs.
+    """
+    path = []
+    start, end = 0, size
+    while end - start > 1:
+        k = split_point(end - start)
+        if index - start < k:
+            path.append(("R", start + k, end))
+            end = start + k
+        else:
+            path.append(("L", start, start + k))
+            start += k
+    return path[::-1]
+
+
+def consistency_ranges(old_size: int, new_size: int) -> list[tuple[int, int]]:
+    """Subtrees forming the RFC 6962 consistency proof between two sizes"""
+    if not 0 < old_size <= new_size:
+        raise ValueError("Need 0 < old_size <= new_size")
+    proof = []
+    start, end, m, complete = 0, new_size, old_size, True
+    while m != end - start:
+        k = split_point(end - start)
+        if m <= k:
+            proof.append((start + k, end))
+            end = start + k
+        else:
+            proof.append((start, start + k))
+            start += k
+            m -= k
+            complete = False
+    if not complete:
+        proof.append((start, end))
+    return proof[::-1]
+
+
+def verify_consistency(
+    old_size: int, new_size: int, old_root: bytes, new_root: bytes, proof: list[bytes]
+) -> bool:
+    """Whether proof shows the old tree is a prefix of the new (RFC 9162 2.1.4.2)"""
+    if not 0 < old_size <= new_size:
+        return False
+    if old_size == new_size:
+        return not proof and old_root == new_root
+    if old_size & (old_size - 1) == 0:
+        proof = [old_root] + proof
+    if not proof:
+        return False
+
+    fn, sn = old_size - 1, new_size - 1
+    while fn & 1:
+        fn >>= 1
+        sn >>= 1
+
+    fr = sr = proof[0]
+    for c in proof[1:]:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            fr = node_hash(c, fr)
+            sr = node_hash(c, sr)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            sr = node_hash(sr, c)
+        fn >>= 1
+        sn >>= 1
+
+    return sn == 0 and fr == old_root and sr == new_root
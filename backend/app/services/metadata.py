@@ -0,0 +1,274 @@
+"""
+Capture metadata extraction
+
+Pulls capture time and location out of uploaded files: EXIF/XMP from
+photos, CreationDate/XMP from PDFs. Only a bounded window of the file is
+read - the header (and for PDFs the trailer, where the Info dictionary
+usually lives) - so cost doesn't grow with file size. Runs as a
+background job after the upload commits (items start out with the
+upload time as captured_at); parsing happens in a process pool, off the
+event loop.
+"""
+
+import io
+import re
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from PIL import Image
+from sqlalchemy import update
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.models.evidence import EvidenceItem
+from app.services.cache import evidence_cache
+from app.services.geo import encode_geohash
+from app.services.jobs import Job, job_handler
+from app.services.storage import storage_service
+
+# EXIF tags
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+TAG_DATETIME = 306
+TAG_DATETIME_ORIGINAL = 36867
+TAG_OFFSET_TIME_ORIGINAL = 36881
+
+XMP_DATE_TAGS = ("exif:DateTimeOriginal", "photoshop:DateCreated", "xmp:CreateDate")
+XMP_LOCATION_TAGS = ("Iptc4xmpCore:Location", "photoshop:City")
+
+
+def _parse_exif_datetime(value: str, offset: Optional[str]) -> Optional[datetime]:
+    try:
+        dt = datetime.strptime(value.strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    if offset:
+        try:
+            return datetime.fromisoformat(f"{dt.isoformat()}{offset.strip()}")
+        except ValueError:
+            pass
+    # No offset recorded - camera local time, treated as UTC
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def _parse_iso_datetime(value: str) -> Optional[datetime]:
+    try:
+        dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _parse_pdf_datetime(value: str) -> Optional[datetime]:
+    # D:YYYYMMDDHHmmSSOHH'mm'
+    match = re.match(r"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([+\-Z])?(\d{2})?'?(\d{2})?", value)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, sign, tz_h, tz_m = match.groups()
+    try:
+        dt = datetime(
+            int(year), int(month or 1), int(day or 1),
+            int(hour or 0), int(minute or 0), int(second or 0),
+        )
+    except ValueError:
+        return None
+    if sign in ("+", "-") and tz_h:
+        delta = timedelta(hours=int(tz_h), minutes=int(tz_m or 0))
+        return dt.replace(tzinfo=timezone(delta if sign == "+" else -delta))
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def _gps_to_degrees(value, ref) -> Optional[float]:
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    if ref in ("S", "W", b"S", b"W"):
+        result = -result
+    return result
+
+
+def _from_xmp(data: bytes, result: dict) -> None:
+    start = data.find(b"<x:xmpmeta")
+    if start < 0:
+        return
+    end = data.find(b"</x:xmpmeta>", start)
+    xmp = data[start:end if end > 0 else len(data)].decode("utf-8", "ignore")
+
+    def find(tag: str) -> Optional[str]:
+        # Both attribute (tag="v") and element (<tag>v</tag>) forms
+        match = re.search(rf'{tag}="([^"]*)"', xmp) or re.search(rf"<{tag}>([^<]*)</{tag}>", xmp)
+        return match.group(1).strip() if match else None
+
+    if "captured_at" not in result:
+        for tag in XMP_DATE_TAGS:
+            value = find(tag)
+            if value and (dt := _parse_iso_datetime(value)):
+                result["captured_at"] = dt
+                break
+
+    if "location_name" not in result:
+        for tag in XMP_LOCATION_TAGS:
+            value = find(tag)
+            if value:
+                result["location_name"] = value[:255]
+                break
+
+
+def _from_image(data: bytes, result: dict) -> None:
+    try:
+        # Pillow only parses headers on open; pixel data is never decoded
+        with Image.open(io.BytesIO(data)) as img:
+            exif = img.getexif()
+    except Exception:
+        return
+
+    exif_ifd = exif.get_ifd(EXIF_IFD)
+    raw_dt = exif_ifd.get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME)
+    if raw_dt:
+        dt = _parse_exif_datetime(str(raw_dt), exif_ifd.get(TAG_OFFSET_TIME_ORIGINAL))
+        if dt:
+            result["captured_at"] = dt
+
+    gps = exif.get_ifd(GPS_IFD)
+    if gps:
+        latitude = _gps_to_degrees(gps.get(2), gps.get(1))
+        longitude = _gps_to_degrees(gps.get(4), gps.get(3))
+        if latitude is not None and longitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            result["latitude"] = round(latitude, 8)
+            result["longitude"] = round(longitude, 8)
+
+
+def _from_pdf(data: bytes, result: dict) -> None:
+    match = re.search(rb"/CreationDate\s*\((D:[^)]+)\)", data)
+    if match:
+        dt = _parse_pdf_datetime(match.group(1).decode("latin-1"))
+        if dt:
+            result["captured_at"] = dt
+
+
+def extract_metadata(data: bytes, mime_type: str) -> dict:
+    """
+    Capture time / location found in a file's header/trailer window, as
+    EvidenceItem column values. Runs in a worker process; missing fields
+    are left out.
+    """
+    result: dict = {}
+    if mime_type == "application/pdf":
+        _from_pdf(data, result)
+    elif mime_type.startswith("image/"):
+        _from_image(data, result)
+    else:
+        return result
+    _from_xmp(data, result)
+
+    # A capture time in the future is a broken camera clock, not evidence
+    captured_at = result.get("captured_at")
+    if captured_at and captured_at > datetime.now(timezone.utc) + timedelta(days=1):
+        del result["captured_at"]
+    return result
+
+
+def has_metadata(mime_type: Optional[str]) -> bool:
+    return bool(mime_type) and (mime_type.startswith("image/") or mime_type == "application/pdf")
+
+
+class MetadataExtractor:
+    """Runs extract_metadata in a small process pool"""
+
+    def __init__(self, workers: int, header_bytes: int, timeout: float = 5.0):
+        self.workers = workers
+        self.header_bytes = header_bytes
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @staticmethod
+    def job(evidence_id: UUID, key: str, size: int, mime_type: Optional[str]) -> Optional[Job]:
+        """Job for a committed upload, or None if its type carries no metadata"""
+        if not has_metadata(mime_type):
+            return None
+        return Job(
+            id=f"metadata:{evidence_id}",
+            type="metadata",
+            payload={"evidence_id": str(evidence_id), "key": key, "size": size, "mime_type": mime_type},
+        )
+
+    async def _read_window(self, key: str, size: int, mime_type: str) -> bytes:
+        """The header, plus the trailer for PDFs, from storage"""
+        ranges = [(0, min(self.header_bytes, size))]
+        if mime_type == "application/pdf" and size > self.header_bytes:
+            ranges.append((max(self.header_bytes, size - self.header_bytes), size))
+
+        chunks = []
+        for start, end in ranges:
+            async for chunk in storage_service.backend.iter_range(key, start, end):
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def extract(self, key: str, size: int, mime_type: Optional[str]) -> dict:
+        """Metadata for a stored file; {} if it has none or can't be parsed"""
+        if not has_metadata(mime_type):
+            return {}
+        data = await self._read_window(key, size, mime_type)
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self.pool, extract_metadata, data, mime_type),
+                self.timeout,
+            )
+        except Exception as e:
+            # Malformed files won't parse on a retry either
+            print(f"⚠️ Metadata extraction failed for {key}: {e}")
+            return {}
+
+    async def apply(self, evidence_id: UUID, key: str, size: int, mime_type: Optional[str]) -> None:
+        """Extract and store capture time / location on the item"""
+        meta = await self.extract(key, size, mime_type)
+        if "latitude" in meta:
+            meta["geohash"] = encode_geohash(meta["latitude"], meta["longitude"])
+        if not meta:
+            return
+
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(EvidenceItem)
+                .where(EvidenceItem.id == evidence_id)
+                .values(**meta)
+                .returning(EvidenceItem.user_id)
+            )
+            user_ids = result.scalars().all()
+            await session.commit()
+
+        # Moves in the timeline - cached listings are stale
+        await evidence_cache.invalidate(*user_ids)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+settings = get_settings()
+
+# Global instance
+metadata_extractor = MetadataExtractor(
+    workers=settings.metadata_workers,
+    header_bytes=settings.metadata_header_bytes,
+)
+
+
+@job_handler("metadata")
+async def metadata_job(payload: dict) -> None:
+    await metadata_extractor.apply(
+        UUID(payload["evidence_id"]), payload["key"], payload["size"], payload["mime_type"]
+    )
@@ -0,0 +1,182 @@
+"""
+Storage quota accounting
+
+User.storage_used_bytes is a running total, adjusted by an atomic
+UPDATE in the same transaction as each evidence insert/delete - no SUM
+over the user's items on the upload path. The charge is conditional on
+staying within the tier's limit, so concurrent uploads can't overshoot.
+
+A background reconciler walks users in small keyset batches and fixes
+any drift against the actual item sizes. It only row-locks the batch it
+is working on (skipping users with an upload/delete in flight), never
+the whole table.
+"""
+
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.models.evidence import EvidenceItem
+from app.models.user import User
+from app.services.cache import evidence_cache
+
+settings = get_settings()
+
+
+class QuotaExceeded(Exception):
+    """The upload doesn't fit in the user's remaining quota"""
+
+    def __init__(self, used: int, limit: int, requested: int):
+        self.used = used
+        self.limit = limit
+        self.requested = requested
+        super().__init__(f"Storage quota exceeded: {used} + {requested} > {limit} bytes")
+
+
+def quota_limit(tier: Optional[str]) -> Optional[int]:
+    """Bytes allowed for a subscription tier; None means unlimited"""
+    limits = settings.storage_quota_bytes
+    return limits.get(tier or "free", limits.get("free"))
+
+
+async def check_quota(db: AsyncSession, user: User, incoming: int) -> None:
+    """
+    Cheap early rejection before any bytes are stored. Reads the live
+    counter (the authenticated user may come from cache); charge() is
+    what actually enforces the limit.
+    """
+    limit = quota_limit(user.subscription_tier)
+    if limit is None:
+        return
+    used = (await db.execute(
+        select(User.storage_used_bytes).where(User.id == user.id)
+    )).scalar_one()
+    if used + incoming > limit:
+        raise QuotaExceeded(used, limit, incoming)
+
+
+async def charge(db: AsyncSession, user: User, size: int) -> None:
+    """
+    Add size bytes to the user's usage, in the caller's transaction.
+    Takes the user's row lock - call it before inserting the item so the
+    reconciler skips this user until the transaction ends.
+    """
+    limit = quota_limit(user.subscription_tier)
+    stmt = (
+        update(User)
+        .where(User.id == user.id)
+        .values(storage_used_bytes=User.storage_used_bytes + size)
+        .returning(User.storage_used_bytes)
+    )
+    if limit is not None:
+        stmt = stmt.where(User.storage_used_bytes + size <= limit)
+
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
+        used = (await db.execute(
+            select(User.storage_used_bytes).where(User.id == user.id)
+        )).scalar_one()
+        raise QuotaExceeded(used, limit, size)
+
+
+async def release(db: AsyncSession, user_id: UUID, size: int) -> None:
+    """Give back size bytes, in the caller's transaction (before the delete)"""
+    await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(storage_used_bytes=func.greatest(User.storage_used_bytes - size, 0))
+    )
+
+
+class QuotaReconciler:
+    """Periodically corrects storage_used_bytes drift, a batch at a time"""
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def reconcile_batch(self, after: Optional[UUID]) -> tuple[Optional[UUID], int]:
+        """
+        Reconcile the next batch of users after `after` (keyset on id).
+        Returns (last id seen or None when done, users corrected).
+        """
+        async with async_session_maker() as session:
+            query = select(User.id).order_by(User.id).limit(self.batch_size)
+            if after is not None:
+                query = query.where(User.id > after)
+            ids = (await session.execute(query)).scalars().all()
+            if not ids:
+                return None, 0
+
+            # Row locks on this batch only; busy users wait for the next pass
+            locked = (await session.execute(
+                select(User.id, User.storage_used_bytes)
+                .where(User.id.in_(ids))
+                .with_for_update(skip_locked=True)
+            )).all()
+
+            actual = dict((await session.execute(
+                select(EvidenceItem.user_id, func.coalesce(func.sum(EvidenceItem.file_size_bytes), 0))
+                .where(EvidenceItem.user_id.in_([row.id for row in locked]))
+                .group_by(EvidenceItem.user_id)
+            )).all())
+
+            drifted = [
+                {"b_id": row.id, "b_used": actual.get(row.id, 0)}
+                for row in locked
+                if row.storage_used_bytes != actual.get(row.id, 0)
+            ]
+            if drifted:
+                table = User.__table__
+                await session.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("b_id"))
+                    .values(storage_used_bytes=bindparam("b_used")),
+                    drifted,
+                )
+            await session.commit()
+
+        if drifted:
+            await evidence_cache.invalidate(*(row["b_id"] for row in drifted))
+        return ids[-1], len(drifted)
+
+    async def reconcile(self) -> int:
+        """One full pass over all users; returns how many were corrected"""
+        after, corrected = None, 0
+        while True:
+            after, fixed = await self.reconcile_batch(after)
+            corrected += fixed
+            if after is None:
+                return corrected
+            # Let uploads in between batches
+            await asyncio.sleep(0)
+
+    async def _loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                corrected = await self.reconcile()
+                if corrected:
+                    print(f"🧮 Corrected storage usage for {corrected} users")
+            except Exception as e:
+                print(f"⚠️ Quota reconciliation failed: {e}")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(settings.quota_reconcile_interval_seconds))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+quota_reconciler = QuotaReconciler(batch_size=settings.quota_reconcile_batch_size)
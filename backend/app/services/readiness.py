@@ -0,0 +1,122 @@
+"""
+Readiness
+
+Startup does no I/O: no DDL (the schema is managed by Alembic, applied
+out of band with `alembic upgrade head`) and no connections - the
+engine, Redis and S3 clients all connect on first use. Warm-up happens
+in the background instead: open a few pooled DB connections, check the
+schema is at the latest migration, make sure storage answers (creating
+the bucket / upload directory if needed) and ping Redis. /health/ready
+turns 200 once the required checks have passed, so a load balancer only
+sends traffic to warm workers.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.core.database import Base, engine
+from app.services.cache import evidence_cache
+from app.services.jobs import job_queue
+from app.services.storage import storage_service
+
+settings = get_settings()
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Redis is optional at runtime (the cache falls back to memory, enqueue
+# failures are logged), so it's reported but doesn't gate readiness
+REQUIRED = ("database", "schema", "storage")
+
+
+def head_revision() -> str:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_current_head()
+
+
+class Readiness:
+    """Background warm-up, retried until the required checks pass"""
+
+    def __init__(self):
+        self.checks: dict[str, str] = {}
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def warm_database(self, connections: int) -> None:
+        """Open (and keep pooled) a few connections, so first requests don't pay for them"""
+        async def ping():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        await asyncio.gather(*(ping() for _ in range(max(connections, 1))))
+
+    async def check_schema(self) -> None:
+        """At the latest migration, and every mapped column is really there"""
+        async with engine.connect() as conn:
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+            present = set((await conn.execute(text(
+                "SELECT table_name, column_name FROM information_schema.columns "
+                "WHERE table_schema = current_schema()"
+            ))).all())
+        expected = await asyncio.to_thread(head_revision)
+        if current != expected:
+            raise RuntimeError(f"at {current}, expected {expected} - run `alembic upgrade head`")
+
+        missing = [
+            f"{table.name}.{column.name}"
+            for table in Base.metadata.sorted_tables
+            for column in table.columns
+            if (table.name, column.name) not in present
+        ]
+        if missing:
+            raise RuntimeError(f"at {current} but missing {', '.join(missing[:5])} - was it stamped without migrating?")
+
+    async def ping_redis(self) -> None:
+        clients = [evidence_cache.redis, getattr(job_queue.backend, "redis", None)]
+        await asyncio.gather(*(client.ping() for client in clients if client is not None))
+
+    async def _check(self, name: str, check) -> None:
+        try:
+            await check
+            self.checks[name] = "ok"
+        except Exception as e:
+            self.checks[name] = f"error: {e}"
+
+    async def warm_up(self) -> bool:
+        await asyncio.gather(
+            self._check("database", self.warm_database(settings.readiness_warm_connections)),
+            self._check("schema", self.check_schema()),
+            self._check("storage", storage_service.ensure_bucket_exists()),
+            self._check("redis", self.ping_redis()),
+        )
+        return all(self.checks[name] == "ok" for name in REQUIRED)
+
+    async def _loop(self, interval: float) -> None:
+        while not await self.warm_up():
+            failing = ", ".join(f"{name} ({status})" for name, status in self.checks.items() if status != "ok")
+            print(f"⏳ Not ready yet: {failing}")
+            await asyncio.sleep(interval)
+        self.ready = True
+        print("✅ Ready")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(settings.readiness_retry_seconds))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.ready = False
+
+
+# Global instance
+readiness = Readiness()
@@ -1,105 +1,323 @@
 """
-Storage service using local file system (Railway Volume)
-For production, upgrade to Cloudflare R2 or AWS S3
+Storage service - streams uploads and manages blob references on top of
+a pluggable backend (local disk or S3/MinIO, see storage_backends.py)
+
+Evidence files are content-addressed: each blob lives under
+blobs/ab/cd/<sha256> and is shared by every item with that hash.
+
+Request transactions never delete files. Releasing the last reference
+leaves the blob row at ref_count 0, and collect_garbage() removes such
+blobs later, holding their row locks; an upload of the same content
+meanwhile waits, then stores the file again. Rows therefore never point
+at a file that has gone.
 """
 
 import os
+import time
 import uuid
+import asyncio
+import zlib
+import hashlib
 import aiofiles
 from pathlib import Path
-from typing import Optional
 from datetime import datetime
+from typing import Optional
 
+from fastapi import UploadFile
+from sqlalchemy import select, update, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import Settings, get_settings
+from app.core.database import async_session_maker
+from app.core.metrics import UPLOAD_BYTES, instrument_storage, observe_hashing
+from app.models.blob import Blob
+from app.services.storage_backends import StorageBackend, create_storage_backend
+
+# Read uploads in 1 MiB pieces so memory per upload stays bounded
+CHUNK_SIZE = 1024 * 1024
+
+# Session.info key for files to delete once the transaction commits
+RELEASED_KEY = "alibi_released_files"
+
+
+class ContentHasher:
+    """SHA-256 (the content address) and CRC-32 (for ZIP export) in one pass"""
 
-class StorageService:
     def __init__(self):
-        # Use /app/uploads for Railway, or local uploads folder
-        self.upload_dir = Path(os.getenv("UPLOAD_DIR", "/app/uploads"))
+        self.sha256 = hashlib.sha256()
+        self.crc32 = 0
+
+    def update(self, chunk: bytes) -> None:
+        started = time.perf_counter()
+        self.sha256.update(chunk)
+        self.crc32 = zlib.crc32(chunk, self.crc32)
+        observe_hashing(len(chunk), time.perf_counter() - started)
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
+class StorageService:
+    def __init__(self, backend: StorageBackend, settings: Settings):
+        self.backend = backend
+        self.settings = settings
+        self._gc_task: Optional[asyncio.Task] = None
         
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
     async def ensure_bucket_exists(self):
-        """Create upload directory if it doesn't exist"""
-        try:
-            self.upload_dir.mkdir(parents=True, exist_ok=True)
-            print(f"✅ Storage ready: {self.upload_dir}")
-        except Exception as e:
-            print(f"⚠️ Storage warning: {e}")
-            # Fallback to temp directory
-            self.upload_dir = Path("/tmp/uploads")
-            self.upload_dir.mkdir(parents=True, exist_ok=True)
-            print(f"✅ Using fallback storage: {self.upload_dir}")
+        """Create the bucket/upload directory if it doesn't exist"""
+        await self.backend.ensure_ready()
     
-    async def upload_file(
-        self, 
-        file_content: bytes, 
-        filename: str,
-        content_type: str = "application/octet-stream",
-        user_id: Optional[str] = None
+    def blob_key(self, content_hash: str) -> str:
+        """Storage key for a blob, sharded as blobs/ab/cd/<hash>"""
+        return f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+
+    def thumbnail_key(self, content_hash: str, size: int) -> str:
+        """Derivatives sit next to their blob and are shared like it"""
+        return f"{self.blob_key(content_hash)}.thumb-{size}.{self.settings.thumbnail_format}"
+
+    @instrument_storage
+    async def upload_stream(
+        self,
+        file: UploadFile,
+        chunk_size: int = CHUNK_SIZE,
     ) -> dict:
         """
-        Upload a file to local storage
-        Returns dict with file info
+        Stream an upload to a temp file, hashing it as it is written.
+        The blob is not visible until commit_blob() moves it into place
+        under its content-addressed key.
+        Returns dict with file info, including the SHA-256 content hash.
         """
-        # Generate unique filename
-        ext = Path(filename).suffix
-        unique_name = f"{uuid.uuid4()}{ext}"
-        
-        # Create user subdirectory if user_id provided
-        if user_id:
-            file_dir = self.upload_dir / str(user_id)
-        else:
-            file_dir = self.upload_dir
-            
-        file_dir.mkdir(parents=True, exist_ok=True)
-        file_path = file_dir / unique_name
-        
-        # Write file
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
-        
-        # Return file info
+        tmp_dir = self.backend.scratch_dir
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{uuid.uuid4()}.part"
+
+        hasher = ContentHasher()
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as f:
+                while chunk := await file.read(chunk_size):
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    UPLOAD_BYTES.inc(len(chunk))
+                    await f.write(chunk)
+                await f.flush()
+                await asyncio.to_thread(os.fsync, f.fileno())
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        return self.stored_file(
+            tmp_path,
+            content_hash=hasher.hexdigest(),
+            size=size,
+            filename=file.filename,
+            content_type=file.content_type,
+            crc32=hasher.crc32,
+        )
+
+    def stored_file(
+        self,
+        tmp_path: Path,
+        content_hash: str,
+        size: int,
+        filename: Optional[str],
+        content_type: Optional[str],
+        crc32: Optional[int] = None,
+    ) -> dict:
+        """File info for a finished, hashed temp file awaiting commit_blob()"""
         return {
-            "filename": unique_name,
             "original_filename": filename,
-            "path": str(file_path),
-            "size": len(file_content),
-            "content_type": content_type,
+            "key": self.blob_key(content_hash),
+            "tmp_path": str(tmp_path),
+            "size": size,
+            "content_hash": content_hash,
+            "crc32": crc32,
+            "content_type": content_type or "application/octet-stream",
+            "created": False,
             "uploaded_at": datetime.utcnow().isoformat()
         }
+
+    async def commit_blob(self, db: AsyncSession, stored: dict) -> None:
+        """
+        Take a reference on the blob for a streamed upload.
+        The first reference moves the temp file into place; duplicates
+        just drop the temp file, so they cost a metadata insert only.
+        Runs inside the caller's transaction - the row lock on the blob
+        serialises this against collect_garbage() for the same hash.
+        """
+        await self.commit_blobs(db, [stored])
+
+    @instrument_storage
+    async def commit_blobs(self, db: AsyncSession, stored_files: list[dict], concurrency: int = 8) -> None:
+        """
+        commit_blob() for many uploads: one upsert for all of them (a row
+        per distinct hash, carrying how many references it gains), then
+        new files are moved into place with bounded concurrency
+        """
+        by_hash: dict[str, list[dict]] = {}
+        for stored in stored_files:
+            by_hash.setdefault(stored["content_hash"], []).append(stored)
+        if not by_hash:
+            return
+
+        # Sorted, so concurrent batches take blob row locks in the same order
+        insert = pg_insert(Blob).values([
+            {
+                "content_hash": content_hash,
+                "size_bytes": group[0]["size"],
+                "crc32": group[0].get("crc32"),
+                "ref_count": len(group),
+            }
+            for content_hash, group in sorted(by_hash.items())
+        ])
+        await db.execute(insert.on_conflict_do_update(
+            index_elements=[Blob.content_hash],
+            set_={
+                "ref_count": Blob.ref_count + insert.excluded.ref_count,
+                "crc32": func.coalesce(Blob.crc32, insert.excluded.crc32),
+            },
+        ))
+
+        limit = asyncio.Semaphore(concurrency)
+
+        async def place(group: list[dict]) -> None:
+            first, *duplicates = group
+            async with limit:
+                if await self.backend.exists(first["key"]):
+                    Path(first["tmp_path"]).unlink(missing_ok=True)
+                else:
+                    await self.backend.put_file(Path(first["tmp_path"]), first["key"], first["content_type"])
+                    first["created"] = True
+            for stored in duplicates:
+                Path(stored["tmp_path"]).unlink(missing_ok=True)
+
+        # Let every move finish before reporting a failure, so the
+        # caller's discard_upload() sees a settled "created" flag
+        results = await asyncio.gather(*(place(group) for group in by_hash.values()), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def discard_upload(self, stored: dict) -> None:
+        """
+        Clean up after an upload whose DB transaction failed. A file it
+        moved into place stays: a concurrent upload of the same content
+        may have committed against it. It's recorded as an unreferenced
+        blob instead, for collect_garbage() to remove if nothing has.
+        """
+        Path(stored["tmp_path"]).unlink(missing_ok=True)
+        if not stored.get("created"):
+            return
+        try:
+            async with async_session_maker() as session:
+                await session.execute(
+                    pg_insert(Blob)
+                    .values(
+                        content_hash=stored["content_hash"],
+                        size_bytes=stored["size"],
+                        crc32=stored.get("crc32"),
+                        ref_count=0,
+                    )
+                    .on_conflict_do_nothing(index_elements=[Blob.content_hash])
+                )
+                await session.commit()
+        except Exception as e:
+            print(f"⚠️ Couldn't record orphaned blob {stored['key']}: {e}")
+
+    async def release_blob(self, db: AsyncSession, content_hash: str, file_path: str) -> None:
+        """
+        Drop one reference to a blob, inside the caller's transaction.
+        Nothing is deleted here: a blob left without references goes in
+        the next collect_garbage(). Files stored before the content-
+        addressed layout have no blob row; they're deleted by
+        delete_released() once the caller has committed.
+        """
+        if file_path != self.blob_key(content_hash):
+            db.info.setdefault(RELEASED_KEY, []).append(file_path)
+            return
+
+        await db.execute(
+            update(Blob)
+            .where(Blob.content_hash == content_hash)
+            .values(ref_count=Blob.ref_count - 1)
+        )
+
+    async def delete_released(self, db: AsyncSession) -> None:
+        """Delete files released on db (after it commits)"""
+        for key in db.info.pop(RELEASED_KEY, []):
+            try:
+                await self.delete_file(key)
+            except Exception as e:
+                print(f"⚠️ Couldn't delete released file {key}: {e}")
+
+    async def collect_garbage(self, limit: int = 500) -> int:
+        """
+        Delete blobs nothing references (files, thumbnails, then rows);
+        returns how many. Files go while the row locks are held, so an
+        upload of the same content waits and then stores it again. If
+        the commit fails, the rows stay at zero references (an upload
+        taking one re-stores the file, commit_blobs() checks) and are
+        retried next time.
+        """
+        async with async_session_maker() as session:
+            hashes = (await session.execute(
+                select(Blob.content_hash)
+                # A literal, so the partial index's predicate matches
+                .where(Blob.ref_count <= literal_column("0"))
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+            if not hashes:
+                return 0
+
+            for content_hash in hashes:
+                for size in self.settings.thumbnail_sizes:
+                    await self.delete_file(self.thumbnail_key(content_hash, size))
+                await self.delete_file(self.blob_key(content_hash))
+
+            await session.execute(
+                delete(Blob).where(Blob.content_hash.in_(hashes), Blob.ref_count <= 0)
+            )
+            await session.commit()
+        return len(hashes)
+
+    async def _gc_loop(self, interval: float) -> None:
+        while True:
+            try:
+                removed = await self.collect_garbage()
+                if removed:
+                    print(f"🧹 Removed {removed} unreferenced blobs")
+                    continue
+            except Exception as e:
+                print(f"⚠️ Blob cleanup failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start_gc(self) -> None:
+        self._gc_task = asyncio.create_task(self._gc_loop(self.settings.blob_gc_interval_seconds))
+
+    async def stop_gc(self) -> None:
+        if self._gc_task:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            self._gc_task = None
+
+    async def delete_file(self, key: str) -> bool:
+        """Delete a stored file by key"""
+        return await self.backend.delete(key)
     
-    async def get_file(self, filename: str, user_id: Optional[str] = None) -> Optional[bytes]:
-        """Get file content by filename"""
-        if user_id:
-            file_path = self.upload_dir / str(user_id) / filename
-        else:
-            file_path = self.upload_dir / filename
-            
-        if not file_path.exists():
-            # Try without user_id subdirectory
-            file_path = self.upload_dir / filename
-            
-        if file_path.exists():
-            async with aiofiles.open(file_path, 'rb') as f:
-                return await f.read()
-        return None
-    
-    async def delete_file(self, filename: str, user_id: Optional[str] = None) -> bool:
-        """Delete a file"""
-        if user_id:
-            file_path = self.upload_dir / str(user_id) / filename
-        else:
-            file_path = self.upload_dir / filename
-            
-        if file_path.exists():
-            file_path.unlink()
-            return True
-        return False
-    
-    def get_file_url(self, filename: str, user_id: Optional[str] = None) -> str:
-        """Get URL for accessing file (for API endpoint)"""
-        if user_id:
-            return f"/api/files/{user_id}/{filename}"
-        return f"/api/files/{filename}"
+    async def get_download_url(self, key: str) -> Optional[str]:
+        """Direct URL for the file, or None if the API serves it"""
+        return await self.backend.get_download_url(key)
 
 
 # Global instance
-storage_service = StorageService()
\ No newline at end of file
+settings = get_settings()
+storage_service = StorageService(create_storage_backend(settings), settings)
@@ -0,0 +1,306 @@
+"""
+Storage backends - where blob bytes actually live
+
+LocalStorageBackend keeps files on disk (Railway Volume / dev box).
+S3StorageBackend talks to S3 or MinIO, so API nodes don't need a shared
+volume. StorageService picks one via settings.storage_backend.
+"""
+
+import os
+import mmap
+import asyncio
+import hashlib
+import tempfile
+
+import aiofiles
+from typing import AsyncIterator, Optional
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from app.core.config import Settings
+from app.core.metrics import instrument_storage
+
+MB = 1024 * 1024
+HASH_CHUNK_SIZE = 8 * MB
+
+
+def hash_file(path: str) -> Optional[str]:
+    """
+    SHA-256 of a local file via a read-only memory map; None if missing.
+    Module-level so it can run in a process pool. The hash is fed
+    memoryview slices of the mapping, so nothing is copied in userspace.
+    """
+    try:
+        with open(path, "rb") as f:
+            hasher = hashlib.sha256()
+            if os.fstat(f.fileno()).st_size == 0:
+                return hasher.hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mm) as view:
+                    for offset in range(0, len(view), HASH_CHUNK_SIZE):
+                        hasher.update(view[offset:offset + HASH_CHUNK_SIZE])
+            return hasher.hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+class StorageBackend(ABC):
+    """Interface every storage backend implements. Keys are relative paths."""
+
+    # Where in-flight uploads are spooled before put_file()
+    scratch_dir: Path
+
+    # Label in metrics and traces
+    name: str
+
+    @abstractmethod
+    async def ensure_ready(self) -> None:
+        """Create the bucket/directory if it doesn't exist"""
+
+    @abstractmethod
+    async def put_file(self, local_path: Path, key: str, content_type: str) -> None:
+        """Move a finished local file into storage under key"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete the object under key; False if it wasn't there"""
+
+    @abstractmethod
+    async def get_download_url(self, key: str) -> Optional[str]:
+        """
+        Direct URL a client can fetch the object from, or None if the
+        API has to serve the bytes itself
+        """
+
+    @abstractmethod
+    async def hash_object(self, key: str) -> Optional[str]:
+        """SHA-256 of the stored object, streamed; None if it's missing"""
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = MB) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end) of the stored object"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path on this machine for key, if the backend stores files locally"""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files on the local file system"""
+
+    name = "local"
+
+    def __init__(self, upload_dir: Path):
+        self.upload_dir = upload_dir
+
+    @property
+    def scratch_dir(self) -> Path:
+        # Same file system as the blobs, so put_file() is an atomic rename
+        return self.upload_dir / "tmp"
+
+    def path_for(self, key: str) -> Path:
+        return self.upload_dir / key
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self.path_for(key)
+
+    async def ensure_ready(self) -> None:
+        try:
+            self.upload_dir.mkdir(parents=True, exist_ok=True)
+            print(f"✅ Storage ready: {self.upload_dir}")
+        except Exception as e:
+            print(f"⚠️ Storage warning: {e}")
+            # Fallback to temp directory
+            self.upload_dir = Path("/tmp/uploads")
+            self.upload_dir.mkdir(parents=True, exist_ok=True)
+            print(f"✅ Using fallback storage: {self.upload_dir}")
+
+    @instrument_storage
+    async def put_file(self, local_path: Path, key: str, content_type: str) -> None:
+        target = self.path_for(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(local_path, target)
+
+    @instrument_storage
+    async def exists(self, key: str) -> bool:
+        return self.path_for(key).exists()
+
+    @instrument_storage
+    async def delete(self, key: str) -> bool:
+        file_path = self.path_for(key)
+        if file_path.exists():
+            file_path.unlink()
+            return True
+        return False
+
+    @instrument_storage
+    async def get_download_url(self, key: str) -> Optional[str]:
+        # Served by GET /evidence/{id}/file
+        return None
+
+    @instrument_storage
+    async def hash_object(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(hash_file, str(self.path_for(key)))
+
+    @instrument_storage
+    async def iter_range(self, key: str, start: int, end: int, chunk_size: int = MB) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path_for(key), "rb") as f:
+            await f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = await f.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise EOFError(f"{key} is shorter than expected")
+                remaining -= len(chunk)
+                yield chunk
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    S3/MinIO via boto3.
+
+    boto3 is synchronous, so calls run in worker threads. One client is
+    shared across them; it is thread-safe and keeps its own connection
+    pool (s3_max_pool_connections). Large files go up as parallel
+    multipart uploads, and presigned URLs are signed locally.
+    """
+
+    name = "s3"
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.bucket = settings.s3_bucket_name
+        self.scratch_dir = Path(tempfile.gettempdir()) / "alibi-uploads"
+        self._client = None
+        self._transfer_config = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=self.settings.s3_endpoint_url,
+                aws_access_key_id=self.settings.aws_access_key_id,
+                aws_secret_access_key=self.settings.aws_secret_access_key,
+                region_name=self.settings.s3_region,
+                config=Config(
+                    max_pool_connections=self.settings.s3_max_pool_connections,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                    signature_version="s3v4",
+                ),
+            )
+        return self._client
+
+    @property
+    def transfer_config(self):
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self.settings.s3_multipart_threshold_mb * MB,
+                multipart_chunksize=self.settings.s3_multipart_chunksize_mb * MB,
+                max_concurrency=self.settings.s3_multipart_concurrency,
+                use_threads=True,
+            )
+        return self._transfer_config
+
+    async def ensure_ready(self) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_bucket, Bucket=self.bucket)
+        except ClientError:
+            await asyncio.to_thread(self.client.create_bucket, Bucket=self.bucket)
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        print(f"✅ Storage ready: s3://{self.bucket}")
+
+    @instrument_storage
+    async def put_file(self, local_path: Path, key: str, content_type: str) -> None:
+        try:
+            await asyncio.to_thread(
+                self.client.upload_file,
+                str(local_path),
+                self.bucket,
+                key,
+                ExtraArgs={"ContentType": content_type},
+                Config=self.transfer_config,
+            )
+        finally:
+            local_path.unlink(missing_ok=True)
+
+    @instrument_storage
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    @instrument_storage
+    async def delete(self, key: str) -> bool:
+        # DeleteObject is idempotent; skip the HEAD round trip
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+        return True
+
+    @instrument_storage
+    async def get_download_url(self, key: str) -> Optional[str]:
+        # Pure local computation - signing needs no round trip to S3
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=self.settings.s3_presign_expiry_seconds,
+        )
+
+    @instrument_storage
+    async def hash_object(self, key: str) -> Optional[str]:
+        from botocore.exceptions import ClientError
+
+        def stream_hash() -> Optional[str]:
+            try:
+                body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                    return None
+                raise
+            hasher = hashlib.sha256()
+            for chunk in body.iter_chunks(HASH_CHUNK_SIZE):
+                hasher.update(chunk)
+            return hasher.hexdigest()
+
+        return await asyncio.to_thread(stream_hash)
+
+    @instrument_storage
+    async def iter_range(self, key: str, start: int, end: int, chunk_size: int = MB) -> AsyncIterator[bytes]:
+        if end <= start:
+            return
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end - 1}"
+        )
+        body = response["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+
+def create_storage_backend(settings: Settings) -> StorageBackend:
+    """Build the backend named by settings.storage_backend"""
+    if settings.storage_backend == "s3":
+        return S3StorageBackend(settings)
+    if settings.storage_backend == "local":
+        return LocalStorageBackend(Path(settings.upload_dir))
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
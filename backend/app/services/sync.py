@@ -0,0 +1,168 @@
+"""
+Delta sync
+
+Every evidence row records the id of the transaction that last wrote it
+(change_xid); deletes leave a tombstone carrying the deleting
+transaction's id. A sync token holds a watermark: the xmin of a snapshot
+taken when the previous sync started. Every transaction below it had
+finished by then, so its writes were visible to that sync - the next one
+only needs rows with change_xid >= watermark. Transactions still running
+at the time are above the watermark, so a slow writer can't commit
+"behind" a client that has already synced past it (sequence numbers or
+timestamps alone allow that). The price is that a few rows near the
+watermark can be sent twice, which clients apply idempotently.
+
+Tombstones are kept for sync_tombstone_ttl_days; a token older than
+that can't be served incrementally and the client has to resync.
+"""
+
+import json
+import time
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import delete, false, select, text, true, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.models.evidence import EvidenceItem
+from app.models.tombstone import EvidenceTombstone
+
+settings = get_settings()
+
+# Margin for clock skew and long transactions when expiring tokens
+TOKEN_SLACK_SECONDS = 24 * 3600
+
+
+class SyncTokenExpired(Exception):
+    """The token predates tombstones that have since been purged"""
+
+
+class SyncToken:
+    """
+    Position in a user's change feed. `since` is the watermark being
+    synced from; mid-sync, `horizon` is the watermark the sync will end
+    on and `after` the (change_xid, id) of the last row already sent.
+    """
+
+    def __init__(
+        self,
+        since: int,
+        issued_at: float,
+        horizon: Optional[int] = None,
+        after: Optional[tuple[int, UUID]] = None,
+    ):
+        self.since = since
+        self.issued_at = issued_at
+        self.horizon = horizon
+        self.after = after
+
+    def encode(self) -> str:
+        data = {"s": self.since, "t": int(self.issued_at)}
+        if self.horizon is not None:
+            data["h"] = self.horizon
+        if self.after is not None:
+            data["x"], data["i"] = self.after[0], str(self.after[1])
+        return base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "SyncToken":
+        """Raises ValueError for malformed tokens, SyncTokenExpired for stale ones"""
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()))
+            parsed = cls(
+                since=int(data["s"]),
+                issued_at=float(data["t"]),
+                horizon=int(data["h"]) if "h" in data else None,
+                after=(int(data["x"]), UUID(data["i"])) if "x" in data else None,
+            )
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(str(e))
+
+        max_age = settings.sync_tombstone_ttl_days * 86400 - TOKEN_SLACK_SECONDS
+        if parsed.since and time.time() - parsed.issued_at > max_age:
+            raise SyncTokenExpired()
+        return parsed
+
+
+async def current_watermark(db: AsyncSession) -> int:
+    """xmin of a fresh snapshot: every transaction below it has finished"""
+    return (await db.execute(
+        text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+    )).scalar_one()
+
+
+async def changes_page(db: AsyncSession, user_id: UUID, token: SyncToken, limit: int) -> list:
+    """
+    Up to `limit` changes after the token, in (change_xid, id) order, as
+    rows of (id, change_xid, deleted). A first sync skips tombstones.
+    """
+
+    def changed(model, deleted):
+        query = select(
+            model.id,
+            model.change_xid,
+            (true() if deleted else false()).label("deleted"),
+        ).where(model.user_id == user_id, model.change_xid >= token.since)
+        if token.after is not None:
+            query = query.where(tuple_(model.change_xid, model.id) > tuple_(*token.after))
+        # Each branch can use its (user_id, change_xid, id) index
+        return query.order_by(model.change_xid, model.id).limit(limit)
+
+    branches = [changed(EvidenceItem, False)]
+    if token.since:
+        branches.append(changed(EvidenceTombstone, True))
+
+    feed = union_all(*branches).subquery()
+    result = await db.execute(
+        select(feed)
+        .order_by(feed.c.change_xid, feed.c.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+class TombstonePurger:
+    """Deletes tombstones older than the sync token lifetime"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def purge(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.sync_tombstone_ttl_days)
+        async with async_session_maker() as session:
+            result = await session.execute(
+                delete(EvidenceTombstone).where(EvidenceTombstone.deleted_at < cutoff)
+            )
+            await session.commit()
+        return result.rowcount
+
+    async def _loop(self, interval: float) -> None:
+        while True:
+            try:
+                purged = await self.purge()
+                if purged:
+                    print(f"🪦 Purged {purged} sync tombstones")
+            except Exception as e:
+                print(f"⚠️ Tombstone purge failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(settings.sync_tombstone_purge_interval_seconds))
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+tombstone_purger = TombstonePurger()
@@ -0,0 +1,155 @@
+"""
+Thumbnail / preview generation
+
+Runs as a background job after an upload commits. Decoding and resizing
+happen in a process pool so the event loop never blocks on Pillow.
+Thumbnails are keyed by content hash next to the blob, so identical
+uploads share them and a duplicate never renders twice.
+"""
+
+import os
+import asyncio
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+from uuid import UUID
+
+from PIL import Image, ImageOps
+from sqlalchemy import update
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.models.evidence import EvidenceItem
+from app.services.cache import evidence_cache
+from app.services.jobs import Job, job_handler
+from app.services.storage import storage_service
+from app.services.storage_backends import S3StorageBackend
+
+THUMBNAIL_MIME_TYPES = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+def render_thumbnails(source: str, out_dir: str, sizes: list[int], fmt: str) -> dict[int, str]:
+    """
+    Render one thumbnail per size (longest edge) from an image file.
+    Runs in a worker process. Returns {size: output path}.
+    """
+    outputs = {}
+    with Image.open(source) as img:
+        # Let the JPEG decoder downscale while decoding - far cheaper
+        # than decoding at full resolution and resizing afterwards
+        img.draft("RGB", (max(sizes), max(sizes)))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        if fmt == "jpeg" and img.mode == "RGBA":
+            img = img.convert("RGB")
+
+        # Largest first, each one resized from the previous
+        for size in sorted(sizes, reverse=True):
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            out_path = os.path.join(out_dir, f"thumb-{size}.{fmt}")
+            if fmt == "webp":
+                img.save(out_path, "WEBP", quality=80, method=4)
+            else:
+                img.save(out_path, "JPEG", quality=82, optimize=True, progressive=True)
+            outputs[size] = out_path
+    return outputs
+
+
+class ThumbnailService:
+    """Background derivative pipeline"""
+
+    def __init__(self, sizes: list[int], fmt: str, workers: int):
+        self.sizes = sizes
+        self.fmt = fmt
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @staticmethod
+    def job(evidence_id: UUID, content_hash: str, key: str, mime_type: Optional[str]) -> Optional[Job]:
+        """Job for a committed upload, or None if it has no previews"""
+        if not mime_type or not mime_type.startswith("image/"):
+            return None
+        return Job(
+            id=f"thumbnails:{evidence_id}",
+            type="thumbnails",
+            payload={"content_hash": content_hash, "key": key},
+        )
+
+    async def generate(self, content_hash: str, key: str) -> None:
+        """Render (unless already stored) and attach; raises so the job retries"""
+        if not await self._already_rendered(content_hash):
+            await self._render_and_store(content_hash, key)
+        await self._mark_ready(content_hash)
+
+    async def _already_rendered(self, content_hash: str) -> bool:
+        for size in self.sizes:
+            if not await storage_service.backend.exists(storage_service.thumbnail_key(content_hash, size)):
+                return False
+        return True
+
+    async def _render_and_store(self, content_hash: str, key: str) -> None:
+        backend = storage_service.backend
+        backend.scratch_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=backend.scratch_dir) as work_dir:
+            if isinstance(backend, S3StorageBackend):
+                source = Path(work_dir) / "source"
+                await asyncio.to_thread(backend.client.download_file, backend.bucket, key, str(source))
+            else:
+                source = backend.local_path(key)
+
+            loop = asyncio.get_running_loop()
+            outputs = await loop.run_in_executor(
+                self.pool, render_thumbnails, str(source), work_dir, self.sizes, self.fmt
+            )
+
+            for size, out_path in outputs.items():
+                await backend.put_file(
+                    Path(out_path),
+                    storage_service.thumbnail_key(content_hash, size),
+                    THUMBNAIL_MIME_TYPES[self.fmt],
+                )
+
+    async def _mark_ready(self, content_hash: str) -> None:
+        # Every item sharing the blob gets the previews
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(EvidenceItem)
+                .where(EvidenceItem.content_hash == content_hash)
+                .values(thumbnail_sizes=sorted(self.sizes))
+                .returning(EvidenceItem.user_id)
+            )
+            user_ids = result.scalars().all()
+            await session.commit()
+
+        await evidence_cache.invalidate(*user_ids)
+
+    async def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+settings = get_settings()
+
+# Global instance
+thumbnail_service = ThumbnailService(
+    sizes=settings.thumbnail_sizes,
+    fmt=settings.thumbnail_format,
+    workers=settings.thumbnail_workers,
+)
+
+
+@job_handler("thumbnails")
+async def thumbnails_job(payload: dict) -> None:
+    await thumbnail_service.generate(payload["content_hash"], payload["key"])
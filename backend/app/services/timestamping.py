@@ -0,0 +1,360 @@
+"""
+Batched timestamping service
+
+Uploads don't call a timestamp authority themselves. They hand their
+content hash to the batcher, which collects hashes for a short window,
+builds a Merkle tree, gets ONE timestamp on the root and stores each
+item's inclusion proof in EvidenceItem.timestamp_token.
+"""
+
+import os
+import hmac
+import json
+import base64
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+import httpx
+from sqlalchemy import select, func, bindparam
+
+from app.core.config import Settings, get_settings
+from app.core.database import async_session_maker
+from app.models.evidence import EvidenceItem
+from app.services.cache import evidence_cache
+from app.services.merkle import build_tree
+
+TOKEN_VERSION = 1
+
+# pg_advisory_xact_lock key held while re-queueing pending items
+REQUEUE_LOCK = 0x616C6974
+
+
+class TimestampAuthority(ABC):
+    """Something that can attest a digest existed at a point in time"""
+
+    name: str
+
+    @abstractmethod
+    async def timestamp(self, digest: bytes) -> str:
+        """Return an opaque token (text) over the digest"""
+
+    @abstractmethod
+    def verify(self, digest: bytes, token: str) -> bool:
+        """Whether token was issued over the digest"""
+
+
+class LocalTimestampAuthority(TimestampAuthority):
+    """
+    Stand-in signer for development and tests: an HMAC over the digest
+    and the current time, keyed with the app secret. Proves nothing to
+    a third party.
+    """
+
+    name = "local"
+
+    def __init__(self, secret_key: str):
+        self.key = secret_key.encode()
+
+    async def timestamp(self, digest: bytes) -> str:
+        signed_at = datetime.now(timezone.utc).isoformat()
+        mac = hmac.new(self.key, digest + signed_at.encode(), hashlib.sha256).hexdigest()
+        return json.dumps({"signed_at": signed_at, "hmac": mac})
+
+    def verify(self, digest: bytes, token: str) -> bool:
+        try:
+            data = json.loads(token)
+            mac = hmac.new(self.key, digest + data["signed_at"].encode(), hashlib.sha256).hexdigest()
+            return hmac.compare_digest(mac, data["hmac"])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return False
+
+
+def _der(tag: int, body: bytes) -> bytes:
+    length = len(body)
+    if length < 0x80:
+        return bytes([tag, length]) + body
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([tag, 0x80 | len(encoded)]) + encoded + body
+
+
+def _der_int(value: int) -> bytes:
+    return _der(0x02, value.to_bytes(value.bit_length() // 8 + 1, "big"))
+
+
+# AlgorithmIdentifier for SHA-256 (2.16.840.1.101.3.4.2.1) with NULL params
+_SHA256_ALGORITHM = _der(0x30, bytes.fromhex("0609608648016503040201") + b"\x05\x00")
+
+
+class RFC3161TimestampAuthority(TimestampAuthority):
+    """Timestamps from an RFC 3161 TSA over HTTP"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.name = url
+        self.timeout = timeout
+
+    def build_request(self, digest: bytes, nonce: int) -> bytes:
+        """DER-encoded TimeStampReq asking for the signer cert"""
+        message_imprint = _der(0x30, _SHA256_ALGORITHM + _der(0x04, digest))
+        return _der(0x30, _der_int(1) + message_imprint + _der_int(nonce) + b"\x01\x01\xff")
+
+    async def timestamp(self, digest: bytes) -> str:
+        nonce = int.from_bytes(os.urandom(8), "big")
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(
+                self.url,
+                content=self.build_request(digest, nonce),
+                headers={"Content-Type": "application/timestamp-query"},
+            )
+        response.raise_for_status()
+
+        # TimeStampResp ::= SEQUENCE { status PKIStatusInfo, ... } - just
+        # check the status is granted (0) or grantedWithMods (1); the
+        # full response is kept for offline verification
+        body = response.content
+        status = self._status(body)
+        if status not in (0, 1):
+            raise RuntimeError(f"TSA refused request with status {status}")
+        return base64.b64encode(body).decode()
+
+    def verify(self, digest: bytes, token: str) -> bool:
+        """
+        The response was granted and its message imprint is this digest.
+        The TSA's signature is left to offline tools with its certificate
+        (e.g. `openssl ts -verify`).
+        """
+        try:
+            body = base64.b64decode(token, validate=True)
+            return self._status(body) in (0, 1) and _der(0x04, digest) in body
+        except (ValueError, IndexError, RuntimeError):
+            return False
+
+    @staticmethod
+    def _status(body: bytes) -> int:
+        def skip_header(data: bytes, pos: int) -> int:
+            length = data[pos + 1]
+            if length & 0x80:
+                return pos + 2 + (length & 0x7F)
+            return pos + 2
+
+        pos = skip_header(body, 0)      # TimeStampResp SEQUENCE
+        pos = skip_header(body, pos)    # PKIStatusInfo SEQUENCE
+        if body[pos] != 0x02:
+            raise RuntimeError("Malformed TSA response")
+        length = body[pos + 1]
+        return int.from_bytes(body[pos + 2:pos + 2 + length], "big")
+
+
+def create_timestamp_authority(settings: Settings) -> TimestampAuthority:
+    """RFC 3161 TSA if one is configured, otherwise the local signer"""
+    if settings.timestamp_tsa_url:
+        return RFC3161TimestampAuthority(settings.timestamp_tsa_url)
+    return LocalTimestampAuthority(settings.secret_key)
+
+
+def authority_named(name: Optional[str], settings: Settings) -> Optional[TimestampAuthority]:
+    """The authority that issued tokens stored under this name, to verify them"""
+    if name == LocalTimestampAuthority.name:
+        return LocalTimestampAuthority(settings.secret_key)
+    if name and name.startswith(("http://", "https://")):
+        return RFC3161TimestampAuthority(name)
+    return None
+
+
+class TimestampBatcher:
+    """
+    Collects (evidence_id, content_hash) pairs and timestamps them in
+    Merkle batches - one authority call per batch instead of per item.
+
+    A batch is flushed when it reaches max_batch items or window_seconds
+    after its first item arrived, whichever comes first. Items whose
+    batch fails stay pending and are retried with the next batch.
+
+    Pending items are those with neither a token nor timestamped_at.
+    Rows from before batching have timestamped_at set and no token, and
+    are never picked up (or overwritten) here.
+    """
+
+    def __init__(
+        self,
+        authority: TimestampAuthority,
+        max_batch: int = 1000,
+        window_seconds: float = 5.0,
+    ):
+        self.authority = authority
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self._queue: asyncio.Queue[tuple[UUID, str]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._requeue_task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Items waiting for a batch"""
+        return self._queue.qsize()
+
+    def submit(self, evidence_id: UUID, content_hash: str) -> None:
+        """Queue an item for the next batch; never blocks the request"""
+        self._queue.put_nowait((evidence_id, content_hash))
+
+    async def start(self) -> None:
+        """Start batching, and re-queue whatever was left untimestamped"""
+        self._task = asyncio.create_task(self._run())
+        # Off the startup path: the first boot doesn't wait on this query
+        self._requeue_task = asyncio.create_task(self._requeue())
+
+    async def _requeue(self) -> None:
+        """
+        Queue items a previous process accepted but never timestamped, a
+        page at a time as batches drain. One process does this at a time
+        (advisory lock); the others skip it rather than submit the same
+        items to the authority again.
+        """
+        last_id: Optional[UUID] = None
+        while True:
+            try:
+                async with async_session_maker() as lock_session:
+                    locked = (await lock_session.execute(
+                        select(func.pg_try_advisory_xact_lock(REQUEUE_LOCK))
+                    )).scalar_one()
+                    if not locked:
+                        return
+
+                    while True:
+                        query = (
+                            select(EvidenceItem.id, EvidenceItem.content_hash)
+                            .where(
+                                EvidenceItem.timestamp_token.is_(None),
+                                EvidenceItem.timestamped_at.is_(None),
+                            )
+                            .order_by(EvidenceItem.id)
+                            .limit(self.max_batch)
+                        )
+                        if last_id is not None:
+                            query = query.where(EvidenceItem.id > last_id)
+                        async with async_session_maker() as session:
+                            rows = (await session.execute(query)).all()
+                        if not rows:
+                            break
+                        last_id = rows[-1].id
+                        for evidence_id, content_hash in rows:
+                            self.submit(evidence_id, content_hash)
+
+                        while self.pending >= self.max_batch:
+                            await asyncio.sleep(self.window_seconds)
+
+                    await lock_session.commit()
+                return
+            except Exception as e:
+                print(f"⚠️ Couldn't re-queue untimestamped items: {e}")
+                await asyncio.sleep(5.0)
+
+    async def stop(self) -> None:
+        """Stop batching, flushing whatever is queued"""
+        for task in (self._requeue_task, self._task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._requeue_task = None
+        pending = self._drain(self._queue.qsize())
+        if pending:
+            await self.flush(pending)
+
+    def _drain(self, limit: int) -> list[tuple[UUID, str]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        retry_delay = 1.0
+        carry: list[tuple[UUID, str]] = []
+        while True:
+            batch = carry or [await self._queue.get()]
+            carry = []
+
+            # Fill the batch until it is full or the window closes
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.window_seconds
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self.flush(batch)
+                retry_delay = 1.0
+            except Exception as e:
+                print(f"⚠️ Timestamp batch of {len(batch)} failed: {e}")
+                carry = batch
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 300.0)
+
+    async def flush(self, batch: list[tuple[UUID, str]]) -> None:
+        """Timestamp one batch and store each item's inclusion proof"""
+        root, proofs = build_tree([content_hash for _, content_hash in batch])
+        authority_token = await self.authority.timestamp(root)
+        timestamped_at = datetime.now(timezone.utc)
+
+        rows = [
+            {
+                "b_id": evidence_id,
+                "b_token": json.dumps({
+                    "v": TOKEN_VERSION,
+                    "root": root.hex(),
+                    "index": index,
+                    "batch_size": len(batch),
+                    "proof": proofs[index],
+                    "authority_token": authority_token,
+                }, separators=(",", ":")),
+            }
+            for index, (evidence_id, _) in enumerate(batch)
+        ]
+
+        table = EvidenceItem.__table__
+        stmt = (
+            table.update()
+            .where(
+                table.c.id == bindparam("b_id"),
+                table.c.timestamp_token.is_(None),
+                table.c.timestamped_at.is_(None),
+            )
+            .values(
+                timestamp_token=bindparam("b_token"),
+                timestamp_authority=self.authority.name,
+                timestamped_at=timestamped_at,
+            )
+        )
+        async with async_session_maker() as session:
+            await session.execute(stmt, rows)
+            await session.commit()
+            user_ids = (await session.execute(
+                select(EvidenceItem.user_id.distinct())
+                .where(EvidenceItem.id.in_([evidence_id for evidence_id, _ in batch]))
+            )).scalars().all()
+
+        await evidence_cache.invalidate(*user_ids)
+
+
+settings = get_settings()
+
+# Global instance
+timestamp_batcher = TimestampBatcher(
+    create_timestamp_authority(settings),
+    max_batch=settings.timestamp_batch_max_items,
+    window_seconds=settings.timestamp_batch_window_seconds,
+)
@@ -0,0 +1,327 @@
+"""
+Resumable uploads
+
+The client creates an upload session, appends the file in chunks at the
+session's current offset and completes it once every byte has arrived.
+Bytes are spooled to a partial file in upload_partial_dir, by default
+the storage scratch directory. With local storage that is on the shared
+upload volume. With S3 it's node-local unless upload_partial_dir points
+at a shared mount, so each session is then pinned to the node that
+created it: requests for it elsewhere get 421 and the node's id
+(Upload-Node), for the load balancer to route sessions sticky by it.
+
+An append doesn't hold the session's row lock (or any connection) while
+the body streams in - on a slow uplink that can take minutes. It leases
+the session instead: a token and expiry set in one short transaction,
+renewed as chunks arrive, and checked when the new offset is written.
+
+Python's hash objects can't be serialised, so the running SHA-256 is
+kept in memory on the worker that received the last chunk, together
+with the offset it covers. If the next chunk lands somewhere that
+doesn't have it (another worker, a restart), hashing simply falls back
+to one sequential pass over the assembled file at completion.
+"""
+
+import os
+import uuid
+import shutil
+import socket
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+import aiofiles
+from sqlalchemy import delete, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.core.metrics import UPLOAD_BYTES
+from app.models.upload_session import UploadSession
+from app.services.storage import storage_service, ContentHasher, CHUNK_SIZE
+from app.services.storage_backends import LocalStorageBackend
+
+
+class ChunkOutOfBounds(Exception):
+    """A chunk would run past the declared file size"""
+
+
+class PartialFileElsewhere(Exception):
+    """The session's partial file is on another node"""
+
+    def __init__(self, node: str):
+        self.node = node
+        super().__init__(f"Upload is held by node {node}")
+
+
+class PartialFileMissing(Exception):
+    """The session's partial file is gone (e.g. the node's temp dir was wiped)"""
+
+
+class LeaseLost(Exception):
+    """The append's lease lapsed and another request may have the session"""
+
+
+def _hash_path(path: Path) -> ContentHasher:
+    hasher = ContentHasher()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher
+
+
+class ResumableUploadService:
+    """Partial files and running hashes for upload sessions"""
+
+    def __init__(self, max_cached_hashers: int = 1000):
+        self.max_cached_hashers = max_cached_hashers
+        self.settings = get_settings()
+        # session id -> (offset hashed so far, running hashes)
+        self._hashers: "OrderedDict[UUID, tuple[int, ContentHasher]]" = OrderedDict()
+        self._gc_task: Optional[asyncio.Task] = None
+
+    @property
+    def partial_dir(self) -> Path:
+        if self.settings.upload_partial_dir:
+            return Path(self.settings.upload_partial_dir)
+        return storage_service.backend.scratch_dir
+
+    @property
+    def node(self) -> Optional[str]:
+        """This node's id if partial files are node-local, None if they're shared"""
+        if self.settings.upload_partial_dir or isinstance(storage_service.backend, LocalStorageBackend):
+            return None
+        return self.settings.upload_node_id or socket.gethostname()
+
+    def partial_path(self, session_id: UUID) -> Path:
+        return self.partial_dir / f"{session_id}.upload"
+
+    def check_partial(self, session: UploadSession) -> None:
+        """Raise unless this node has the session's partial file"""
+        if session.node and session.node != self.node:
+            raise PartialFileElsewhere(session.node)
+        if not self.partial_path(session.id).exists():
+            raise PartialFileMissing()
+
+    @property
+    def lease_duration(self) -> timedelta:
+        return timedelta(seconds=self.settings.upload_append_lease_seconds)
+
+    def leased(self, session: UploadSession) -> bool:
+        """Whether an append is streaming into the session right now"""
+        return session.lease_until is not None and session.lease_until > datetime.now(timezone.utc)
+
+    async def acquire_lease(self, db: AsyncSession, session_id: UUID, offset: int) -> Optional[str]:
+        """Lease the session for an append at offset and commit; None if it's busy or has moved on"""
+        token = uuid.uuid4().hex
+        result = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session_id,
+                UploadSession.offset == offset,
+                or_(UploadSession.lease_until.is_(None), UploadSession.lease_until < func.now()),
+            )
+            .values(lease_token=token, lease_until=func.now() + self.lease_duration)
+            .returning(UploadSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        acquired = result.scalar_one_or_none() is not None
+        await db.commit()
+        return token if acquired else None
+
+    async def renew_lease(self, session_id: UUID, token: str) -> bool:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(UploadSession)
+                .where(UploadSession.id == session_id, UploadSession.lease_token == token)
+                .values(lease_until=func.now() + self.lease_duration)
+                .returning(UploadSession.id)
+            )
+            renewed = result.scalar_one_or_none() is not None
+            await session.commit()
+        return renewed
+
+    async def end_lease(
+        self, db: AsyncSession, session_id: UUID, token: str, expected: int, offset: int
+    ) -> bool:
+        """Record the offset an append reached and free the session; False if the lease was lost"""
+        result = await db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == session_id,
+                UploadSession.lease_token == token,
+                UploadSession.offset == expected,
+            )
+            .values(offset=offset, lease_token=None, lease_until=None)
+            .returning(UploadSession.id)
+            .execution_options(synchronize_session=False)
+        )
+        ended = result.scalar_one_or_none() is not None
+        await db.commit()
+        return ended
+
+    async def leased_chunks(
+        self, session_id: UUID, token: str, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[bytes]:
+        """Pass chunks through, renewing the lease as they come; LeaseLost once it can't be"""
+        loop = asyncio.get_running_loop()
+        renew_every = self.lease_duration.total_seconds() / 3
+        renewed_at = loop.time()
+        async for chunk in chunks:
+            if loop.time() - renewed_at > renew_every:
+                if not await self.renew_lease(session_id, token):
+                    raise LeaseLost()
+                renewed_at = loop.time()
+            yield chunk
+
+    async def create(self, session_id: UUID) -> None:
+        """Create the empty partial file for a new session"""
+        path = self.partial_path(session_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        self._remember(session_id, 0, ContentHasher())
+
+    async def append(
+        self,
+        session_id: UUID,
+        offset: int,
+        total_size: int,
+        chunks: AsyncIterator[bytes],
+    ) -> int:
+        """
+        Write a chunk stream at offset; returns the new offset.
+        Anything past offset from an earlier failed append is discarded.
+        If the stream breaks, the bytes that did arrive are kept and the
+        exception is re-raised with `.offset` set to the new offset.
+        """
+        cached = self._hashers.pop(session_id, None)
+        hasher = cached[1] if cached and cached[0] == offset else None
+        written = offset
+
+        try:
+            async with aiofiles.open(self.partial_path(session_id), "r+b") as f:
+                await f.truncate(offset)
+                await f.seek(offset)
+                try:
+                    async for chunk in chunks:
+                        if written + len(chunk) > total_size:
+                            raise ChunkOutOfBounds()
+                        await f.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        written += len(chunk)
+                finally:
+                    UPLOAD_BYTES.inc(written - offset)
+                    await f.flush()
+                    await asyncio.to_thread(os.fsync, f.fileno())
+        except BaseException as e:
+            e.offset = written
+            if hasher is not None and not isinstance(e, ChunkOutOfBounds):
+                self._remember(session_id, written, hasher)
+            raise
+
+        if hasher is not None:
+            self._remember(session_id, written, hasher)
+        return written
+
+    async def finish(self, session: UploadSession) -> dict:
+        """
+        Hash the assembled file and hand a copy of it (a hard link where
+        possible) over as a stored file ready for commit_blob(). The
+        partial file itself stays until the session is gone, so a
+        complete that fails to commit can be retried.
+        """
+        cached = self._hashers.get(session.id)
+        path = self.partial_path(session.id)
+        if cached and cached[0] == session.offset:
+            hasher = cached[1]
+        else:
+            hasher = await asyncio.to_thread(_hash_path, path)
+
+        scratch_dir = storage_service.backend.scratch_dir
+        scratch_dir.mkdir(parents=True, exist_ok=True)
+        handover = scratch_dir / f"{uuid.uuid4()}.part"
+        try:
+            os.link(path, handover)
+        except OSError:
+            await asyncio.to_thread(shutil.copyfile, path, handover)
+
+        return storage_service.stored_file(
+            handover,
+            content_hash=hasher.hexdigest(),
+            size=session.offset,
+            filename=session.filename,
+            content_type=session.content_type,
+            crc32=hasher.crc32,
+        )
+
+    def discard(self, session_id: UUID) -> None:
+        """Drop a session's partial file and cached hash"""
+        self._hashers.pop(session_id, None)
+        self.partial_path(session_id).unlink(missing_ok=True)
+
+    def _remember(self, session_id: UUID, offset: int, hasher) -> None:
+        self._hashers[session_id] = (offset, hasher)
+        self._hashers.move_to_end(session_id)
+        while len(self._hashers) > self.max_cached_hashers:
+            self._hashers.popitem(last=False)
+
+    async def collect_garbage(self, max_idle: timedelta) -> int:
+        """
+        Delete sessions idle for longer than max_idle; returns how many.
+        Partial files this node holds for sessions deleted elsewhere go
+        once they're as old.
+        """
+        cutoff = datetime.now(timezone.utc) - max_idle
+        async with async_session_maker() as session:
+            result = await session.execute(
+                delete(UploadSession)
+                .where(UploadSession.updated_at < cutoff)
+                .returning(UploadSession.id)
+            )
+            expired = result.scalars().all()
+            await session.commit()
+
+        for session_id in expired:
+            self.discard(session_id)
+
+        stale = cutoff.timestamp()
+        for path in self.partial_dir.glob("*.upload"):
+            try:
+                if path.stat().st_mtime < stale:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                pass
+        return len(expired)
+
+    async def _gc_loop(self, max_idle: timedelta, interval: float) -> None:
+        while True:
+            try:
+                removed = await self.collect_garbage(max_idle)
+                if removed:
+                    print(f"🧹 Removed {removed} abandoned upload sessions")
+            except Exception as e:
+                print(f"⚠️ Upload session cleanup failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start_gc(self) -> None:
+        self._gc_task = asyncio.create_task(self._gc_loop(
+            timedelta(hours=self.settings.upload_session_ttl_hours),
+            interval=self.settings.upload_session_gc_interval_seconds,
+        ))
+
+    async def stop_gc(self) -> None:
+        if self._gc_task:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            self._gc_task = None
+
+
+# Global instance
+resumable_uploads = ResumableUploadService()
@@ -0,0 +1,259 @@
+"""
+Evidence integrity verification
+
+Re-hashes stored blobs and checks each item's Merkle inclusion proof,
+and the authority's token over the batch root it leads to.
+Results land on EvidenceItem.last_verified_at / integrity_status, so a
+bulk run only revisits items not verified within max_age.
+
+Blobs are content-addressed, so a bulk run hashes each distinct file
+once per page no matter how many items share it. On local storage the
+hashing is spread across a process pool; on S3 objects are streamed
+with bounded concurrency.
+
+Run a full scan out of band with:  python -m app.services.verification
+"""
+
+import os
+import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select, or_, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.models.evidence import EvidenceItem
+from app.services.merkle import verify_proof
+from app.services.storage import storage_service
+from app.services.storage_backends import LocalStorageBackend, hash_file
+from app.services.timestamping import authority_named
+
+STATUS_OK = "ok"
+STATUS_MISMATCH = "mismatch"
+STATUS_MISSING = "missing"
+STATUS_BAD_PROOF = "bad_proof"
+
+
+def check_proof(
+    content_hash: str,
+    timestamp_token: Optional[str],
+    timestamp_authority: Optional[str],
+) -> Optional[bool]:
+    """
+    Check a Merkle inclusion proof from timestamp_token, and that the
+    authority's token covers the root it leads to - a self-consistent
+    proof over a made-up root isn't enough.
+    None if the item has no batch proof yet (pending or legacy).
+    """
+    if not timestamp_token:
+        return None
+    try:
+        token = json.loads(timestamp_token)
+    except ValueError:
+        return None
+    if not isinstance(token, dict) or "proof" not in token:
+        return None
+    root = token.get("root", "")
+    if not verify_proof(content_hash, token["proof"], root):
+        return False
+
+    authority = authority_named(timestamp_authority, get_settings())
+    if authority is None or not isinstance(token.get("authority_token"), str):
+        return False
+    return authority.verify(bytes.fromhex(root), token["authority_token"])
+
+
+def integrity_status(
+    content_hash: str,
+    actual_hash: Optional[str],
+    proof_valid: Optional[bool],
+) -> str:
+    if actual_hash is None:
+        return STATUS_MISSING
+    if actual_hash != content_hash:
+        return STATUS_MISMATCH
+    if proof_valid is False:
+        return STATUS_BAD_PROOF
+    return STATUS_OK
+
+
+async def record_integrity(db: AsyncSession, updates: list[dict], verified_at: datetime) -> None:
+    """
+    Store verification results ({"b_id", "b_status"} per item) without
+    touching change_xid / updated_at: checking an item doesn't change
+    it, so it mustn't send it through the sync feed again.
+    """
+    table = EvidenceItem.__table__
+    stmt = (
+        table.update()
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            integrity_status=bindparam("b_status"),
+            last_verified_at=verified_at,
+            change_xid=table.c.change_xid,
+            updated_at=table.c.updated_at,
+        )
+    )
+    await db.execute(stmt, updates)
+    await db.commit()
+
+
+async def verify_item(db: AsyncSession, item: EvidenceItem) -> dict:
+    """Re-hash one item's blob, check its proof and record the result"""
+    # Items without a file (notes) have nothing to re-hash, only a proof
+    if item.file_path:
+        actual_hash = await storage_service.backend.hash_object(item.file_path)
+    else:
+        actual_hash = item.content_hash
+    proof_valid = check_proof(item.content_hash, item.timestamp_token, item.timestamp_authority)
+    status = integrity_status(item.content_hash, actual_hash, proof_valid)
+    verified_at = datetime.now(timezone.utc)
+    await record_integrity(db, [{"b_id": item.id, "b_status": status}], verified_at)
+
+    return {
+        "id": str(item.id),
+        "status": status,
+        "content_hash": item.content_hash,
+        "actual_hash": actual_hash,
+        "proof_valid": proof_valid,
+        "verified_at": verified_at.isoformat(),
+    }
+
+
+@dataclass
+class VerificationRun:
+    """Progress of a bulk verification job"""
+    started_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    finished_at: Optional[str] = None
+    items: int = 0
+    files: int = 0
+    bytes: int = 0
+    counts: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class IntegrityVerifier:
+    """Incremental bulk verification over all evidence"""
+
+    def __init__(self, workers: Optional[int] = None, page_size: int = 500):
+        self.workers = workers or os.cpu_count() or 1
+        self.page_size = page_size
+        self.current: Optional[VerificationRun] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, max_age: timedelta) -> VerificationRun:
+        """Kick off a background run unless one is already going"""
+        if not self.running:
+            self.current = VerificationRun()
+            self._task = asyncio.create_task(self.run(max_age, self.current))
+        return self.current
+
+    async def run(self, max_age: timedelta, progress: Optional[VerificationRun] = None) -> VerificationRun:
+        """Verify every item not verified within max_age"""
+        progress = progress or VerificationRun()
+        cutoff = datetime.now(timezone.utc) - max_age
+        local = isinstance(storage_service.backend, LocalStorageBackend)
+        pool = ProcessPoolExecutor(max_workers=self.workers) if local else None
+        last_id: Optional[UUID] = None
+
+        try:
+            while True:
+                query = (
+                    select(
+                        EvidenceItem.id,
+                        EvidenceItem.file_path,
+                        EvidenceItem.file_size_bytes,
+                        EvidenceItem.content_hash,
+                        EvidenceItem.timestamp_token,
+                        EvidenceItem.timestamp_authority,
+                    )
+                    .where(or_(
+                        EvidenceItem.last_verified_at.is_(None),
+                        EvidenceItem.last_verified_at < cutoff,
+                    ))
+                    .order_by(EvidenceItem.id)
+                    .limit(self.page_size)
+                )
+                if last_id is not None:
+                    query = query.where(EvidenceItem.id > last_id)
+
+                async with async_session_maker() as session:
+                    rows = (await session.execute(query)).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                paths = {row.file_path for row in rows if row.file_path}
+                hashes = await self._hash_files(paths, pool)
+                await self._record(rows, hashes, progress)
+
+                progress.files += len(paths)
+                progress.bytes += sum(row.file_size_bytes or 0 for row in rows)
+        except Exception as e:
+            progress.error = str(e)
+            raise
+        finally:
+            if pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+            progress.finished_at = datetime.now(timezone.utc).isoformat()
+
+        return progress
+
+    async def _hash_files(self, keys: set[str], pool: Optional[ProcessPoolExecutor]) -> dict[str, Optional[str]]:
+        backend = storage_service.backend
+        keys = list(keys)
+
+        if pool:
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*(
+                loop.run_in_executor(pool, hash_file, str(backend.local_path(key)))
+                for key in keys
+            ))
+        else:
+            limit = asyncio.Semaphore(self.workers)
+
+            async def bounded(key: str) -> Optional[str]:
+                async with limit:
+                    return await backend.hash_object(key)
+
+            results = await asyncio.gather(*(bounded(key) for key in keys))
+
+        return dict(zip(keys, results))
+
+    async def _record(self, rows, hashes: dict[str, Optional[str]], progress: VerificationRun) -> None:
+        verified_at = datetime.now(timezone.utc)
+        updates = []
+        for row in rows:
+            actual_hash = hashes.get(row.file_path) if row.file_path else row.content_hash
+            proof_valid = check_proof(row.content_hash, row.timestamp_token, row.timestamp_authority)
+            status = integrity_status(row.content_hash, actual_hash, proof_valid)
+            progress.counts[status] = progress.counts.get(status, 0) + 1
+            updates.append({"b_id": row.id, "b_status": status})
+
+        async with async_session_maker() as session:
+            await record_integrity(session, updates, verified_at)
+        progress.items += len(rows)
+
+
+# Global instance
+integrity_verifier = IntegrityVerifier(workers=get_settings().verification_workers or None)
+
+
+if __name__ == "__main__":
+    result = asyncio.run(integrity_verifier.run(
+        timedelta(days=get_settings().verification_max_age_days)
+    ))
+    print(json.dumps(result.to_dict(), indent=2))
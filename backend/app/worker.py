@@ -0,0 +1,41 @@
+"""
+Alibi - Background job worker
+
+    python -m app.worker
+
+Runs post-upload jobs (metadata extraction, thumbnails) outside the API
+process, so they scale independently and can't slow requests down. Set
+JOB_WORKERS_IN_APP=false on the API when running these.
+"""
+
+import asyncio
+import signal
+
+from app.core.database import engine
+from app.services.jobs import job_queue, job_worker
+from app.services.metadata import metadata_extractor
+from app.services.thumbnails import thumbnail_service
+
+
+async def main() -> None:
+    print("👷 Starting Alibi worker...")
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    job_worker.start()
+    print(f"✅ Job workers running: {', '.join(job_worker.concurrency)}")
+
+    await stopping.wait()
+
+    print("👋 Shutting down worker...")
+    await job_worker.stop()
+    await thumbnail_service.shutdown()
+    metadata_extractor.shutdown()
+    await job_queue.backend.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1 @@
+# Benchmarks - load harness for the API (not part of the app)
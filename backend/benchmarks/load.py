@@ -0,0 +1,498 @@
+"""
+Load / benchmark harness for the evidence API
+
+    python -m benchmarks.load --mix mixed --users 20 --items 2000 \\
+        --concurrency 32 --duration 60 --out bench/baseline.json
+
+    python -m benchmarks.load --mix mixed ... --compare bench/baseline.json
+
+Starts the app (benchmarks.server) in a subprocess, seeds users and
+items straight into the database, logs everyone in, then runs a closed
+loop: --concurrency clients each pick the next request from the mix
+(seeded, so runs are repeatable) for --duration seconds after a warmup.
+
+Reports p50/p95/p99 latency and throughput per operation, the server's
+peak RSS and SQL statements per request, and writes them to --out as
+JSON. With --compare, a run is checked against an earlier one and exits
+non-zero on a regression beyond --tolerance.
+
+Only Postgres is needed (DATABASE_URL, e.g. the docker-compose one;
+migrations are applied to it first): files go to a temp dir, the cache
+is in-process and jobs use the Postgres queue. SQLite can't stand in -
+the schema relies on Postgres features (JSONB, tsvector, xid8, SKIP
+LOCKED). Use a throwaway database; seeded users and items are left in
+place.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import uuid
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+KB = 1024
+MB = 1024 * KB
+GB = 1024 * MB
+
+PASSWORD = "bench-password-1"
+
+# Operation -> weight
+MIXES = {
+    "read": {"list": 50, "detail": 40, "me": 10},
+    "mixed": {"list": 35, "detail": 30, "me": 10, "upload": 20, "delete": 5},
+    "upload": {"upload": 90, "list": 10},
+    "auth": {"me": 100},
+}
+
+# Upload size -> weight
+SIZE_PROFILES = {
+    "small": {10 * KB: 60, 100 * KB: 30, 1 * MB: 10},
+    "mixed": {10 * KB: 40, 100 * KB: 30, 1 * MB: 20, 10 * MB: 9, 100 * MB: 1},
+    "large": {100 * MB: 80, 1 * GB: 20},
+}
+
+
+def percentile(sorted_values: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Latencies and outcomes per operation"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.bytes_sent: dict[str, int] = {}
+        self.recording = False
+
+    def add(self, op: str, seconds: float, ok: bool, sent: int = 0) -> None:
+        if not self.recording:
+            return
+        self.latencies.setdefault(op, []).append(seconds)
+        self.bytes_sent[op] = self.bytes_sent.get(op, 0) + sent
+        if not ok:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    def summary(self, duration: float) -> dict:
+        ops = {}
+        for op, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            ops[op] = {
+                "count": len(values),
+                "errors": self.errors.get(op, 0),
+                "throughput_rps": round(len(values) / duration, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            if self.bytes_sent.get(op):
+                ops[op]["mb_per_s"] = round(self.bytes_sent[op] / MB / duration, 2)
+        total = sum(op["count"] for op in ops.values())
+        return {
+            "totals": {
+                "requests": total,
+                "errors": sum(op["errors"] for op in ops.values()),
+                "duration_s": round(duration, 2),
+                "throughput_rps": round(total / duration, 2),
+            },
+            "ops": ops,
+        }
+
+
+def multipart_upload(size: int, title: str, block: bytes) -> tuple[dict, int, object]:
+    """
+    Streamed multipart body for /evidence/upload - sizes up to GBs never
+    sit in memory. Content is unique per upload so dedup doesn't kick in.
+    """
+    boundary = uuid.uuid4().hex
+    head = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="title"\r\n\r\n{title}\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="bench.bin"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    unique = uuid.uuid4().bytes
+
+    async def body():
+        yield head
+        remaining = size
+        first = True
+        while remaining > 0:
+            chunk = block[:remaining]
+            if first:
+                chunk = unique + chunk[len(unique):]
+                first = False
+            remaining -= len(chunk)
+            yield chunk
+        yield tail
+
+    headers = {"content-type": f"multipart/form-data; boundary={boundary}"}
+    return headers, len(head) + size + len(tail), body()
+
+
+class Client:
+    """One simulated user session issuing requests from the mix"""
+
+    def __init__(self, http: httpx.AsyncClient, token: str, item_ids: list[str], rng: random.Random,
+                 mix: dict[str, int], sizes: dict[int, int], recorder: Recorder, block: bytes):
+        self.http = http
+        self.headers = {"authorization": f"Bearer {token}"}
+        self.item_ids = item_ids
+        self.rng = rng
+        self.ops, self.op_weights = list(mix), list(mix.values())
+        self.sizes, self.size_weights = list(sizes), list(sizes.values())
+        self.recorder = recorder
+        self.block = block
+
+    async def run(self, stop_at: float) -> None:
+        while time.monotonic() < stop_at:
+            op = self.rng.choices(self.ops, self.op_weights)[0]
+            if op in ("detail", "delete") and not self.item_ids:
+                op = "list"
+            await getattr(self, f"op_{op}")()
+
+    async def _timed(self, op: str, request, sent: int = 0, expected: tuple = ()) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.recorder.add(op, time.perf_counter() - started, False, sent)
+            return None
+        ok = response.status_code < 400 or response.status_code in expected
+        self.recorder.add(op, time.perf_counter() - started, ok, sent)
+        return response
+
+    async def op_list(self) -> None:
+        await self._timed("list", self.http.get("/evidence", params={"limit": 50}, headers=self.headers))
+
+    async def op_detail(self) -> None:
+        item_id = self.rng.choice(self.item_ids)
+        # Clients sharing a user can race a delete
+        await self._timed("detail", self.http.get(f"/evidence/{item_id}", headers=self.headers), expected=(404,))
+
+    async def op_me(self) -> None:
+        await self._timed("me", self.http.get("/users/me", headers=self.headers))
+
+    async def op_upload(self) -> None:
+        size = self.rng.choices(self.sizes, self.size_weights)[0]
+        headers, length, body = multipart_upload(size, f"bench upload {size}", self.block)
+        response = await self._timed(
+            "upload",
+            self.http.post(
+                "/evidence/upload",
+                content=body,
+                headers={**self.headers, **headers, "content-length": str(length)},
+            ),
+            sent=size,
+        )
+        if response is not None and response.status_code == 200:
+            self.item_ids.append(response.json()["id"])
+
+    async def op_delete(self) -> None:
+        item_id = self.item_ids.pop(self.rng.randrange(len(self.item_ids)))
+        await self._timed("delete", self.http.delete(f"/evidence/{item_id}", headers=self.headers))
+
+
+async def seed(run_id: str, users: int, items: int, rng: random.Random) -> list[tuple[str, list[str]]]:
+    """
+    Insert users and items directly. Items share one small stored blob
+    (as deduplicated uploads do), so seeding costs one file.
+    Returns [(email, item ids)].
+    """
+    from fastapi_users.password import PasswordHelper
+    from sqlalchemy import insert
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+    from app.core.database import async_session_maker, engine
+    from app.models.blob import Blob
+    from app.models.evidence import EvidenceItem
+    from app.models.user import User
+    from app.services.storage import storage_service
+
+    content = os.urandom(16 * KB)
+    content_hash = hashlib.sha256(content).hexdigest()
+    key = storage_service.blob_key(content_hash)
+    backend = storage_service.backend
+    backend.scratch_dir.mkdir(parents=True, exist_ok=True)
+    scratch = backend.scratch_dir / f"seed-{run_id}"
+    scratch.write_bytes(content)
+    await backend.put_file(scratch, key, "application/octet-stream")
+
+    hashed = PasswordHelper().hash(PASSWORD)
+    user_rows = [
+        {
+            "id": uuid.uuid4(),
+            "email": f"bench-{run_id}-{i}@example.com",
+            "hashed_password": hashed,
+            "is_active": True,
+            "is_superuser": False,
+            "is_verified": True,
+            "subscription_tier": "business",
+        }
+        for i in range(users)
+    ]
+
+    now = datetime.now(timezone.utc)
+    per_user: dict[uuid.UUID, list[str]] = {row["id"]: [] for row in user_rows}
+    item_rows = []
+    for i in range(items):
+        user_id = user_rows[i % users]["id"]
+        item_id = uuid.uuid4()
+        per_user[user_id].append(str(item_id))
+        item_rows.append({
+            "id": item_id,
+            "user_id": user_id,
+            "item_type": "photo",
+            "file_path": key,
+            "file_size_bytes": len(content),
+            "mime_type": "application/octet-stream",
+            "title": f"Bench item {i}",
+            "captured_at": now - timedelta(seconds=rng.randrange(365 * 86400)),
+            "content_hash": content_hash,
+        })
+
+    async with async_session_maker() as session:
+        await session.execute(insert(User), user_rows)
+        for start in range(0, len(item_rows), 1000):
+            await session.execute(insert(EvidenceItem), item_rows[start:start + 1000])
+        if items:
+            await session.execute(
+                pg_insert(Blob)
+                .values(content_hash=content_hash, size_bytes=len(content), ref_count=items)
+                .on_conflict_do_update(
+                    index_elements=[Blob.content_hash],
+                    set_={"ref_count": Blob.ref_count + items},
+                )
+            )
+        await session.commit()
+    await engine.dispose()
+
+    return [(row["email"], per_user[row["id"]]) for row in user_rows]
+
+
+async def login(http: httpx.AsyncClient, email: str) -> str:
+    response = await http.post("/auth/jwt/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def wait_until_ready(http: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if (await http.get("/health/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("Server did not start in time")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    backend_dir = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=backend_dir, check=True)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.server", "--port", str(args.port)],
+        cwd=backend_dir,
+        env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as http:
+            await wait_until_ready(http, server)
+
+            print(f"🌱 Seeding {args.users} users / {args.items} items...")
+            seeded = await seed(run_id, args.users, args.items, rng)
+            tokens = await asyncio.gather(*(login(http, email) for email, _ in seeded))
+
+            recorder = Recorder()
+            block = os.urandom(MB)
+            clients = [
+                Client(
+                    http, tokens[i % len(seeded)], seeded[i % len(seeded)][1],
+                    random.Random(rng.random()), MIXES[args.mix], SIZE_PROFILES[args.sizes],
+                    recorder, block,
+                )
+                for i in range(args.concurrency)
+            ]
+
+            print(f"🔥 Warming up for {args.warmup}s, then measuring for {args.duration}s...")
+            stop_at = time.monotonic() + args.warmup + args.duration
+            tasks = [asyncio.create_task(client.run(stop_at)) for client in clients]
+
+            await asyncio.sleep(args.warmup)
+            before = (await http.get("/__bench__/stats")).json()
+            recorder.recording = True
+            started = time.monotonic()
+
+            await asyncio.gather(*tasks)
+            recorder.recording = False
+            duration = time.monotonic() - started
+            after = (await http.get("/__bench__/stats")).json()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    report = recorder.summary(duration)
+    queries = after["queries"] - before["queries"]
+    report["server"] = {
+        "peak_rss_mb": round(after["peak_rss_bytes"] / MB, 1),
+        "db_queries": queries,
+        # Includes background work (jobs, sequencing) during the run
+        "db_queries_per_request": round(queries / max(report["totals"]["requests"], 1), 2),
+    }
+    report["meta"] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {
+            key: getattr(args, key)
+            for key in ("mix", "sizes", "users", "items", "concurrency", "duration", "warmup", "seed")
+        },
+    }
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{'op':<10}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, stats in report["ops"].items():
+        print(
+            f"{op:<10}{stats['count']:>8}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    totals, server = report["totals"], report["server"]
+    print(
+        f"\n{totals['requests']} requests, {totals['errors']} errors, {totals['throughput_rps']} req/s; "
+        f"server peak RSS {server['peak_rss_mb']} MB, {server['db_queries_per_request']} queries/request"
+    )
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of report against baseline, as messages"""
+    regressions = []
+
+    def worse(name: str, new: Optional[float], old: Optional[float], higher_is_better: bool = False) -> None:
+        if not new or not old:
+            return
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        if change > tolerance:
+            regressions.append(f"{name}: {old} -> {new} ({change:+.0%} worse)")
+
+    if report["meta"]["args"] != baseline.get("meta", {}).get("args"):
+        print("⚠️ Baseline was run with different arguments - comparison may be meaningless")
+
+    for op, stats in report["ops"].items():
+        old = baseline.get("ops", {}).get(op)
+        if not old:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            worse(f"{op} {metric}", stats[metric], old[metric])
+        worse(f"{op} throughput_rps", stats["throughput_rps"], old["throughput_rps"], higher_is_better=True)
+        if stats["errors"] > old["errors"]:
+            regressions.append(f"{op} errors: {old['errors']} -> {stats['errors']}")
+
+    old_server = baseline.get("server", {})
+    worse("peak_rss_mb", report["server"]["peak_rss_mb"], old_server.get("peak_rss_mb"))
+    worse(
+        "db_queries_per_request",
+        report["server"]["db_queries_per_request"],
+        old_server.get("db_queries_per_request"),
+    )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load / benchmark harness for the Alibi API")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--sizes", choices=sorted(SIZE_PROFILES), default="small", help="Upload size profile")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout in seconds")
+    parser.add_argument("--out", type=Path, help="Write the report here (JSON)")
+    parser.add_argument("--compare", type=Path, help="Baseline report to check against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    if args.users < 1 or args.concurrency < 1:
+        parser.error("--users and --concurrency must be at least 1")
+
+    # The server subprocess inherits these; the seeding code reads them too
+    upload_dir = tempfile.mkdtemp(prefix="alibi-bench-")
+    os.environ.update({
+        "DEBUG": "false",
+        "STORAGE_BACKEND": "local",
+        "UPLOAD_DIR": upload_dir,
+        "CACHE_BACKEND": os.environ.get("CACHE_BACKEND", "memory"),
+        "JOB_BACKEND": os.environ.get("JOB_BACKEND", "postgres"),
+        # Per-user upload rate limits would cap the load itself; set these
+        # to benchmark them. The in-flight budget stays as configured.
+        "UPLOAD_RATE_BYTES_PER_SECOND": os.environ.get("UPLOAD_RATE_BYTES_PER_SECOND", "{}"),
+        "UPLOAD_TIER_RATE_BYTES_PER_SECOND": os.environ.get("UPLOAD_TIER_RATE_BYTES_PER_SECOND", "{}"),
+    })
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+    print_report(report)
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2))
+        print(f"💾 Report written to {args.out}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:")
+            for message in regressions:
+                print(f"   {message}")
+            sys.exit(1)
+        print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
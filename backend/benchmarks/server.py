@@ -0,0 +1,50 @@
+"""
+Benchmark server - the real app, plus counters the harness reads
+
+    python -m benchmarks.server --port 8765
+
+Counts every SQL statement the app's engines (primary and replicas)
+execute and exposes the count and the process's peak RSS at
+/__bench__/stats. Started by benchmarks.load; not meant to be run in
+production.
+"""
+
+import argparse
+import resource
+import sys
+
+import uvicorn
+from sqlalchemy import event
+
+from app.core.database import engine, replica_router
+from app.main import app
+
+queries = 0
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    global queries
+    queries += 1
+
+
+for counted in [engine, *replica_router.engines]:
+    event.listen(counted.sync_engine, "before_cursor_execute", count_query)
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@app.get("/__bench__/stats", include_in_schema=False)
+async def bench_stats():
+    return {"queries": queries, "peak_rss_bytes": peak_rss_bytes()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
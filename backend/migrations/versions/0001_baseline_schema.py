@@ -0,0 +1,71 @@
+"""Baseline schema
+
+The tables as the app created them with create_all() at startup, before
+migrations. Databases set up that way are brought under migrations with
+
+    alembic stamp 0001
+    alembic upgrade head
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("email", sa.String(320), nullable=False),
+        sa.Column("hashed_password", sa.String(1024), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.Column("is_verified", sa.Boolean(), nullable=False),
+        sa.Column("full_name", sa.String(255), nullable=True),
+        sa.Column("subscription_tier", sa.String(50), nullable=False),
+        sa.Column("storage_used_bytes", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "evidence_items",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("item_type", sa.String(50), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=True),
+        sa.Column("file_size_bytes", sa.Integer(), nullable=True),
+        sa.Column("mime_type", sa.String(100), nullable=True),
+        sa.Column("title", sa.String(255), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("tags", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("latitude", sa.Numeric(10, 8), nullable=True),
+        sa.Column("longitude", sa.Numeric(11, 8), nullable=True),
+        sa.Column("location_name", sa.String(255), nullable=True),
+        sa.Column("captured_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("timestamp_token", sa.Text(), nullable=True),
+        sa.Column("timestamp_authority", sa.String(255), nullable=True),
+        sa.Column("timestamped_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_evidence_items_user_id", "evidence_items", ["user_id"])
+    op.create_index("ix_evidence_items_content_hash", "evidence_items", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_table("evidence_items")
+    op.drop_table("users")
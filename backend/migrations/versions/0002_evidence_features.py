@@ -0,0 +1,175 @@
+"""Evidence features: blobs, search, geohash, integrity and change tracking
+
+New columns and indexes on users and evidence_items, the blobs table,
+and backfills for rows that predate them: each user's storage_used_bytes
+from their items, and geohashes for items with a location.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Id of the writing transaction (xid8 as bigint) - see app.services.sync
+CURRENT_XID = sa.text("pg_current_xact_id()::text::bigint")
+
+# Same arithmetic as app.services.geo.encode_geohash (in float8, as the
+# app converts the Numeric columns to float), for the backfill only
+GEOHASH_FUNCTION = """
+CREATE FUNCTION pg_temp.alibi_geohash(lat float8, lon float8) RETURNS text
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+  base32 text := '0123456789bcdefghjkmnpqrstuvwxyz';
+  lat_lo float8 := -90; lat_hi float8 := 90;
+  lon_lo float8 := -180; lon_hi float8 := 180;
+  mid float8;
+  hash text := '';
+  ch int := 0;
+  bits int := 0;
+  even boolean := true;
+BEGIN
+  WHILE length(hash) < 12 LOOP
+    IF even THEN
+      mid := (lon_lo + lon_hi) / 2;
+      IF lon >= mid THEN ch := ch * 2 + 1; lon_lo := mid; ELSE ch := ch * 2; lon_hi := mid; END IF;
+    ELSE
+      mid := (lat_lo + lat_hi) / 2;
+      IF lat >= mid THEN ch := ch * 2 + 1; lat_lo := mid; ELSE ch := ch * 2; lat_hi := mid; END IF;
+    END IF;
+    even := NOT even;
+    bits := bits + 1;
+    IF bits = 5 THEN
+      hash := hash || substr(base32, ch + 1, 1);
+      bits := 0;
+      ch := 0;
+    END IF;
+  END LOOP;
+  RETURN hash;
+END $$
+"""
+
+
+def upgrade() -> None:
+    # Users: 64-bit quota accounting, token revocation
+    op.alter_column(
+        "users", "storage_used_bytes",
+        type_=sa.BigInteger(), existing_type=sa.Integer(), server_default="0", existing_nullable=False,
+    )
+    op.add_column("users", sa.Column("token_version", sa.Integer(), server_default="0", nullable=False))
+
+    op.create_table(
+        "blobs",
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("crc32", sa.BigInteger(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash"),
+    )
+    op.create_index("ix_blobs_unreferenced", "blobs", ["content_hash"], postgresql_where=sa.text("ref_count <= 0"))
+
+    # array_to_string() isn't IMMUTABLE, so the generated search_vector
+    # can't call it directly - this wrapper is
+    op.execute(
+        "CREATE OR REPLACE FUNCTION alibi_tags_text(text[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE "
+        "AS $$ SELECT coalesce(array_to_string($1, ' '), '') $$"
+    )
+
+    op.alter_column(
+        "evidence_items", "file_size_bytes",
+        type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=True,
+    )
+    op.add_column("evidence_items", sa.Column("thumbnail_sizes", postgresql.ARRAY(sa.Integer()), nullable=True))
+    op.add_column(
+        "evidence_items",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+                "setweight(to_tsvector('english', alibi_tags_text(tags)), 'C')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.add_column("evidence_items", sa.Column("geohash", sa.String(12, collation="C"), nullable=True))
+    op.add_column("evidence_items", sa.Column("last_verified_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("evidence_items", sa.Column("integrity_status", sa.String(20), nullable=True))
+    op.add_column(
+        "evidence_items",
+        sa.Column("change_xid", sa.BigInteger(), server_default=CURRENT_XID, nullable=False),
+    )
+    op.add_column(
+        "evidence_items",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+    # Backfills
+    op.execute(GEOHASH_FUNCTION)
+    op.execute(
+        "UPDATE evidence_items "
+        "SET geohash = pg_temp.alibi_geohash(CAST(latitude AS float8), CAST(longitude AS float8)) "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
+    op.execute("DROP FUNCTION pg_temp.alibi_geohash(float8, float8)")
+    op.execute(
+        "UPDATE users SET storage_used_bytes = COALESCE("
+        "(SELECT sum(file_size_bytes) FROM evidence_items WHERE evidence_items.user_id = users.id), 0)"
+    )
+
+    op.create_index("ix_evidence_items_last_verified_at", "evidence_items", ["last_verified_at"])
+    op.create_index("ix_evidence_items_user_captured", "evidence_items", ["user_id", "captured_at", "id"])
+    op.create_index("ix_evidence_items_search", "evidence_items", ["search_vector"], postgresql_using="gin")
+    op.create_index("ix_evidence_items_tags", "evidence_items", ["tags"], postgresql_using="gin")
+    op.create_index("ix_evidence_items_user_geohash", "evidence_items", ["user_id", "geohash"])
+    op.create_index("ix_evidence_items_user_change", "evidence_items", ["user_id", "change_xid", "id"])
+
+    # With PostGIS installed, also index the point geography (GiST) for
+    # radius / nearest queries. A no-op on stock Postgres.
+    op.execute(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis') THEN "
+        "CREATE INDEX IF NOT EXISTS ix_evidence_items_geography ON evidence_items USING gist "
+        "(geography(ST_SetSRID(ST_MakePoint(CAST(longitude AS FLOAT), CAST(latitude AS FLOAT)), 4326))) "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL; "
+        "END IF; END $$"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_evidence_items_geography")
+    op.drop_index("ix_evidence_items_user_change", "evidence_items")
+    op.drop_index("ix_evidence_items_user_geohash", "evidence_items")
+    op.drop_index("ix_evidence_items_tags", "evidence_items")
+    op.drop_index("ix_evidence_items_search", "evidence_items")
+    op.drop_index("ix_evidence_items_user_captured", "evidence_items")
+    op.drop_index("ix_evidence_items_last_verified_at", "evidence_items")
+    for column in (
+        "updated_at", "change_xid", "integrity_status", "last_verified_at",
+        "geohash", "search_vector", "thumbnail_sizes",
+    ):
+        op.drop_column("evidence_items", column)
+    op.alter_column(
+        "evidence_items", "file_size_bytes",
+        type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=True,
+    )
+    op.execute("DROP FUNCTION IF EXISTS alibi_tags_text(text[])")
+    op.drop_table("blobs")
+    op.drop_column("users", "token_version")
+    op.alter_column(
+        "users", "storage_used_bytes",
+        type_=sa.Integer(), existing_type=sa.BigInteger(), server_default=None, existing_nullable=False,
+    )
@@ -0,0 +1,129 @@
+"""Upload sessions, jobs, sync tombstones and the audit log
+
+Tables for features with no data before them - nothing to backfill.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Id of the writing transaction (xid8 as bigint) - see app.services.sync
+CURRENT_XID = sa.text("pg_current_xact_id()::text::bigint")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "evidence_tombstones",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("change_xid", sa.BigInteger(), server_default=CURRENT_XID, nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_evidence_tombstones_user_change", "evidence_tombstones", ["user_id", "change_xid", "id"])
+    op.create_index("ix_evidence_tombstones_deleted_at", "evidence_tombstones", ["deleted_at"])
+
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("filename", sa.String(255), nullable=True),
+        sa.Column("content_type", sa.String(100), nullable=False),
+        sa.Column("item_type", sa.String(50), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("offset", sa.BigInteger(), nullable=False),
+        sa.Column("node", sa.String(255), nullable=True),
+        sa.Column("expected_hash", sa.String(64), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_upload_sessions_user_id", "upload_sessions", ["user_id"])
+    op.create_index("ix_upload_sessions_updated_at", "upload_sessions", ["updated_at"])
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(200), nullable=False),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_claim", "jobs", ["type", "status", "run_at"])
+
+    op.create_table(
+        "job_outbox",
+        sa.Column("id", sa.String(200), nullable=False),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_job_outbox_created_at", "job_outbox", ["created_at"])
+
+    op.create_table(
+        "audit_log",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=True),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("action", sa.String(50), nullable=False),
+        sa.Column("evidence_id", sa.UUID(), nullable=True),
+        sa.Column("details", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("prev_hash", sa.String(64), nullable=True),
+        sa.Column("entry_hash", sa.String(64), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("seq"),
+    )
+    op.create_index("ix_audit_log_user_seq", "audit_log", ["user_id", "seq"])
+    op.create_index("ix_audit_log_pending", "audit_log", ["id"], postgresql_where=sa.text("seq IS NULL"))
+
+    op.create_table(
+        "audit_nodes",
+        sa.Column("level", sa.SmallInteger(), nullable=False),
+        sa.Column("index", sa.BigInteger(), nullable=False),
+        sa.Column("hash", sa.LargeBinary(32), nullable=False),
+        sa.PrimaryKeyConstraint("level", "index"),
+    )
+
+    op.create_table(
+        "audit_checkpoints",
+        sa.Column("tree_size", sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column("root_hash", sa.String(64), nullable=False),
+        sa.Column("head_hash", sa.String(64), nullable=False),
+        sa.Column("key_id", sa.String(32), nullable=False),
+        sa.Column("signature", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("tree_size"),
+    )
+
+
+
+def downgrade() -> None:
+    op.drop_table("audit_checkpoints")
+    op.drop_table("audit_nodes")
+    op.drop_table("audit_log")
+    op.drop_table("job_outbox")
+    op.drop_table("jobs")
+    op.drop_table("upload_sessions")
+    op.drop_table("evidence_tombstones")
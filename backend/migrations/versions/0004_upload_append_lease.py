@@ -0,0 +1,29 @@
+"""Lease columns on upload sessions
+
+Appends lease the session instead of holding its row lock while the
+body streams in - see app.services.uploads.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("upload_sessions", sa.Column("lease_token", sa.String(32), nullable=True))
+    op.add_column("upload_sessions", sa.Column("lease_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("upload_sessions", "lease_until")
+    op.drop_column("upload_sessions", "lease_token")